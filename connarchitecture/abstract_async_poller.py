@@ -0,0 +1,100 @@
+from connarchitecture.abstract_poller import AbstractPoller
+from connarchitecture.decorators import overrides
+from connarchitecture.exceptions import PollerException, FatalException, ProcessException
+from connarchitecture.constants import Constants
+from abc import abstractmethod
+from queue import Empty
+import asyncio
+import time
+
+
+class AbstractAsyncPoller(AbstractPoller):
+    """
+    Poller that runs many poll() coroutines concurrently on one event loop per thread. At most `in_flight`
+    polls run at the same time. Results are handed to the same output queue as for AbstractPoller.
+    """
+
+    def __init__(self, name, **kwargs):
+        AbstractPoller.__init__(self, name, **kwargs)
+        self._in_flight = kwargs.get('in_flight', 10)
+        self._failure = None
+
+    @overrides(AbstractPoller)
+    def run(self):
+        try:
+            self._prepare_for_run()
+            asyncio.run(self._run_loop())
+            self._cleanup()
+
+        except ProcessException as e:
+            self.throw(e, e.get_poll_reference())
+
+    async def _next_items(self):
+        # The queue get may block, so it runs outside of the event loop thread
+        try:
+            return await asyncio.to_thread(self._in_queue.get_topic, self.get_topic(), **self._get_kwargs())
+        except Empty:
+            if self._dispatch_mode == Constants.DISPATCH_MODE_POLLING:
+                await asyncio.sleep(Constants.POLLING_INTERVAL)
+            return None
+
+    async def _step_async(self, slots, tasks):
+        """
+        One iteration of the event loop: waits for a free slot and starts the poll of the next queued item.
+        """
+        await slots.acquire()
+        items = await self._next_items()
+        if items is None:
+            slots.release()
+            return
+        task = asyncio.create_task(self._poll_items(items, slots))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    async def _run_loop(self):
+        slots = asyncio.Semaphore(self._in_flight)
+        tasks = set()
+        while self._continue and not self._failure:
+            await self._step_async(slots, tasks)
+
+        if tasks:
+            await asyncio.gather(*tasks)
+        if self._failure:
+            raise self._failure
+
+    async def _poll_items(self, items, slots):
+        start = time.monotonic()
+        try:
+            for polled_result, poll_reference, success in self._poll_results(items, await self.poll(items=items)):
+                # Putting into a bounded queue may block
+                await asyncio.to_thread(self._handle_result, polled_result, poll_reference, success)
+        except FatalException as e:
+            self._failure = e
+        except Exception as e:
+            failure = PollerException()
+            failure.__cause__ = e
+            self._failure = failure
+        finally:
+            self._record_work(start)
+            slots.release()
+
+    @overrides(AbstractPoller)
+    def _step(self):
+        # run() keeps one event loop for all iterations. A single step runs on a loop of its own and waits for its poll.
+        async def step():
+            tasks = set()
+            await self._step_async(asyncio.Semaphore(self._in_flight), tasks)
+            if tasks:
+                await asyncio.gather(*tasks)
+
+        asyncio.run(step())
+        if self._failure:
+            raise self._failure
+
+    @abstractmethod
+    async def poll(self, items):
+        """
+        Poll coroutine. Represents one poll cycle. Runs concurrently with up to `in_flight` other polls.
+        :return the poll result
+        """
+        pass
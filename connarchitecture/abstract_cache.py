@@ -0,0 +1,32 @@
+from connarchitecture.logging_component import LoggingComponent
+from abc import ABC, abstractmethod
+
+
+class AbstractCache(ABC, LoggingComponent):
+    """
+    Index of the data the pollers cache. The connector creates it from the [CACHE] section, initializes it
+    before the pollers start and cleans it up after they stopped. The arguments of the `cache` server
+    command are handed to `command`.
+    """
+
+    def __init__(self):
+        LoggingComponent.__init__(self, self.component_name())
+
+    def component_name(self):
+        return "AbstractCache"
+
+    def initialize(self):
+        pass
+
+    def cleanup(self):
+        pass
+
+    def statistics(self) -> str:
+        return ""
+
+    @abstractmethod
+    def command(self, args: list[str]) -> str:
+        """
+        :return the answer to the `cache` server command with the arguments `args`
+        """
+        pass
@@ -6,6 +6,7 @@ from connarchitecture.constants import Constants
 from abc import abstractmethod
 from threading import Lock
 from queue import Empty
+import time
 
 
 class AbstractParser(AbstractWorker):
@@ -48,28 +49,38 @@ class AbstractParser(AbstractWorker):
     @overrides(AbstractWorker)
     def _step(self):
         try:
-            poller_result = self._in_queue.get(block=False)
-            poll_reference = poller_result.get_poll_reference()
+            poller_results, wait = self._get_batch(self._in_queue)
         except Empty:
             pass
         else:
+            start = time.monotonic()
+            poller_results = [r for r in poller_results if r.get_result()]
+            poll_references = [r.get_poll_reference() for r in poller_results]
             try:
-                if poller_result.get_result():
-                    parsed_result = self.parse(poller_result.get_result(), poll_reference)
-                    if parsed_result:
-                        self._handle_result(parsed_result, poll_reference)
+                if poller_results:
+                    if len(poller_results) == 1:
+                        parsed_results = [self.parse(poller_results[0].get_result(), poll_references[0])]
                     else:
-                        self.update(Constants.EVENT_DONE, poll_reference)
+                        parsed_results = self.parse_batch([r.get_result() for r in poller_results], poll_references)
+                    for parsed_result, poll_reference in zip(parsed_results, poll_references):
+                        if parsed_result:
+                            self._handle_result(parsed_result, poll_reference)
+                        else:
+                            self.update(Constants.EVENT_DONE, poll_reference)
             except FatalException as e:
-                raise FatalException(poll_reference=poll_reference) from e
+                self._fail_batch(poll_references[1:])
+                raise FatalException(poll_reference=poll_references[0]) from e
             except Exception as e:
-                raise ParserException(poll_reference=poll_reference) from e
+                self._fail_batch(poll_references[1:])
+                raise ParserException(poll_reference=poll_references[0]) from e
+            finally:
+                self._record_work(start, count=len(poll_references), wait=wait)
 
     def _handle_result(self, parsed_result, poll_reference):
         # if parsed_result:
         parser_result = ParserResult(result=parsed_result, poll_reference=poll_reference)
-        self._out_queue.put(parser_result)
-        self.update(Constants.EVENT_PARSED, poll_reference)
+        if self._put(self._out_queue, parser_result):
+            self.update(Constants.EVENT_PARSED, poll_reference)
 
     @overrides(AbstractWorker)
     def _cleanup(self):
@@ -107,6 +118,21 @@ class AbstractParser(AbstractWorker):
         """
         pass
 
+    def parse_batch(self, inputs, poll_references):
+        """
+        Parses a batch of messages at once. Override this method to share fixed costs across a batch,
+        see set_batching. Called instead of parse for batches of more than one message.
+        :return one parse result per message, in order
+        """
+        return [self.parse(input, poll_reference) for input, poll_reference in zip(inputs, poll_references)]
+
+    @staticmethod
+    def statistics() -> str:
+        """
+        Override this method to report state shared by all parser threads through the `stats` command.
+        """
+        return ""
+
     @abstractmethod
     def cleanup(self):
         """
@@ -6,17 +6,20 @@ from connarchitecture.constants import Constants
 from abc import abstractmethod
 from threading import Lock
 from queue import Empty
+import time
 
 
 class AbstractPoller(AbstractWorker):
-    _static_init = False
-    _thread_count = 0
+    # Static state is tracked per poller class, so that every configured poller implementation gets its own
+    # static_initialize/static_cleanup call
+    _static_init = set()
+    _thread_count = {}
     _lock = Lock()
 
     def __init__(self, name, **kwargs):
         AbstractWorker.__init__(self, name)
         with AbstractPoller._lock:
-            AbstractPoller._thread_count += 1
+            AbstractPoller._thread_count[type(self)] = AbstractPoller._thread_count.get(type(self), 0) + 1
 
     def set_in_queue(self, queue):
         self._in_queue = queue
@@ -33,12 +36,12 @@ class AbstractPoller(AbstractWorker):
             raise FatalException(message="No output queue set in poller")
 
         with AbstractPoller._lock:
-            if not AbstractPoller._static_init:
+            if type(self) not in AbstractPoller._static_init:
                 try:
                     self.static_initialize()
                 except Exception as e:
                     raise FatalException() from e
-                AbstractPoller._static_init = True
+                AbstractPoller._static_init.add(type(self))
 
         try:
             self.initialize()
@@ -51,35 +54,75 @@ class AbstractPoller(AbstractWorker):
         poll_reference = None
         success = False
         try:
-            with AbstractPoller._lock:
-                try:
-                    items = self._in_queue.get_topic(topic=self.get_topic(), block=False)
-                    result = self.poll(items=items)
-                    if result:
-                        polled_result, poll_reference, success = result
-                        self._handle_result(polled_result, poll_reference)
-                    if not success and poll_reference:
-                        self.update(Constants.EVENT_ERROR, poll_reference)
-                except Empty:
-                    pass
+            # The queue handoff is thread-safe on its own, so polls of all threads run in parallel
+            try:
+                items = self._in_queue.get_topic(topic=self.get_topic(), **self._get_kwargs())
+            except Empty:
+                return
+            start = time.monotonic()
+            try:
+                for polled_result, poll_reference, success in self._poll_results(items, self.poll(items=items)):
+                    self._handle_result(polled_result, poll_reference, success)
+            finally:
+                self._record_work(start)
         except FatalException as e:
             raise e
         except Exception as e:
             raise PollerException() from e
 
-    def _handle_result(self, polled_result, poll_reference):
+    def _poll_results(self, items, result):
+        """
+        A poll returns one (result, poll reference, success) tuple or a list of them, e.g. one per year of
+        a coalesced item. A work item with several results is acknowledged once all of them are.
+        :return the list of results, linked to the work item
+        """
+        if not result and not isinstance(result, list):
+            return []
+        results = result if isinstance(result, list) else [result]
+        work_id = getattr(items, 'work_id', None)
+        if work_id is not None:
+            if not results:
+                self._in_queue.ack(work_id, True)
+            elif len(results) > 1:
+                self._in_queue.expect_acks(work_id, len(results))
+        for polled_result, poll_reference, success in results:
+            self._link_work_item(items, polled_result, poll_reference, success)
+        return results
+
+    def _link_work_item(self, items, polled_result, poll_reference, success):
+        """
+        Items from a durable input queue carry a work id. The id travels with the poll reference and the
+        connector acknowledges the item once its result has been sent or the poll is done without one.
+        Items without a poll reference are acknowledged right away.
+        """
+        work_id = getattr(items, 'work_id', None)
+        if work_id is None:
+            return
+        if poll_reference is None:
+            self._in_queue.ack(work_id, success)
+        else:
+            poll_reference.work_id = work_id
+
+    def _handle_result(self, polled_result, poll_reference, success=True):
         if polled_result:
             poller_result = PollerResult(result=polled_result, poll_reference=poll_reference)
-            self._out_queue.put(poller_result)
-            self.update(Constants.EVENT_POLLED, poll_reference)
+            if self._put(self._out_queue, poller_result):
+                self.update(Constants.EVENT_POLLED, poll_reference)
+        if poll_reference and not success:
+            self.update(Constants.EVENT_ERROR, poll_reference)
+        elif poll_reference and poll_reference.unavailable:
+            self.update(Constants.EVENT_UNAVAILABLE, poll_reference)
+        elif poll_reference and not polled_result:
+            # Nothing to parse, e.g. the cached document did not change
+            self.update(Constants.EVENT_DONE, poll_reference)
 
     @overrides(AbstractWorker)
     def _cleanup(self):
         try:
             self.cleanup()
             with AbstractPoller._lock:
-                AbstractPoller._thread_count -= 1
-                if AbstractPoller._thread_count == 0:
+                AbstractPoller._thread_count[type(self)] -= 1
+                if AbstractPoller._thread_count[type(self)] == 0:
                     self.static_cleanup()
         except FatalException as e:
             raise FatalException() from e
@@ -112,6 +155,21 @@ class AbstractPoller(AbstractWorker):
     def get_topic(self):
         pass
 
+    @classmethod
+    def coalesce_key(cls, items):
+        """
+        Override this method to merge queued items of the poller's topic into one poll. Queued items with
+        the same key are merged with coalesce. Items with the key None are never merged.
+        """
+        return None
+
+    @classmethod
+    def coalesce(cls, queued, items):
+        """
+        :return the item that replaces the queued item `queued` when `items` with the same key is queued
+        """
+        return queued
+
     @abstractmethod
     def cleanup(self):
         """
@@ -5,6 +5,7 @@ from connarchitecture.constants import Constants
 from abc import abstractmethod
 from threading import Lock
 from queue import Empty
+import time
 
 
 class AbstractSender(AbstractWorker):
@@ -41,8 +42,7 @@ class AbstractSender(AbstractWorker):
     @overrides(AbstractWorker)
     def _step(self):
         try:
-            parser_result = self._in_queue.get(block=False)
-            poll_reference = parser_result.get_poll_reference()
+            parser_results, wait = self._get_batch(self._in_queue)
         except Empty:
             pass
         else:
@@ -51,14 +51,25 @@ class AbstractSender(AbstractWorker):
             clause because it avoids accidentally catching an exception that wasn’t raised 
             by the code being protected by the try ... except statement
             '''
+            start = time.monotonic()
+            parser_results = [r for r in parser_results if r.get_result()]
+            poll_references = [r.get_poll_reference() for r in parser_results]
             try:
-                if parser_result.get_result():
-                    self.process(parser_result.get_result(), poll_reference)
-                    self.update(Constants.EVENT_SEND, poll_reference)
+                if parser_results:
+                    if len(parser_results) == 1:
+                        self.process(parser_results[0].get_result(), poll_references[0])
+                    else:
+                        self.process_batch([r.get_result() for r in parser_results], poll_references)
+                    for poll_reference in poll_references:
+                        self.update(Constants.EVENT_SEND, poll_reference)
             except FatalException as e:
-                raise FatalException(poll_reference=poll_reference) from e
+                self._fail_batch(poll_references[1:])
+                raise FatalException(poll_reference=poll_references[0]) from e
             except Exception as e:
-                raise SenderException(poll_reference=poll_reference) from e
+                self._fail_batch(poll_references[1:])
+                raise SenderException(poll_reference=poll_references[0]) from e
+            finally:
+                self._record_work(start, count=len(poll_references), wait=wait)
 
     @overrides(AbstractWorker)
     def _cleanup(self):
@@ -95,6 +106,14 @@ class AbstractSender(AbstractWorker):
         """
         pass
 
+    def process_batch(self, inputs, poll_references):
+        """
+        Processes a batch of messages at once. Override this method to share fixed costs across a batch,
+        e.g. one transaction, see set_batching. Called instead of process for batches of more than one message.
+        """
+        for input, poll_reference in zip(inputs, poll_references):
+            self.process(input, poll_reference)
+
     @abstractmethod
     def cleanup(self):
         """
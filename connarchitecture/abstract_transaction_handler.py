@@ -1,12 +1,14 @@
 from connarchitecture.logging_component import LoggingComponent
 from connarchitecture.exceptions import ProcessException
+from connarchitecture.constants import Constants
+from connarchitecture.dispatching import Dispatching
 from queue import Empty
 from abc import ABC, abstractmethod
 import threading
 import time
 
 
-class AbstractTransactionHandler(ABC, threading.Thread, LoggingComponent):
+class AbstractTransactionHandler(ABC, threading.Thread, LoggingComponent, Dispatching):
     def __init__(self):
         threading.Thread.__init__(self)
         LoggingComponent.__init__(self, self.component_name())
@@ -15,13 +17,18 @@ class AbstractTransactionHandler(ABC, threading.Thread, LoggingComponent):
 
     def run(self):
         self.log("Started")
+        blocking = self._dispatch_mode == Constants.DISPATCH_MODE_BLOCKING
         while self._continue:
             try:
-                transaction = self._transaction_queue.get(block=False)
+                if blocking:
+                    transaction = self._transaction_queue.get(block=True, timeout=self._dispatch_timeout)
+                else:
+                    transaction = self._transaction_queue.get(block=False)
                 self.on_event(transaction.object, transaction.success)
             except Empty:
                 pass
-            time.sleep(0.1)
+            if not blocking:
+                time.sleep(Constants.POLLING_INTERVAL)
 
     def set_transaction_queue(self, queue):
         self._transaction_queue = queue
@@ -1,18 +1,94 @@
 from connarchitecture.logging_component import LoggingComponent
 from connarchitecture.exceptions import ProcessException
 from connarchitecture.models import Transaction
+from connarchitecture.constants import Constants
+from connarchitecture.dispatching import Dispatching
 import threading
 from abc import ABC, abstractmethod
 import time
-from queue import Empty
+from queue import Empty, Full
 
 
-class AbstractWorker(ABC, threading.Thread, LoggingComponent):
+class AbstractWorker(ABC, threading.Thread, LoggingComponent, Dispatching):
     def __init__(self, name):
         threading.Thread.__init__(self)
         LoggingComponent.__init__(self, name)
         self._transaction_queue = None
         self._continue = True
+        self._batch_size = Constants.DEFAULT_BATCH_SIZE
+        self._batch_timeout = Constants.DEFAULT_BATCH_TIMEOUT
+        self.processed_count = 0
+        self.busy_time = 0.0
+        self.batch_count = 0
+        self.batch_wait_time = 0.0
+
+    def set_batching(self, size, timeout=0):
+        """
+        Hands up to `size` items at once to the worker. After the first item arrives the worker waits at
+        most `timeout` milliseconds for the batch to fill up.
+        """
+        self._batch_size = max(1, size)
+        self._batch_timeout = max(0, timeout) / 1000
+
+    def _get_kwargs(self):
+        """
+        Keyword arguments to pass to the input queue's get method for the configured dispatch mode.
+        """
+        if self._dispatch_mode == Constants.DISPATCH_MODE_BLOCKING:
+            return {'block': True, 'timeout': self._dispatch_timeout}
+        else:
+            return {'block': False}
+
+    def _get_batch(self, queue):
+        """
+        Gets the next batch of up to `_batch_size` items from `queue`. Waits for the first item according to
+        the dispatch mode and raises Empty if there is none.
+        :return (items, seconds spent waiting for the batch to fill up)
+        """
+        items = [queue.get(**self._get_kwargs())]
+        start = time.monotonic()
+        deadline = start + self._batch_timeout
+        while len(items) < self._batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    items.append(queue.get(block=True, timeout=remaining))
+                else:
+                    items.append(queue.get(block=False))
+            except Empty:
+                break
+        return (items, time.monotonic() - start)
+
+    def _record_work(self, start, count=1, wait=0.0):
+        """
+        Accounts one batch of `count` processed items that took since `start` (time.monotonic()) to handle
+        after waiting `wait` seconds for the batch to fill up.
+        """
+        self.busy_time += time.monotonic() - start
+        self.processed_count += count
+        self.batch_count += 1
+        self.batch_wait_time += wait
+
+    def _fail_batch(self, poll_references):
+        """
+        A failing batch is reported as an exception for its first item. The other items fail with it.
+        """
+        for poll_reference in poll_references:
+            self.update(Constants.EVENT_ERROR, poll_reference)
+
+    def _put(self, queue, item):
+        """
+        Puts `item` into a possibly bounded output queue. Waits while the queue is full, but gives up
+        once the worker has been stopped so that shutdown cannot hang on a queue nobody drains anymore.
+        :return True if the item was queued
+        """
+        while True:
+            try:
+                queue.put(item, timeout=self._dispatch_timeout)
+                return True
+            except Full:
+                if not self._continue:
+                    return False
 
     def run(self):
         try:
@@ -20,7 +96,8 @@ class AbstractWorker(ABC, threading.Thread, LoggingComponent):
 
             while self._continue:
                 self._step()
-                time.sleep(0.1)
+                if self._dispatch_mode == Constants.DISPATCH_MODE_POLLING:
+                    time.sleep(Constants.POLLING_INTERVAL)
 
             self._cleanup()
 
@@ -0,0 +1,78 @@
+"""
+Minimal HTTP/1.1 GET client on top of asyncio streams, so that async pollers can keep many downloads in
+flight on one event loop without third-party dependencies. Every request uses its own connection.
+"""
+from urllib.parse import urlsplit
+import asyncio
+import ssl
+
+
+class HttpResponse:
+    def __init__(self, status: int, headers: dict[str, str], body: bytes):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    def __repr__(self):
+        return f'<HttpResponse(status={self.status}, length={len(self.body)})>'
+
+
+async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+    body = bytearray()
+    while True:
+        size_line = await reader.readline()
+        size = int(size_line.split(b';')[0].strip(), 16)
+        if size == 0:
+            # Skip trailers up to the terminating empty line
+            while (await reader.readline()).strip():
+                pass
+            return bytes(body)
+        body += await reader.readexactly(size)
+        await reader.readexactly(2)
+
+
+async def _get(url: str, headers: dict[str, str]) -> HttpResponse:
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    path = parts.path or '/'
+    if parts.query:
+        path += f'?{parts.query}'
+
+    reader, writer = await asyncio.open_connection(parts.hostname, port, ssl=ssl.create_default_context() if secure else None)
+    try:
+        request_headers = {'Host': parts.netloc, 'Connection': 'close', 'Accept-Encoding': 'identity'}
+        request_headers.update(headers or {})
+        request = f'GET {path} HTTP/1.1\r\n' + ''.join([f'{k}: {v}\r\n' for k, v in request_headers.items()]) + '\r\n'
+        writer.write(request.encode('latin-1'))
+        await writer.drain()
+
+        status_line = await reader.readline()
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            name, _, value = line.partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if status in (204, 304):
+            body = b''
+        elif response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            body = await _read_chunked(reader)
+        elif 'content-length' in response_headers:
+            body = await reader.readexactly(int(response_headers['content-length']))
+        else:
+            body = await reader.read()
+        return HttpResponse(status=status, headers=response_headers, body=body)
+    finally:
+        writer.close()
+
+
+async def fetch(url: str, headers: dict[str, str] = None, timeout: float = 30.0) -> HttpResponse:
+    """
+    Sends a GET request to `url`. Redirects are not followed.
+    :return the HttpResponse
+    """
+    return await asyncio.wait_for(_get(url, headers), timeout=timeout)
@@ -0,0 +1,50 @@
+from connarchitecture.logging_component import LoggingComponent
+import threading
+
+
+class Autoscaler(threading.Thread, LoggingComponent):
+    """
+    Periodically resizes worker pools within their Min/Max bounds. A pool grows (doubles) while items
+    wait in its input queue and its workers are busy, and shrinks by one thread while its input queue
+    is empty and its workers are mostly idle.
+    """
+
+    def __init__(self, pools, interval=5.0, high_utilization=0.75, low_utilization=0.25):
+        threading.Thread.__init__(self)
+        LoggingComponent.__init__(self, self.component_name())
+        self._pools = pools
+        self._interval = interval
+        self._high_utilization = high_utilization
+        self._low_utilization = low_utilization
+        self._stop_event = threading.Event()
+        self.daemon = True
+
+    def component_name(self):
+        return "Autoscaler"
+
+    def _target_size(self, pool):
+        size = pool.size()
+        backlog = pool.backlog()
+        if backlog > 0 and pool.utilization >= self._high_utilization:
+            return min(pool.max_threads, size * 2, size + backlog)
+        elif backlog == 0 and pool.utilization <= self._low_utilization:
+            return size - 1
+        return size
+
+    def scale(self):
+        for pool in self._pools():
+            pool.sample()
+            target = self._target_size(pool)
+            if target != pool.size():
+                pool.resize(target)
+
+    def run(self):
+        self.log("Started")
+        while not self._stop_event.wait(self._interval):
+            try:
+                self.scale()
+            except Exception as e:
+                self.log_exception(message="Autoscaling failed", exception=e)
+
+    def stop(self):
+        self._stop_event.set()
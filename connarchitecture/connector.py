@@ -2,9 +2,13 @@ from connarchitecture.exceptions import FatalException
 from connarchitecture.constants import Constants
 from connarchitecture.server import ThreadedServer
 from connarchitecture.decorators import overrides
-from connarchitecture.queue import ConnectorQueue
+from connarchitecture.queue import ConnectorQueue, OVERFLOW_BLOCK
+from connarchitecture.durable_queue import DurableConnectorQueue
 from connarchitecture.models import Transaction
 from connarchitecture.dir_watcher import DirWatcher
+from connarchitecture.worker_pool import WorkerPool
+from connarchitecture.autoscaler import Autoscaler
+from connarchitecture.rate_limiter import RateLimiter
 import json
 import configparser
 from queue import Empty
@@ -20,8 +24,22 @@ class ConnectorStatistics(ABC):
     polled_count = 0
     parsed_count = 0
     completed_count = 0
+    done_count = 0
+    unavailable_count = 0
     error_count = 0
     last_error = None
+    event_count = 0
+    event_backlog = 0
+    event_lag_last = 0.0
+    event_lag_max = 0.0
+    event_lag_total = 0.0
+
+    @staticmethod
+    def record_event_lag(lag):
+        ConnectorStatistics.event_count += 1
+        ConnectorStatistics.event_lag_last = lag
+        ConnectorStatistics.event_lag_total += lag
+        ConnectorStatistics.event_lag_max = max(ConnectorStatistics.event_lag_max, lag)
 
     @staticmethod
     def get_statistics():
@@ -29,9 +47,14 @@ class ConnectorStatistics(ABC):
         stats += f"{'Polled':>15}: {ConnectorStatistics.polled_count}\n"
         stats += f"{'Parsed':>15}: {ConnectorStatistics.parsed_count}\n"
         stats += f"{'Completed':>15}: {ConnectorStatistics.completed_count}\n"
+        stats += f"{'Nothing to send':>15}: {ConnectorStatistics.done_count}\n"
+        stats += f"{'Not available':>15}: {ConnectorStatistics.unavailable_count}\n"
         stats += f"{'Errors':>15}: {ConnectorStatistics.error_count}\n"
+        avg_lag = ConnectorStatistics.event_lag_total / ConnectorStatistics.event_count if ConnectorStatistics.event_count else 0.0
+        stats += f"{'Events':>15}: {ConnectorStatistics.event_count} (backlog: {ConnectorStatistics.event_backlog})\n"
+        stats += f"{'Event lag':>15}: last {ConnectorStatistics.event_lag_last*1000:.1f}ms, avg {avg_lag*1000:.1f}ms, max {ConnectorStatistics.event_lag_max*1000:.1f}ms\n"
         if ConnectorStatistics.last_error is not None:
-            stats += f"{'Last error':>15}: {ConnectorStatistics.last_error}"
+            stats += f"{'Last error':>15}: {ConnectorStatistics.last_error}\n"
         return stats
 
 
@@ -39,20 +62,33 @@ class Connector(ThreadedServer):
     CMD_STOP = ('stop', 'stop connector')
     CMD_STATS = ('stats', 'show statistics')
     CMD_HEAD = ('head', 'show the first items in the queues')
-    COMMANDS = [CMD_STOP, CMD_STATS, CMD_HEAD]
+    CMD_POOLS = ('pools', 'show the worker pools')
+    CMD_RESIZE = ('resize', 'resize a worker pool: resize <pool> <threads>')
+    CMD_CACHE = ('cache', 'manage the cache: cache rebuild|gc|stats')
+    COMMANDS = [CMD_STOP, CMD_STATS, CMD_HEAD, CMD_POOLS, CMD_RESIZE, CMD_CACHE]
 
     def __init__(self, config_path):
         self._load_config(config_path)
         ThreadedServer.__init__(self, self._name, self._host, self._port)
-        self._poller_in_queue = ConnectorQueue()
-        self._poller_out_queue = ConnectorQueue()
-        self._parser_out_queue = ConnectorQueue()
-        self._pollers = []
-        self._parsers = []
-        self._senders = []
+        for rate_limit in self._rate_limits:
+            RateLimiter.configure(**rate_limit)
+        if self._poller_in_queue_store:
+            self._poller_in_queue = DurableConnectorQueue(path=self._poller_in_queue_store, maxsize=self._poller_in_queue_size, overflow=self._queue_overflow)
+            self.log(f"Resuming poller requests from {self._poller_in_queue_store} ({self._poller_in_queue.resumed()} were in flight)")
+        else:
+            self._poller_in_queue = ConnectorQueue(maxsize=self._poller_in_queue_size, overflow=self._queue_overflow)
+        for poller_config in self._poller_classes_config.values():
+            self._poller_in_queue.set_coalescer(poller_config['topic'], poller_config['class'].coalesce_key, poller_config['class'].coalesce)
+        self._poller_out_queue = ConnectorQueue(maxsize=self._poller_out_queue_size, overflow=self._queue_overflow)
+        self._parser_out_queue = ConnectorQueue(maxsize=self._parser_out_queue_size, overflow=self._queue_overflow)
+        self._poller_pools = []
+        self._parser_pool = None
+        self._sender_pool = None
+        self._autoscaler = None
         self._event_queue = ConnectorQueue()
         self.set_event_queue(self._event_queue)
         self._transaction_handler = None
+        self._cache = None
         if self._transaction_handler_class:
             self._transaction_queue = ConnectorQueue()
         else:
@@ -73,8 +109,12 @@ class Connector(ThreadedServer):
         self._name = config.get(Constants.CONFIG_SECTION_CONNECTOR, Constants.CONFIG_CONNECTOR_NAME)
         self._host = config.get(Constants.CONFIG_SECTION_CONNECTOR, Constants.CONFIG_CONNECTOR_HOST)
         self._port = int(config.get(Constants.CONFIG_SECTION_CONNECTOR, Constants.CONFIG_CONNECTOR_PORT))
+        self._dispatch_mode = config.get(Constants.CONFIG_SECTION_CONNECTOR, Constants.CONFIG_CONNECTOR_DISPATCH_MODE, fallback=Constants.DISPATCH_MODE_BLOCKING)
+        self._dispatch_timeout = config.getfloat(Constants.CONFIG_SECTION_CONNECTOR, Constants.CONFIG_CONNECTOR_DISPATCH_TIMEOUT, fallback=Constants.DEFAULT_DISPATCH_TIMEOUT)
+        self._event_batch_size = config.getint(Constants.CONFIG_SECTION_CONNECTOR, Constants.CONFIG_CONNECTOR_EVENT_BATCH_SIZE, fallback=Constants.DEFAULT_EVENT_BATCH_SIZE)
 
         self._directory_watcher_directory = config.get(Constants.CONFIG_SECTION_CDIRECTORY_WATCHER, Constants.CONFIG_DIRECTORY_WATCHER_DIRECTORY)
+        self._directory_watcher_frames_threshold = config.getint(Constants.CONFIG_SECTION_CDIRECTORY_WATCHER, Constants.CONFIG_DIRECTORY_WATCHER_FRAMES_THRESHOLD, fallback=0)
 
         self._poller_classes_config = {}
         for section in config.sections():
@@ -91,11 +131,40 @@ class Connector(ThreadedServer):
         self._min_parser_threads = int(config.get(Constants.CONFIG_SECTION_PARSER, Constants.CONFIG_PARSER_MIN_THREADS))
         self._max_parser_threads = int(config.get(Constants.CONFIG_SECTION_PARSER, Constants.CONFIG_PARSER_MAX_THREADS))
         self._parser_args = json.loads(config.get(Constants.CONFIG_SECTION_PARSER, Constants.CONFIG_PARSER_ARGS))
+        self._parser_batch_size = config.getint(Constants.CONFIG_SECTION_PARSER, Constants.CONFIG_PARSER_BATCH_SIZE, fallback=Constants.DEFAULT_BATCH_SIZE)
+        self._parser_batch_timeout = config.getfloat(Constants.CONFIG_SECTION_PARSER, Constants.CONFIG_PARSER_BATCH_TIMEOUT, fallback=Constants.DEFAULT_BATCH_TIMEOUT)
 
         self._sender_class = self._load_class(config.get(Constants.CONFIG_SECTION_SENDER, Constants.CONFIG_SENDER_CLASS))
         self._min_sender_threads = int(config.get(Constants.CONFIG_SECTION_SENDER, Constants.CONFIG_SENDER_MIN_THREADS))
         self._max_sender_threads = int(config.get(Constants.CONFIG_SECTION_SENDER, Constants.CONFIG_SENDER_MAX_THREADS))
         self._sender_args = json.loads(config.get(Constants.CONFIG_SECTION_SENDER, Constants.CONFIG_SENDER_ARGS))
+        self._sender_batch_size = config.getint(Constants.CONFIG_SECTION_SENDER, Constants.CONFIG_SENDER_BATCH_SIZE, fallback=Constants.DEFAULT_BATCH_SIZE)
+        self._sender_batch_timeout = config.getfloat(Constants.CONFIG_SECTION_SENDER, Constants.CONFIG_SENDER_BATCH_TIMEOUT, fallback=Constants.DEFAULT_BATCH_TIMEOUT)
+
+        self._poller_in_queue_size = config.getint(Constants.CONFIG_SECTION_QUEUE, Constants.CONFIG_QUEUE_POLLER_IN_SIZE, fallback=0)
+        self._poller_out_queue_size = config.getint(Constants.CONFIG_SECTION_QUEUE, Constants.CONFIG_QUEUE_POLLER_OUT_SIZE, fallback=0)
+        self._parser_out_queue_size = config.getint(Constants.CONFIG_SECTION_QUEUE, Constants.CONFIG_QUEUE_PARSER_OUT_SIZE, fallback=0)
+        self._queue_overflow = config.get(Constants.CONFIG_SECTION_QUEUE, Constants.CONFIG_QUEUE_OVERFLOW, fallback=OVERFLOW_BLOCK)
+        self._poller_in_queue_store = config.get(Constants.CONFIG_SECTION_QUEUE, Constants.CONFIG_QUEUE_POLLER_IN_STORE, fallback=None)
+
+        self._rate_limits = []
+        for section in config.sections():
+            if section.startswith(Constants.CONFIG_SECTION_RATE_LIMIT):
+                self._rate_limits.append({
+                    'host': config.get(section, Constants.CONFIG_RATE_LIMIT_HOST),
+                    'rate': config.getfloat(section, Constants.CONFIG_RATE_LIMIT_RATE),
+                    'burst': config.getfloat(section, Constants.CONFIG_RATE_LIMIT_BURST, fallback=1),
+                    'adaptive': config.getboolean(section, Constants.CONFIG_RATE_LIMIT_ADAPTIVE, fallback=False),
+                    'min_rate': config.getfloat(section, Constants.CONFIG_RATE_LIMIT_MIN_RATE, fallback=None),
+                    'backoff': config.getfloat(section, Constants.CONFIG_RATE_LIMIT_BACKOFF, fallback=0.5),
+                    'increase': config.getfloat(section, Constants.CONFIG_RATE_LIMIT_INCREASE, fallback=None)
+                })
+
+        self._autoscaler_enabled = config.has_section(Constants.CONFIG_SECTION_AUTOSCALER)
+        if self._autoscaler_enabled:
+            self._autoscaler_interval = config.getfloat(Constants.CONFIG_SECTION_AUTOSCALER, Constants.CONFIG_AUTOSCALER_INTERVAL, fallback=5.0)
+            self._autoscaler_high_utilization = config.getfloat(Constants.CONFIG_SECTION_AUTOSCALER, Constants.CONFIG_AUTOSCALER_HIGH_UTILIZATION, fallback=0.75)
+            self._autoscaler_low_utilization = config.getfloat(Constants.CONFIG_SECTION_AUTOSCALER, Constants.CONFIG_AUTOSCALER_LOW_UTILIZATION, fallback=0.25)
 
         if config.has_section(Constants.CONFIG_SECTION_TRANSACTION_HANDLER):
             self._transaction_handler_class = self._load_class(config.get(Constants.CONFIG_SECTION_TRANSACTION_HANDLER, Constants.CONFIG_TRANSACTION_HANDLER_CLASS))
@@ -103,63 +172,106 @@ class Connector(ThreadedServer):
         else:
             self._transaction_handler_class = None
 
+        if config.has_section(Constants.CONFIG_SECTION_CACHE):
+            self._cache_class = self._load_class(config.get(Constants.CONFIG_SECTION_CACHE, Constants.CONFIG_CACHE_CLASS))
+            self._cache_args = json.loads(config.get(Constants.CONFIG_SECTION_CACHE, Constants.CONFIG_CACHE_ARGS, fallback='{}'))
+        else:
+            self._cache_class = None
+
     def _get_num_of_cpu_threads(self):
         threads = 1
         cpus = multiprocessing.cpu_count()
         return max(threads, cpus)
 
+    def _initial_threads(self, min_threads, max_threads):
+        """
+        With autoscaling a pool starts small and grows on demand. Without it the pool size is
+        fixed and derived from the number of CPUs as before.
+        """
+        if self._autoscaler_enabled:
+            return min_threads
+        return max(min_threads, min(max_threads, self._get_num_of_cpu_threads()))
+
     def _setup_pollers(self):
-        threads = []
-        cpus = self._get_num_of_cpu_threads()
+        pools = []
 
         for key in self._poller_classes_config:
-            poller_class = self._poller_classes_config[key]['class']
-            num_of_threads = max(self._poller_classes_config[key]['min_poller_threads'], min(self._poller_classes_config[key]['max_poller_threads'], cpus))
-            name_prefix = poller_class.__name__
-            for i in range(num_of_threads):
-                t = poller_class(f"{name_prefix}-{i+1}", **self._poller_classes_config[key]['poller_args'])
+            poller_config = self._poller_classes_config[key]
+
+            def factory(name, poller_config=poller_config):
+                t = poller_config['class'](name, **poller_config['poller_args'])
                 t.set_in_queue(self._poller_in_queue)
                 t.set_out_queue(self._poller_out_queue)
                 t.set_event_queue(self._event_queue)
-                t.set_topic(self._poller_classes_config[key]['topic'])
-                threads.append(t)
-        return threads
+                t.set_topic(poller_config['topic'])
+                t.set_dispatch_mode(self._dispatch_mode, self._dispatch_timeout)
+                return t
+
+            pools.append(WorkerPool(name=key.lower(),
+                                    factory=factory,
+                                    name_prefix=poller_config['class'].__name__,
+                                    min_threads=poller_config['min_poller_threads'],
+                                    max_threads=poller_config['max_poller_threads'],
+                                    backlog=lambda topic=poller_config['topic']: self._poller_in_queue.topic_qsize(topic)))
+        return pools
 
     def _setup_parsers(self):
-        threads = []
-        cpus = self._get_num_of_cpu_threads()
-        num_of_threads = max(self._min_parser_threads, min(self._max_parser_threads, cpus))
-        name_prefix = self._parser_class.__name__
-        for i in range(num_of_threads):
-            t = self._parser_class(f"{name_prefix}-{i+1}", **self._parser_args)
+        def factory(name):
+            t = self._parser_class(name, **self._parser_args)
             t.set_in_queue(self._poller_out_queue)
             t.set_out_queue(self._parser_out_queue)
             t.set_event_queue(self._event_queue)
-            threads.append(t)
-        return threads
+            t.set_dispatch_mode(self._dispatch_mode, self._dispatch_timeout)
+            t.set_batching(self._parser_batch_size, self._parser_batch_timeout)
+            return t
+
+        return WorkerPool(name=Constants.CONFIG_SECTION_PARSER.lower(),
+                          factory=factory,
+                          name_prefix=self._parser_class.__name__,
+                          min_threads=self._min_parser_threads,
+                          max_threads=self._max_parser_threads,
+                          backlog=self._poller_out_queue.qsize)
 
     def _setup_senders(self):
-        threads = []
-        cpus = self._get_num_of_cpu_threads()
-        num_of_threads = max(self._min_sender_threads, min(self._max_sender_threads, cpus))
-        name_prefix = self._sender_class.__name__
-        for i in range(num_of_threads):
-            t = self._sender_class(f"{name_prefix}-{i+1}", **self._sender_args)
+        def factory(name):
+            t = self._sender_class(name, **self._sender_args)
             t.set_in_queue(self._parser_out_queue)
             t.set_event_queue(self._event_queue)
-            threads.append(t)
-        return threads
+            t.set_dispatch_mode(self._dispatch_mode, self._dispatch_timeout)
+            t.set_batching(self._sender_batch_size, self._sender_batch_timeout)
+            return t
+
+        return WorkerPool(name=Constants.CONFIG_SECTION_SENDER.lower(),
+                          factory=factory,
+                          name_prefix=self._sender_class.__name__,
+                          min_threads=self._min_sender_threads,
+                          max_threads=self._max_sender_threads,
+                          backlog=self._parser_out_queue.qsize)
+
+    def _pools(self):
+        return self._poller_pools + [pool for pool in [self._parser_pool, self._sender_pool] if pool]
+
+    def _find_pool(self, name):
+        for pool in self._pools():
+            if pool.get_name() == name:
+                return pool
+        return None
 
     def _setup_transaction_handler(self):
         handler = self._transaction_handler_class(**self._transaction_handler_args)
         handler.set_transaction_queue(self._transaction_queue)
+        handler.set_dispatch_mode(self._dispatch_mode, self._dispatch_timeout)
         return handler
 
     def _setup_workers(self):
-        pollers = self._setup_pollers()
-        parsers = self._setup_parsers()
-        senders = self._setup_senders()
-        return (pollers, parsers, senders)
+        poller_pools = self._setup_pollers()
+        parser_pool = self._setup_parsers()
+        sender_pool = self._setup_senders()
+        return (poller_pools, parser_pool, sender_pool)
+
+    def _start_pools(self, pools):
+        for pool in pools:
+            pool.resize(self._initial_threads(pool.min_threads, pool.max_threads))
 
     def _start_workers(self, threads):
         for t in threads:
@@ -173,7 +285,13 @@ class Connector(ThreadedServer):
     def _start_dir_watcher(self, dir, queue):
         if not os.path.exists(dir):
             os.makedirs(dir)
-        dir_watcher = DirWatcher(dir_to_watch=dir, queue=queue)
+        # Frames are only planned if a poller serves them and one serves the concept requests the frame pollers
+        # queue for the tickers a frame does not cover
+        topics = set([c['topic'] for c in self._poller_classes_config.values()])
+        frames_threshold = self._directory_watcher_frames_threshold if {Constants.TOPIC_FRAME, Constants.TOPIC_CONCEPT} <= topics else 0
+        if self._directory_watcher_frames_threshold and not frames_threshold:
+            self.log_warning(message=f"{Constants.CONFIG_DIRECTORY_WATCHER_FRAMES_THRESHOLD} needs a {Constants.TOPIC_FRAME} and a {Constants.TOPIC_CONCEPT} poller, requests are not planned as frames")
+        dir_watcher = DirWatcher(dir_to_watch=dir, queue=queue, frames_threshold=frames_threshold)
         dir_watcher_thread = Thread(target=dir_watcher.run, args=())
         dir_watcher_thread.daemon = True
         dir_watcher_thread.start()
@@ -183,21 +301,43 @@ class Connector(ThreadedServer):
             t.stop()
 
     def _stop(self):
-        self._stop_workers(self._pollers)
-        self._stop_workers(self._parsers)
-        self._stop_workers(self._senders)
+        if self._autoscaler:
+            self._autoscaler.stop()
+
+        for pool in self._pools():
+            pool.stop()
         if self._transaction_handler:
             self._stop_workers([self._transaction_handler])
 
         self.stop_server()
 
-        self._join_workers(self._pollers)
-        self._join_workers(self._parsers)
-        self._join_workers(self._senders)
+        for pool in self._pools():
+            pool.join()
 
         if self._transaction_handler:
             self._join_workers([self._transaction_handler])
 
+        if self._cache:
+            self._cache.cleanup()
+
+        self._acknowledge_remaining_events()
+        self._poller_in_queue.close()
+
+    def _acknowledge_remaining_events(self):
+        # Results of the last items may still wait in the event queue. Acknowledge them, so that a durable
+        # input queue does not serve them again after a restart.
+        while True:
+            try:
+                event = self._event_queue.get(block=False)
+            except Empty:
+                return
+            poll_reference = event.get_poll_reference()
+            if poll_reference and poll_reference.work_id is not None:
+                if event.exception or event.type == Constants.EVENT_ERROR:
+                    self._poller_in_queue.ack(poll_reference.work_id, success=False)
+                elif event.type in (Constants.EVENT_SEND, Constants.EVENT_DONE, Constants.EVENT_UNAVAILABLE):
+                    self._poller_in_queue.ack(poll_reference.work_id, success=True)
+
     def _kill(self):
         self.disconnect()
         self._stop()
@@ -211,6 +351,34 @@ class Connector(ThreadedServer):
             ConnectorStatistics.parsed_count += 1
         elif event.type == Constants.EVENT_SEND:
             ConnectorStatistics.completed_count += 1
+        elif event.type == Constants.EVENT_DONE:
+            ConnectorStatistics.done_count += 1
+        elif event.type == Constants.EVENT_UNAVAILABLE:
+            ConnectorStatistics.unavailable_count += 1
+
+    def _queue_statistics(self):
+        result = ""
+        result += self._poller_in_queue.statistics(name='Poller in')
+        result += self._poller_out_queue.statistics(name='Poller out')
+        result += self._parser_out_queue.statistics(name='Parser out')
+        return result
+
+    def _pools_status(self):
+        result = ""
+        for pool in self._pools():
+            if not self._autoscaler:
+                pool.sample()
+            result += f"{pool.get_name():>15}: {pool.status()}\n"
+        return result
+
+    def _resize(self, args):
+        if len(args) != 2 or not args[1].isdigit():
+            return f"Usage: {Connector.CMD_RESIZE[1]}"
+        pool = self._find_pool(args[0])
+        if not pool:
+            return f"Unknown pool '{args[0]}'. Available pools: {', '.join([p.get_name() for p in self._pools()])}"
+        size = pool.resize(int(args[1]))
+        return f"{pool.get_name()} resized to {size} thread(s)"
 
     def _head(self):
         result = ""
@@ -220,6 +388,8 @@ class Connector(ThreadedServer):
         return result
 
     def _commit(self, poll_reference, success):
+        if poll_reference and poll_reference.work_id is not None:
+            self._poller_in_queue.ack(poll_reference.work_id, success)
         if self._transaction_queue:
             self._transaction_queue.put(Transaction(poll_reference, success))
 
@@ -227,14 +397,24 @@ class Connector(ThreadedServer):
         utc_dt = datetime.now(timezone.utc)  # UTC time
         self._start_time = utc_dt.astimezone()  # local time
 
+        if self._cache_class:
+            # Before the pollers start, so their first lookups are answered by the cache
+            self._cache = self._cache_class(**self._cache_args)
+            self._cache.initialize()
+
         if self._transaction_handler_class:
             self._transaction_handler = self._setup_transaction_handler()
 
-        self._pollers, self._parsers, self._senders = self._setup_workers()
+        self._poller_pools, self._parser_pool, self._sender_pool = self._setup_workers()
+
+        self._start_pools(self._pools())
 
-        self._start_workers(self._pollers)
-        self._start_workers(self._parsers)
-        self._start_workers(self._senders)
+        if self._autoscaler_enabled:
+            self._autoscaler = Autoscaler(pools=self._pools,
+                                          interval=self._autoscaler_interval,
+                                          high_utilization=self._autoscaler_high_utilization,
+                                          low_utilization=self._autoscaler_low_utilization)
+            self._autoscaler.start()
 
         if self._transaction_handler:
             self._start_workers([self._transaction_handler])
@@ -245,26 +425,46 @@ class Connector(ThreadedServer):
 
         self._continue = True
         while self._continue:
+            self._dispatch_events()
+
+    def _dispatch_events(self):
+        """
+        Waits for the next event and then handles up to EventBatchSize queued events without waiting.
+        """
+        try:
+            event = self._event_queue.get(block=True, timeout=self._dispatch_timeout)
+        except Empty:
+            return
+
+        dispatched = 0
+        while True:
+            self._dispatch_event(event)
+            dispatched += 1
+            if not self._continue or dispatched >= self._event_batch_size:
+                break
             try:
                 event = self._event_queue.get(block=False)
             except Empty:
-                pass
-            else:
-                self._update_statistics(event)
+                break
 
-                if not event.exception and (event.type == Constants.EVENT_SEND or event.type == Constants.EVENT_DONE):
-                    self._commit(event.get_poll_reference(), success=True)
+        ConnectorStatistics.event_backlog = self._event_queue.qsize()
 
-                if event.exception or event.type == Constants.EVENT_ERROR:
-                    if event.exception:
-                        self.log_exception(exception=event.exception)
+    def _dispatch_event(self, event):
+        ConnectorStatistics.record_event_lag(time.monotonic() - event.created)
+        self._update_statistics(event)
+
+        if not event.exception and event.type in (Constants.EVENT_SEND, Constants.EVENT_DONE, Constants.EVENT_UNAVAILABLE):
+            self._commit(event.get_poll_reference(), success=True)
+
+        if event.exception or event.type == Constants.EVENT_ERROR:
+            if event.exception:
+                self.log_exception(exception=event.exception)
 
-                    self._commit(event.get_poll_reference(), success=False)
-                    ConnectorStatistics.last_error = event.exception
-                    if event.exception:
-                        if isinstance(event.exception, FatalException):
-                            self._kill()
-            time.sleep(1)
+            self._commit(event.get_poll_reference(), success=False)
+            ConnectorStatistics.last_error = event.exception
+            if event.exception:
+                if isinstance(event.exception, FatalException):
+                    self._kill()
 
     def disconnect(self):
         self._continue = False
@@ -278,9 +478,9 @@ class Connector(ThreadedServer):
 
         poller_classes = ", ".join([self._poller_classes_config[s]['class'].__name__ for s in self._poller_classes_config])
 
-        hello += f"{'Poller':>10}: {poller_classes} - Total threads: ({len(self._pollers)})\n"
-        hello += f"{'Parser':>10}: {self._parser_class.__name__} - Total threads: ({len(self._parsers)})\n"
-        hello += f"{'Sender':>10}: {self._sender_class.__name__} - Total threads: ({len(self._senders)})\n"
+        hello += f"{'Poller':>10}: {poller_classes} - Total threads: ({sum([pool.size() for pool in self._poller_pools])})\n"
+        hello += f"{'Parser':>10}: {self._parser_class.__name__} - Total threads: ({self._parser_pool.size()})\n"
+        hello += f"{'Sender':>10}: {self._sender_class.__name__} - Total threads: ({self._sender_pool.size()})\n"
         hello += "-------------------------------------------------------------\n"
         hello += "Connector commands:\n"
         hello += "-------------------------------------------------------------\n"
@@ -291,14 +491,25 @@ class Connector(ThreadedServer):
 
     @overrides(ThreadedServer)
     def event_received(self, server_event):
-        cmd = server_event.message
+        cmd, *args = server_event.message.split() or ['']
         self.log(f"received server event {server_event}")
         if cmd == Connector.CMD_STATS[0]:
             stats = ConnectorStatistics.get_statistics()
+            stats += self._queue_statistics()
+            stats += RateLimiter.statistics()
+            stats += self._parser_class.statistics()
+            if self._cache:
+                stats += self._cache.statistics()
             self.send_msg(server_event.client_connection, stats)
         elif cmd == Connector.CMD_HEAD[0]:
             head = self._head()
             self.send_msg(server_event.client_connection, head)
+        elif cmd == Connector.CMD_POOLS[0]:
+            self.send_msg(server_event.client_connection, self._pools_status())
+        elif cmd == Connector.CMD_RESIZE[0]:
+            self.send_msg(server_event.client_connection, self._resize(args))
+        elif cmd == Connector.CMD_CACHE[0]:
+            self.send_msg(server_event.client_connection, self._cache.command(args) if self._cache else "No cache configured")
         elif cmd == Connector.CMD_STOP[0]:
             self._kill()
         else:
@@ -7,12 +7,20 @@ class Constants:
     CONFIG_SECTION_PARSER = 'PARSER'
     CONFIG_SECTION_SENDER = 'SENDER'
     CONFIG_SECTION_TRANSACTION_HANDLER = 'TRANSACTION_HANDLER'
+    CONFIG_SECTION_QUEUE = 'QUEUE'
+    CONFIG_SECTION_AUTOSCALER = 'AUTOSCALER'
+    CONFIG_SECTION_RATE_LIMIT = 'RATE_LIMIT_'
+    CONFIG_SECTION_CACHE = 'CACHE'
 
     CONFIG_CONNECTOR_NAME = 'Name'
     CONFIG_CONNECTOR_HOST = 'Host'
     CONFIG_CONNECTOR_PORT = 'Port'
+    CONFIG_CONNECTOR_DISPATCH_MODE = 'DispatchMode'
+    CONFIG_CONNECTOR_DISPATCH_TIMEOUT = 'DispatchTimeout'
+    CONFIG_CONNECTOR_EVENT_BATCH_SIZE = 'EventBatchSize'
 
     CONFIG_DIRECTORY_WATCHER_DIRECTORY = 'Directory'
+    CONFIG_DIRECTORY_WATCHER_FRAMES_THRESHOLD = 'FramesThreshold'
 
     CONFIG_POLLER_CLASS = 'Class'
     CONFIG_POLLER_TOPIC = 'Topic'
@@ -24,17 +32,53 @@ class Constants:
     CONFIG_PARSER_ARGS = 'Args'
     CONFIG_PARSER_MIN_THREADS = 'MinThreads'
     CONFIG_PARSER_MAX_THREADS = 'MaxThreads'
+    CONFIG_PARSER_BATCH_SIZE = 'BatchSize'
+    CONFIG_PARSER_BATCH_TIMEOUT = 'BatchTimeout'
 
     CONFIG_SENDER_CLASS = 'Class'
     CONFIG_SENDER_ARGS = 'Args'
     CONFIG_SENDER_MIN_THREADS = 'MinThreads'
     CONFIG_SENDER_MAX_THREADS = 'MaxThreads'
+    CONFIG_SENDER_BATCH_SIZE = 'BatchSize'
+    CONFIG_SENDER_BATCH_TIMEOUT = 'BatchTimeout'
 
     CONFIG_TRANSACTION_HANDLER_CLASS = 'Class'
     CONFIG_TRANSACTION_HANDLER_ARGS = 'Args'
 
+    CONFIG_QUEUE_POLLER_IN_SIZE = 'PollerInQueueSize'
+    CONFIG_QUEUE_POLLER_OUT_SIZE = 'PollerOutQueueSize'
+    CONFIG_QUEUE_PARSER_OUT_SIZE = 'ParserOutQueueSize'
+    CONFIG_QUEUE_OVERFLOW = 'Overflow'
+    CONFIG_QUEUE_POLLER_IN_STORE = 'PollerInQueueStore'
+
+    CONFIG_AUTOSCALER_INTERVAL = 'Interval'
+    CONFIG_AUTOSCALER_HIGH_UTILIZATION = 'HighUtilization'
+    CONFIG_AUTOSCALER_LOW_UTILIZATION = 'LowUtilization'
+
+    CONFIG_RATE_LIMIT_HOST = 'Host'
+    CONFIG_RATE_LIMIT_RATE = 'Rate'
+    CONFIG_RATE_LIMIT_BURST = 'Burst'
+    CONFIG_RATE_LIMIT_ADAPTIVE = 'Adaptive'
+    CONFIG_RATE_LIMIT_MIN_RATE = 'MinRate'
+    CONFIG_RATE_LIMIT_BACKOFF = 'Backoff'
+    CONFIG_RATE_LIMIT_INCREASE = 'Increase'
+
+    CONFIG_CACHE_CLASS = 'Class'
+    CONFIG_CACHE_ARGS = 'Args'
+
     EVENT_POLLED = 'POLLED'
     EVENT_PARSED = 'PARSED'
     EVENT_SEND = 'SEND'
     EVENT_DONE = 'DONE'
+    EVENT_UNAVAILABLE = 'UNAVAILABLE'
     EVENT_ERROR = 'ERROR'
+
+    DISPATCH_MODE_BLOCKING = 'blocking'
+    DISPATCH_MODE_POLLING = 'polling'
+    DEFAULT_DISPATCH_TIMEOUT = 0.5
+    POLLING_INTERVAL = 0.1
+    DEFAULT_EVENT_BATCH_SIZE = 1000
+    DEFAULT_BATCH_SIZE = 1
+    DEFAULT_BATCH_TIMEOUT = 0
+    TOPIC_CONCEPT = 'concept'
+    TOPIC_FRAME = 'frame'
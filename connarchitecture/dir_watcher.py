@@ -1,4 +1,5 @@
 from connarchitecture.logging_component import LoggingComponent
+from connarchitecture.constants import Constants
 import time
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
@@ -7,15 +8,16 @@ import json
 
 
 class DirWatcher(LoggingComponent):
-    def __init__(self, dir_to_watch, queue):
+    def __init__(self, dir_to_watch, queue, frames_threshold=0):
         LoggingComponent.__init__(self, self.component_name())
         self._dir_to_watch = dir_to_watch
         self._queue = queue
+        self._frames_threshold = frames_threshold
         self.observer = Observer()
 
     def run(self):
         self.log(f"Watching {self._dir_to_watch}")
-        event_handler = Handler(name=self.component_name(), queue=self._queue, dir_to_watch=self._dir_to_watch)
+        event_handler = Handler(name=self.component_name(), queue=self._queue, dir_to_watch=self._dir_to_watch, frames_threshold=self._frames_threshold)
         self.observer.schedule(event_handler, self._dir_to_watch, recursive=False)
         self.observer.start()
         try:
@@ -29,35 +31,50 @@ class DirWatcher(LoggingComponent):
 
 
 class Handler(FileSystemEventHandler, LoggingComponent):
-    def __init__(self, name, queue, dir_to_watch):
+    def __init__(self, name, queue, dir_to_watch, frames_threshold=0):
         FileSystemEventHandler.__init__(self)
         LoggingComponent.__init__(self, name)
         self._dir_to_watch = dir_to_watch
         self._queue = queue
+        self._frames_threshold = frames_threshold
         self._load_files(dir=self._dir_to_watch)
 
-    def _file_topic(self, file: str) -> str:
+    def _load_request(self, file: str) -> dict:
+        """
+        :return the parsed request file, which is read once for its topic, priority and items
+        """
         with open(file, 'r') as json_file:
             try:
-                json_data = json.load(json_file)
-                topic = json_data['topic']
-                return topic
+                return json.load(json_file)
             except Exception as e:
                 self.log_exception(message=f'Unable to load json {file}', exception=e)
+        return None
+
+    def _file_priority(self, file: str, json_data: dict) -> int:
+        try:
+            return int(json_data.get('priority', 0))
+        except Exception as e:
+            self.log_exception(message=f'Unable to load priority from {file}', exception=e)
+        return 0
 
     def _handle_file(self, file: str):
         file_name = os.path.splitext(os.path.basename(file))[0]
         if not file_name.startswith("."):
+            mtime = os.path.getmtime(file)
+            if self._queue.is_enumerated(source=file, mtime=mtime):
+                self.log(f"Skipping {file}, already queued")
+                return
             tuples = []
-            topic = self._file_topic(file=file)
-            if topic == 'concept':
-                tuples = self._generate_concept_tuples(file=file)
+            json_data = self._load_request(file=file)
+            if json_data is None:
+                return
+            topic = json_data.get('topic')
+            priority = self._file_priority(file=file, json_data=json_data)
+            if topic == Constants.TOPIC_CONCEPT:
+                tuples = self._generate_concept_tuples(file=file, json_data=json_data, priority=priority)
             elif topic == 'price':
-                tuples = self._generate_price_tuples(file=file)
-            for t in tuples:
-                topic = t[0]
-                #self.log(f"Adding '{t}' to queue")
-                self._queue.put_topic(topic, t[1:])
+                tuples = self._generate_price_tuples(file=file, json_data=json_data)
+            self._queue.put_source(source=file, mtime=mtime, topic_items=[(t[0], t[1:]) for t in tuples], priority=priority)
 
     def _load_files(self, dir):
         for f in os.listdir(dir):
@@ -65,39 +82,43 @@ class Handler(FileSystemEventHandler, LoggingComponent):
             if os.path.isfile(path):
                 self._handle_file(file=path)
 
-    def _generate_concept_tuples(self, file: str) -> list[(str, int, str)]:
+    def _generate_concept_tuples(self, file: str, json_data: dict, priority: int) -> list[(str, int, str)]:
         result = []
-        with open(file, 'r') as json_file:
-            try:
-                json_data = json.load(json_file)
-                topic = json_data['topic']
-                for resource in json_data['resources']:
-                    for ticker in resource['tickers']:
-                        concepts = resource['concepts']
-                        for concept in concepts:
-                            concept_name = concept['name']
-                            year = concept['year']
-                            units = concept['units']
-                            result.append((topic, ticker, concept_name, int(year), units))
+        try:
+            topic = json_data['topic']
+            for resource in json_data['resources']:
+                if self._frames_threshold and len(resource['tickers']) >= self._frames_threshold:
+                    # One frame has a concept for all companies, which beats one request per ticker. The frame
+                    # poller queues the tickers it cannot serve as concept requests of this file.
+                    tickers = tuple(resource['tickers'])
+                    for concept in resource['concepts']:
+                        result.append((Constants.TOPIC_FRAME, concept['name'], int(concept['year']), concept['units'], tickers, priority, file))
+                    continue
 
-            except Exception as e:
-                self.log_exception(message=f'Unable to load json {file}', exception=e)
+                for ticker in resource['tickers']:
+                    concepts = resource['concepts']
+                    for concept in concepts:
+                        concept_name = concept['name']
+                        year = concept['year']
+                        units = concept['units']
+                        result.append((topic, ticker, concept_name, int(year), units))
+
+        except Exception as e:
+            self.log_exception(message=f'Unable to load json {file}', exception=e)
         return result
 
-    def _generate_price_tuples(self, file: str) -> list[(str, int, str)]:
+    def _generate_price_tuples(self, file: str, json_data: dict) -> list[(str, int, str)]:
         result = []
-        with open(file, 'r') as json_file:
-            try:
-                json_data = json.load(json_file)
-                topic = json_data['topic']
-                for resource in json_data['resources']:
-                    for ticker in resource['tickers']:
-                        years = resource['years']
-                        for y in years:
-                            result.append((topic, ticker, int(y)))
+        try:
+            topic = json_data['topic']
+            for resource in json_data['resources']:
+                for ticker in resource['tickers']:
+                    years = resource['years']
+                    for y in years:
+                        result.append((topic, ticker, int(y)))
 
-            except Exception as e:
-                self.log_exception(message=f'Unable to load json {file}', exception=e)
+        except Exception as e:
+            self.log_exception(message=f'Unable to load json {file}', exception=e)
         return result
 
     def on_any_event(self, event):
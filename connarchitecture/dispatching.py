@@ -0,0 +1,20 @@
+from connarchitecture.constants import Constants
+
+
+class Dispatching:
+    """
+    Mixin for threads that take their work from a queue: workers and the transaction handler.
+    """
+    _dispatch_mode = Constants.DISPATCH_MODE_BLOCKING
+    _dispatch_timeout = Constants.DEFAULT_DISPATCH_TIMEOUT
+
+    def set_dispatch_mode(self, mode, timeout=None):
+        """
+        In 'blocking' mode the thread waits on its input queue for at most `timeout` seconds and processes
+        items back-to-back. In 'polling' mode it does a non-blocking get and sleeps between steps.
+        """
+        if mode not in (Constants.DISPATCH_MODE_BLOCKING, Constants.DISPATCH_MODE_POLLING):
+            raise ValueError(f"Unknown dispatch mode '{mode}'")
+        self._dispatch_mode = mode
+        if timeout is not None:
+            self._dispatch_timeout = timeout
@@ -0,0 +1,230 @@
+from connarchitecture.queue import ConnectorQueue, OVERFLOW_BLOCK
+from threading import Condition
+from queue import Empty
+import sqlite3
+import pickle
+import time
+
+STATE_PENDING = 'pending'
+STATE_INFLIGHT = 'inflight'
+STATE_DONE = 'done'
+STATE_FAILED = 'failed'
+
+
+class WorkItem(tuple):
+    """
+    Topic item handed out by DurableConnectorQueue. Behaves like the queued tuple and carries the id
+    that acknowledges it.
+    """
+
+    def __new__(cls, item, work_id):
+        work_item = tuple.__new__(cls, item)
+        work_item.work_id = work_id
+        return work_item
+
+
+class DurableConnectorQueue(ConnectorQueue):
+    """
+    ConnectorQueue whose topic lanes are stored in a SQLite database. Every item is pending, in flight,
+    done or failed. Items stay in flight until they are acknowledged (see ack), so items that were in
+    flight when the connector stopped are served again after a restart. Request files are recorded
+    with their modification time, so unchanged files are not expanded again (see is_enumerated).
+    Topic lanes are unbounded. The default lane stays in memory. Once no item of a source is pending or in
+    flight any more, its done items are deleted, so the database only grows with the outstanding work.
+    """
+
+    def __init__(self, path, maxsize=0, overflow=OVERFLOW_BLOCK):
+        ConnectorQueue.__init__(self, maxsize=maxsize, overflow=overflow)
+        self._path = path
+        self._cond = Condition()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS items (id INTEGER PRIMARY KEY, topic TEXT, priority INTEGER, source TEXT, item BLOB, state TEXT, key TEXT)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS items_pending ON items (topic, state, priority, source, id)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS items_key ON items (topic, key, state)')
+            self._db.execute('CREATE INDEX IF NOT EXISTS items_source ON items (source, state)')
+            self._db.execute('CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY, mtime REAL)')
+            # One lane per topic, priority and source with its number of pending items and when it was served last
+            self._db.execute('CREATE TABLE IF NOT EXISTS lanes (topic TEXT, priority INTEGER, source TEXT, served INTEGER, pending INTEGER, PRIMARY KEY (topic, priority, source))')
+            self._resumed = self._db.execute('UPDATE items SET state=? WHERE state=?', (STATE_PENDING, STATE_INFLIGHT)).rowcount
+            self._count_pending()
+        self._served = self._db.execute('SELECT COALESCE(MAX(served), 0) FROM lanes').fetchone()[0]
+        self._coalesced = {}
+        # Topic -> done items deleted since the queue was opened
+        self._deleted = {}
+        self._expected_acks = {}
+
+    def resumed(self):
+        """
+        :return the number of items that were in flight when the queue was last closed
+        """
+        return self._resumed
+
+    @staticmethod
+    def _source_key(source):
+        return '' if source is None else str(source)
+
+    def _count_pending(self, source=None):
+        where = '' if source is None else 'AND source=?'
+        args = () if source is None else (source,)
+        self._db.execute(f'UPDATE lanes SET pending=0 WHERE 1=1 {where}', args)
+        self._db.execute(f'''INSERT INTO lanes (topic, priority, source, served, pending)
+                             SELECT topic, priority, source, 0, COUNT(*) FROM items WHERE state=? {where} GROUP BY topic, priority, source
+                             ON CONFLICT (topic, priority, source) DO UPDATE SET pending=excluded.pending''', (STATE_PENDING,) + args)
+
+    def _insert(self, topic, priority, source, item):
+        """
+        Inserts a pending item or merges it into the pending item with the same coalesce key, priority and
+        source. Items of different sources are not merged, because a changed source drops its pending items.
+        :return True if a new item was inserted
+        """
+        key = None
+        if topic in self._coalescers:
+            coalesce_key, merge = self._coalescers[topic]
+            key = coalesce_key(item)
+        if key is not None:
+            key = repr(key)
+            row = self._db.execute('SELECT id, item FROM items WHERE topic=? AND key=? AND state=? AND priority=? AND source=?',
+                                   (topic, key, STATE_PENDING, priority, source)).fetchone()
+            if row:
+                merged = merge(pickle.loads(row[1]), item)
+                self._db.execute('UPDATE items SET item=? WHERE id=?', (pickle.dumps(tuple(merged)), row[0]))
+                self._coalesced[topic] = self._coalesced.get(topic, 0) + 1
+                return False
+        self._db.execute('INSERT INTO items (topic, priority, source, item, state, key) VALUES (?, ?, ?, ?, ?, ?)',
+                         (topic, priority, source, pickle.dumps(tuple(item)), STATE_PENDING, key))
+        return True
+
+    def is_enumerated(self, source, mtime):
+        with self._cond:
+            row = self._db.execute('SELECT mtime FROM sources WHERE path=?', (self._source_key(source),)).fetchone()
+        return row is not None and row[0] == mtime
+
+    def put_source(self, source, mtime, topic_items, priority=0):
+        source = self._source_key(source)
+        with self._cond:
+            with self._db:
+                # A changed file replaces the items of its previous version that were not served yet
+                self._db.execute('DELETE FROM items WHERE source=? AND state=?', (source, STATE_PENDING))
+                for topic, item in topic_items:
+                    self._insert(topic, priority, source, item)
+                self._db.execute('INSERT OR REPLACE INTO sources (path, mtime) VALUES (?, ?)', (source, mtime))
+                self._count_pending(source)
+            self._cond.notify_all()
+
+    def put_topic(self, topic, item, block=True, timeout=None, priority=0, source=None):
+        source = self._source_key(source)
+        with self._cond:
+            with self._db:
+                if self._insert(topic, priority, source, item):
+                    self._db.execute('''INSERT INTO lanes (topic, priority, source, served, pending) VALUES (?, ?, ?, 0, 1)
+                                        ON CONFLICT (topic, priority, source) DO UPDATE SET pending=pending+1''', (topic, priority, source))
+            self._cond.notify_all()
+
+    def _take(self, topic):
+        # Highest priority first, then round-robin: the source that was served least recently
+        lane = self._db.execute('''SELECT priority, source FROM lanes WHERE topic=? AND pending>0
+                                  ORDER BY priority DESC, served LIMIT 1''', (topic,)).fetchone()
+        if lane is None:
+            return None
+        priority, source = lane
+        work_id, item = self._db.execute('SELECT id, item FROM items WHERE topic=? AND state=? AND priority=? AND source=? ORDER BY id LIMIT 1',
+                                         (topic, STATE_PENDING, priority, source)).fetchone()
+        self._served += 1
+        with self._db:
+            self._db.execute('UPDATE items SET state=? WHERE id=?', (STATE_INFLIGHT, work_id))
+            self._db.execute('UPDATE lanes SET served=?, pending=pending-1 WHERE topic=? AND priority=? AND source=?', (self._served, topic, priority, source))
+        return WorkItem(pickle.loads(item), work_id)
+
+    def get_topic(self, topic, block=True, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                item = self._take(topic)
+                if item is not None:
+                    return item
+                if not block:
+                    raise Empty
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise Empty
+                self._cond.wait(remaining)
+
+    def expect_acks(self, work_id, count):
+        with self._cond:
+            self._expected_acks[work_id] = count
+
+    def ack(self, work_id, success):
+        """
+        Marks an item as done or failed. A failure is final, a later success does not override it. An item
+        that expects several acknowledgements is done after the last one.
+        """
+        with self._cond:
+            if success and self._expected_acks.get(work_id, 1) > 1:
+                self._expected_acks[work_id] -= 1
+                return
+            self._expected_acks.pop(work_id, None)
+            with self._db:
+                if success:
+                    self._db.execute('UPDATE items SET state=? WHERE id=? AND state=?', (STATE_DONE, work_id, STATE_INFLIGHT))
+                else:
+                    self._db.execute('UPDATE items SET state=? WHERE id=?', (STATE_FAILED, work_id))
+                row = self._db.execute('SELECT source FROM items WHERE id=?', (work_id,)).fetchone()
+                if row:
+                    self._delete_done(row[0])
+
+    def _delete_done(self, source):
+        """
+        Deletes the done items of `source` if it has no pending or in flight items left. Failed items are kept.
+        """
+        if self._db.execute('SELECT 1 FROM items WHERE source=? AND state IN (?, ?) LIMIT 1', (source, STATE_PENDING, STATE_INFLIGHT)).fetchone():
+            return
+        for topic, count in self._db.execute('SELECT topic, COUNT(*) FROM items WHERE source=? AND state=? GROUP BY topic', (source, STATE_DONE)).fetchall():
+            self._deleted[topic] = self._deleted.get(topic, 0) + count
+        self._db.execute('DELETE FROM items WHERE source=? AND state=?', (source, STATE_DONE))
+
+    def topic_qsize(self, topic):
+        with self._cond:
+            return self._db.execute('SELECT COALESCE(SUM(pending), 0) FROM lanes WHERE topic=?', (topic,)).fetchone()[0]
+
+    def _topic_counts(self):
+        with self._cond:
+            rows = self._db.execute('SELECT topic, state, COUNT(*) FROM items GROUP BY topic, state ORDER BY topic').fetchall()
+            deleted = dict(self._deleted)
+        counts = {}
+        for topic, state, count in rows:
+            counts.setdefault(topic, {})[state] = count
+        # Done items that were deleted still count
+        for topic, count in deleted.items():
+            counts.setdefault(topic, {})[STATE_DONE] = counts.get(topic, {}).get(STATE_DONE, 0) + count
+        return counts
+
+    def _topic_metrics(self, topic, counts):
+        result = ", ".join([f"{state} {counts.get(state, 0)}" for state in [STATE_PENDING, STATE_INFLIGHT, STATE_DONE, STATE_FAILED]])
+        if topic in self._coalescers:
+            result += f", coalesced {self._coalesced.get(topic, 0)}"
+        return result
+
+    def head(self, k=5):
+        result = self._stringify_queue(name='default', q=self._default_queue, k=k)
+        for topic, counts in self._topic_counts().items():
+            with self._cond:
+                rows = self._db.execute('SELECT item FROM items WHERE topic=? AND state=? ORDER BY priority DESC, id LIMIT ?', (topic, STATE_PENDING, k)).fetchall()
+            result += f" {topic} ({self._topic_metrics(topic, counts)}): ["
+            result += ", ".join([f"{pickle.loads(row[0])}" for row in rows])
+            result += "]\n"
+        return result
+
+    def statistics(self, name):
+        result = ConnectorQueue.statistics(self, name)
+        for topic, counts in self._topic_counts().items():
+            result += f"{f'{name}/{topic}':>15}: {self._topic_metrics(topic, counts)} ({self._path})\n"
+        return result
+
+    def close(self):
+        with self._cond:
+            # Moves the write-ahead log into the database, so it is a single file again
+            self._db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self._db.close()
@@ -1,4 +1,5 @@
 from abc import ABC
+import time
 
 
 class ServerEvent:
@@ -16,6 +17,7 @@ class ConnectorEvent:
         self.exception = exception
         self.type = type
         self._poll_reference = poll_reference
+        self.created = time.monotonic()
 
     def get_poll_reference(self):
         return self._poll_reference
@@ -5,8 +5,16 @@ class PollReference:
         self.ticker = None
         self.url = None
         self.year = None
+        self.years = None
         self.concept = None
         self.poller = None
+        self.work_id = None
+        # The source has no data for the request, which is not an error
+        self.unavailable = False
+        # The file holds the data of other requests too, e.g. a companyfacts document
+        self.shared = False
+        # Identifies what the results deliver, recorded once they were sent (see implementation.deliveries)
+        self.delivery = None
 
     def __repr__(self):
         f = [f"file={self.file}" if self.file else None,
@@ -14,7 +22,10 @@ class PollReference:
              f"url={self.url}" if self.url else None,
              f"concept={self.concept}" if self.concept else None,
              f"year={self.year}" if self.year else None,
-             f"poller={self.poller}" if self.poller else None
+             f"years={self.years}" if self.years else None,
+             f"poller={self.poller}" if self.poller else None,
+             "unavailable" if self.unavailable else None,
+             "shared" if self.shared else None
              ]
         fields = ", ".join([x for x in f if x is not None])
 
@@ -1,31 +1,261 @@
 from queue import Queue
 from threading import Lock
 from queue import Empty
+from itertools import islice, zip_longest
+from collections import OrderedDict, deque
+import tempfile
+import pickle
+import time
+
+OVERFLOW_BLOCK = 'block'
+OVERFLOW_SPILL = 'spill'
+
+
+class MonitoredQueue(Queue):
+    """
+    Queue that tracks its high water mark and the time producers spent waiting on a full queue.
+    With overflow='spill' producers never wait. Items that do not fit are pickled to a temporary
+    file and moved back into memory, in order, as consumers make room.
+    """
+
+    def __init__(self, maxsize=0, overflow=OVERFLOW_BLOCK):
+        Queue.__init__(self, maxsize)
+        self._overflow = overflow
+        self._spill_file = None
+        self._spill_read_pos = 0
+        self.spilled = 0
+        self.high_water_mark = 0
+        self.blocked_time = 0.0
+
+    def _enqueue(self, item):
+        self.queue.append(item)
+
+    def _dequeue(self):
+        return self.queue.popleft()
+
+    def _put(self, item):
+        self._enqueue(item)
+        self.high_water_mark = max(self.high_water_mark, self._qsize() + self.spilled)
+
+    def _get(self):
+        item = self._dequeue()
+        if self.spilled:
+            self._unspill()
+        return item
+
+    def _spill(self, item):
+        if not self._spill_file:
+            self._spill_file = tempfile.TemporaryFile()
+        self._spill_file.seek(0, 2)
+        pickle.dump(item, self._spill_file)
+        self.spilled += 1
+        self.high_water_mark = max(self.high_water_mark, self._qsize() + self.spilled)
+
+    def _unspill(self):
+        self._spill_file.seek(self._spill_read_pos)
+        self._enqueue(pickle.load(self._spill_file))
+        self._spill_read_pos = self._spill_file.tell()
+        self.spilled -= 1
+        if not self.spilled:
+            self._spill_file.seek(0)
+            self._spill_file.truncate()
+            self._spill_read_pos = 0
+
+    def put(self, item, block=True, timeout=None):
+        if self.maxsize > 0 and self._overflow == OVERFLOW_SPILL:
+            with self.not_full:
+                # Once spilling started all new items go to the spill file to keep the FIFO order
+                if self.spilled or self._qsize() >= self.maxsize:
+                    self._spill(item)
+                else:
+                    self._put(item)
+                    self.not_empty.notify()
+                self.unfinished_tasks += 1
+        elif block and self.maxsize > 0 and self.full():
+            start = time.monotonic()
+            try:
+                Queue.put(self, item, block, timeout)
+            finally:
+                with self.mutex:
+                    self.blocked_time += time.monotonic() - start
+        else:
+            Queue.put(self, item, block, timeout)
+
+    def depth(self):
+        with self.mutex:
+            return self._qsize() + self.spilled
+
+    def peek(self, k):
+        with self.mutex:
+            return list(islice(self.queue, k))
+
+    def metrics(self):
+        capacity = self.maxsize if self.maxsize > 0 else 'unbounded'
+        result = f"depth {self.depth()}/{capacity}, high water mark {self.high_water_mark}, blocked {self.blocked_time:.1f}s"
+        if self._overflow == OVERFLOW_SPILL:
+            result += f", spilled {self.spilled}"
+        return result
+
+
+class FairQueue(MonitoredQueue):
+    """
+    Queue of (priority, source, item) entries. get() returns the item with the highest priority. Within a
+    priority level the sources take turns, so a large source cannot starve a small one that arrived later.
+    Spilled entries are kept per priority and source as well and are read back in the same order.
+    With a coalescer set, an item whose key matches a queued item is merged into that item instead of
+    being queued again, see set_coalescer.
+    """
+
+    def _init(self, maxsize):
+        self._levels = {}
+        self._count = 0
+        self._coalesce_key = None
+        self._coalesce = None
+        self._queued = {}
+        self.coalesced = 0
+        # Priority -> source -> offsets of the spilled entries in the spill file
+        self._spilled_levels = {}
+
+    def _qsize(self):
+        return self._count
+
+    def set_coalescer(self, key, merge):
+        """
+        `key(item)` returns the key of an item, or None if the item is never merged. `merge(queued, item)`
+        returns the item that replaces the queued item with the same key.
+        """
+        with self.mutex:
+            self._coalesce_key = key
+            self._coalesce = merge
+
+    def _enqueue(self, entry):
+        priority, source, item = entry
+        key = self._coalesce_key(item) if self._coalesce_key else None
+        if key is not None:
+            # Only items of the same priority are merged, so an urgent item never takes the place of a backfill
+            key = (priority, key)
+            cell = self._queued.get(key)
+            if cell is not None:
+                # The merged item keeps the place of the queued one
+                cell[1] = self._coalesce(cell[1], item)
+                self.coalesced += 1
+                return
+        cell = [key, item]
+        if key is not None:
+            self._queued[key] = cell
+        sources = self._levels.setdefault(priority, OrderedDict())
+        sources.setdefault(source, deque()).append(cell)
+        self._count += 1
+
+    def _spill(self, entry):
+        priority, source, item = entry
+        if not self._spill_file:
+            self._spill_file = tempfile.TemporaryFile()
+        self._spill_file.seek(0, 2)
+        self._spilled_levels.setdefault(priority, OrderedDict()).setdefault(source, deque()).append(self._spill_file.tell())
+        pickle.dump(entry, self._spill_file)
+        self.spilled += 1
+        self.high_water_mark = max(self.high_water_mark, self._qsize() + self.spilled)
+
+    def _unspill(self):
+        priority = max(self._spilled_levels)
+        sources = self._spilled_levels[priority]
+        source, offsets = next(iter(sources.items()))
+        self._spill_file.seek(offsets.popleft())
+        if offsets:
+            sources.move_to_end(source)
+        else:
+            del sources[source]
+            if not sources:
+                del self._spilled_levels[priority]
+        self._enqueue(pickle.load(self._spill_file))
+        self.spilled -= 1
+        if not self.spilled:
+            self._spill_file.seek(0)
+            self._spill_file.truncate()
+
+    def _get(self):
+        # A spilled entry that outranks everything in memory is served before them
+        if self.spilled and (not self._levels or max(self._spilled_levels) > max(self._levels)):
+            self._unspill()
+            return self._dequeue()
+        return MonitoredQueue._get(self)
+
+    def _dequeue(self):
+        priority = max(self._levels)
+        sources = self._levels[priority]
+        source, items = next(iter(sources.items()))
+        key, item = items.popleft()
+        if key is not None:
+            del self._queued[key]
+        if items:
+            sources.move_to_end(source)
+        else:
+            del sources[source]
+            if not sources:
+                del self._levels[priority]
+        self._count -= 1
+        return item
+
+    def put(self, item, block=True, timeout=None, priority=0, source=None):
+        MonitoredQueue.put(self, (priority, source, item), block, timeout)
+
+    def metrics(self):
+        result = MonitoredQueue.metrics(self)
+        if self._coalesce_key:
+            result += f", coalesced {self.coalesced}"
+        return result
+
+    def peek(self, k):
+        result = []
+        with self.mutex:
+            for priority in sorted(self._levels, reverse=True):
+                # Interleave the sources the same way get() serves them
+                for cells in zip_longest(*self._levels[priority].values()):
+                    result += [cell[1] for cell in cells if cell is not None]
+                    if len(result) >= k:
+                        return result[:k]
+        return result
 
 
 class ConnectorQueue:
-    def __init__(self):
+    def __init__(self, maxsize=0, overflow=OVERFLOW_BLOCK):
+        if overflow not in (OVERFLOW_BLOCK, OVERFLOW_SPILL):
+            raise ValueError(f"Unknown overflow '{overflow}'")
+        self._maxsize = maxsize
+        self._overflow = overflow
         self._topic_queues = {}
-        self._default_queue = Queue()
+        self._coalescers = {}
+        self._default_queue = self._new_queue()
         self._lock = Lock()
 
+    def _new_queue(self):
+        return MonitoredQueue(maxsize=self._maxsize, overflow=self._overflow)
+
+    def _lanes(self):
+        with self._lock:
+            topic_queues = list(self._topic_queues.items())
+        return [('default', self._default_queue)] + topic_queues
+
     def _stringify_queue(self, name, q, k):
-        result = f" {name}: ["
-        d = q.queue
-        sep = ''
-        for i in range(min(len(d), k)):
-            result += sep
-            result += f"{d[i]}"
-            sep = ', '
+        result = f" {name} ({q.metrics()}): ["
+        result += ", ".join([f"{item}" for item in q.peek(k)])
         result += "]\n"
         return result
 
     def head(self, k=5):
-        result = self._stringify_queue(name='default', q=self._default_queue, k=k)
-
-        for topic in self._topic_queues:
-            result += self._stringify_queue(name=topic, q=self._topic_queues[topic], k=k)
+        result = ""
+        for name, q in self._lanes():
+            result += self._stringify_queue(name=name, q=q, k=k)
+        return result
 
+    def statistics(self, name):
+        result = ""
+        for lane, q in self._lanes():
+            if lane == 'default' and not q.depth() and not q.high_water_mark:
+                continue
+            label = name if lane == 'default' else f"{name}/{lane}"
+            result += f"{label:>15}: {q.metrics()}\n"
         return result
 
     def put(self, *args, **kwargs):
@@ -34,14 +264,67 @@ class ConnectorQueue:
     def get(self, *args, **kwargs):
         return self._default_queue.get(*args, **kwargs)
 
-    def put_topic(self, topic, *args, **kwargs):
+    def qsize(self):
+        return self._default_queue.depth()
+
+    def _topic_queue(self, topic):
         with self._lock:
             if not topic in self._topic_queues:
-                self._topic_queues[topic] = Queue()
-        self._topic_queues[topic].put(*args, **kwargs)
+                self._topic_queues[topic] = FairQueue(maxsize=self._maxsize, overflow=self._overflow)
+                if topic in self._coalescers:
+                    self._topic_queues[topic].set_coalescer(*self._coalescers[topic])
+            return self._topic_queues[topic]
+
+    def set_coalescer(self, topic, key, merge):
+        """
+        Merges items of `topic` that are waiting in the queue and share the same key, see FairQueue.set_coalescer.
+        """
+        with self._lock:
+            self._coalescers[topic] = (key, merge)
+            if topic in self._topic_queues:
+                self._topic_queues[topic].set_coalescer(key, merge)
+
+    def put_topic(self, topic, item, block=True, timeout=None, priority=0, source=None):
+        """
+        Queues `item` for `topic`. Items with a higher `priority` are served first. Items of the same
+        priority are served round-robin across their `source`, e.g. the request file they came from.
+        """
+        self._topic_queue(topic).put(item, block=block, timeout=timeout, priority=priority, source=source)
+
+    def is_enumerated(self, source, mtime):
+        """
+        :return True if `source` with modification time `mtime` has already been expanded into this queue
+        """
+        return False
+
+    def put_source(self, source, mtime, topic_items, priority=0):
+        """
+        Queues all (topic, item) pairs expanded from `source`, e.g. a request file.
+        """
+        for topic, item in topic_items:
+            self.put_topic(topic, item, priority=priority, source=source)
+
+    def ack(self, work_id, success):
+        """
+        Acknowledges a processed item. Only durable queues track items after they have been served.
+        """
+        pass
+
+    def expect_acks(self, work_id, count):
+        """
+        Announces that the item `work_id` is acknowledged `count` times, once per result of its poll.
+        """
+        pass
+
+    def close(self):
+        """
+        Releases what the queue holds on to once the connector stopped. Only durable queues hold resources.
+        """
+        pass
+
+    def topic_qsize(self, topic):
+        return self._topic_queue(topic).depth()
 
     def get_topic(self, topic, *args, **kwargs):
-        if topic in self._topic_queues:
-            return self._topic_queues[topic].get(*args, **kwargs)
-        else:
-            raise Empty
+        # Create the topic queue on demand so that blocking consumers can wait for the first item
+        return self._topic_queue(topic).get(*args, **kwargs)
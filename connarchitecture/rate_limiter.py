@@ -0,0 +1,188 @@
+from threading import Lock
+from urllib.parse import urlparse
+from email.utils import parsedate_to_datetime
+import time
+
+THROTTLED_STATUS = (429, 503)
+
+
+class TokenBucket:
+    """
+    Allows `rate` requests per second on average and bursts of up to `burst` requests. A caller that
+    finds the bucket empty reserves the next token and waits for it, so waiting callers are served in
+    order. An adaptive bucket halves its rate (`backoff`) when the host answers 429 or 503 and raises it
+    again by about `increase` requests per second for every second of successful requests (AIMD). A
+    throttled response with a Retry-After delay holds back all callers for that long (see pause).
+    """
+
+    def __init__(self, rate: float, burst: float = 1, adaptive: bool = False, min_rate: float = None, backoff: float = 0.5, increase: float = None):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.adaptive = adaptive
+        self.min_rate = min_rate if min_rate else rate / 10
+        self.backoff = backoff
+        self.increase = increase if increase else max(rate / 10, 0.1)
+        self.current_rate = rate
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.last_backoff = 0.0
+        self.requests = 0
+        self.wait_time = 0.0
+        self.throttled = 0
+        self.backoffs = 0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.current_rate)
+        self.updated = now
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        self.requests += 1
+        delay = -self.tokens / self.current_rate if self.tokens < 0 else 0
+        self.wait_time += delay
+        return delay
+
+    def feedback(self, status: int):
+        if status in THROTTLED_STATUS:
+            self.throttled += 1
+            if not self.adaptive:
+                return
+            now = time.monotonic()
+            # Responses to requests sent before the last backoff must not shrink the rate again
+            if now - self.last_backoff < 1.0:
+                return
+            self._refill(now)
+            self.current_rate = max(self.min_rate, self.current_rate * self.backoff)
+            self.tokens = min(self.tokens, 0)
+            self.last_backoff = now
+            self.backoffs += 1
+        elif self.adaptive and status < 400 and self.current_rate < self.rate:
+            self._refill(time.monotonic())
+            self.current_rate = min(self.rate, self.current_rate + self.increase / self.current_rate)
+
+    def pause(self, seconds: float):
+        """
+        Lets the next request wait at least `seconds`. Later callers queue up behind it as usual.
+        """
+        self._refill(time.monotonic())
+        self.tokens = min(self.tokens, 1 - seconds * self.current_rate)
+
+    def status(self) -> str:
+        result = f"{self.current_rate:.2f}/{self.rate:.2f} req/s, burst {self.burst:g}, {self.requests} request(s), waited {self.wait_time:.1f}s"
+        result += f", throttled {self.throttled}"
+        if self.adaptive:
+            result += f" ({self.backoffs} backoff(s))"
+        return result
+
+
+class RateLimiter:
+    """
+    One token bucket per host, shared by all poller threads. Hosts are configured in [RATE_LIMIT_*]
+    sections (see configure). Pollers set a default for their host with set_interval, which does not
+    override a configured host. A host without a bucket only waits for the Retry-After of a throttled
+    response.
+    """
+    _lock = Lock()
+    _buckets = {}
+    _configured = set()
+    # Host without a bucket -> time.monotonic() before which it must not be sent requests
+    _paused = {}
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlparse(url).netloc or url
+
+    @staticmethod
+    def configure(host: str, rate: float, burst: float = 1, adaptive: bool = False, min_rate: float = None, backoff: float = 0.5, increase: float = None):
+        """
+        :param host: one host or several separated by commas, which then share one bucket, e.g. the hosts of
+                     a site that limits the requests to all of them together
+        """
+        bucket = TokenBucket(rate=rate, burst=burst, adaptive=adaptive, min_rate=min_rate, backoff=backoff, increase=increase)
+        with RateLimiter._lock:
+            for name in [name.strip() for name in host.split(',')]:
+                RateLimiter._buckets[name] = bucket
+                RateLimiter._configured.add(name)
+
+    @staticmethod
+    def set_interval(host: str, seconds: float):
+        """
+        Allows one request every `seconds` to `host` unless the host is configured. 0 means no limit.
+        """
+        with RateLimiter._lock:
+            if host in RateLimiter._configured:
+                return
+            bucket = RateLimiter._buckets.get(host)
+            if not seconds:
+                RateLimiter._buckets.pop(host, None)
+            elif not bucket or bucket.rate != 1 / seconds:
+                RateLimiter._buckets[host] = TokenBucket(rate=1 / seconds)
+
+    @staticmethod
+    def reserve(url: str) -> float:
+        """
+        Takes a token for the host of `url`.
+        :return the number of seconds the caller has to wait before sending the request
+        """
+        host = RateLimiter.host_of(url)
+        with RateLimiter._lock:
+            bucket = RateLimiter._buckets.get(host)
+            if bucket:
+                return bucket.reserve()
+            return max(0, RateLimiter._paused.get(host, 0) - time.monotonic())
+
+    @staticmethod
+    def wait(url: str):
+        delay = RateLimiter.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+
+    @staticmethod
+    def retry_after(headers) -> float:
+        """
+        :return the seconds to wait that the Retry-After header in `headers` asks for, 0 if there is none
+        """
+        value = (headers or {}).get('retry-after')
+        if not value:
+            return 0
+        try:
+            return max(0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return 0
+
+    @staticmethod
+    def feedback(url: str, status: int, headers=None) -> bool:
+        """
+        Reports the HTTP status and `headers` of a response from the host of `url`. A throttled response holds
+        back the next requests to the host for its Retry-After delay.
+        :return True if the host throttled the request
+        """
+        host = RateLimiter.host_of(url)
+        throttled = status in THROTTLED_STATUS
+        delay = RateLimiter.retry_after(headers) if throttled else 0
+        with RateLimiter._lock:
+            bucket = RateLimiter._buckets.get(host)
+            if bucket:
+                bucket.feedback(status)
+                if delay:
+                    bucket.pause(delay)
+            elif delay:
+                RateLimiter._paused[host] = max(RateLimiter._paused.get(host, 0), time.monotonic() + delay)
+        return throttled
+
+    @staticmethod
+    def statistics() -> str:
+        result = ""
+        with RateLimiter._lock:
+            hosts = {}
+            for host, bucket in sorted(RateLimiter._buckets.items()):
+                hosts.setdefault(bucket, []).append(host)
+            for bucket, names in hosts.items():
+                result += f"{'Rate limit':>15}: {', '.join(names)} {bucket.status()}\n"
+        return result
@@ -0,0 +1,126 @@
+from connarchitecture.logging_component import LoggingComponent
+from threading import Lock
+import time
+
+
+class WorkerPool(LoggingComponent):
+    """
+    A resizable group of worker threads of one stage. `factory(name)` creates a configured, not yet
+    started worker and `backlog()` returns the number of items waiting in the pool's input queue.
+    """
+
+    def __init__(self, name, factory, name_prefix, min_threads, max_threads, backlog):
+        LoggingComponent.__init__(self, name)
+        self._factory = factory
+        self._name_prefix = name_prefix
+        self.min_threads = max(1, min_threads)
+        self.max_threads = max(self.min_threads, max_threads)
+        self._backlog = backlog
+        self._workers = []
+        self._retired = []
+        self._next_index = 1
+        self._lock = Lock()
+        self._sample_time = time.monotonic()
+        self._sample_busy_time = 0.0
+        self._sample_processed = 0
+        self._sample_batches = 0
+        self._sample_batch_wait_time = 0.0
+        self._exited_busy_time = 0.0
+        self._exited_processed = 0
+        self._exited_batches = 0
+        self._exited_batch_wait_time = 0.0
+        self.utilization = 0.0
+        self.latency = 0.0
+        self.batch_size = 0.0
+        self.batch_latency = 0.0
+        self.batch_wait = 0.0
+
+    def workers(self):
+        with self._lock:
+            return list(self._workers)
+
+    def size(self):
+        with self._lock:
+            return len(self._workers)
+
+    def backlog(self):
+        return self._backlog()
+
+    def _start_worker(self):
+        worker = self._factory(f"{self._name_prefix}-{self._next_index}")
+        self._next_index += 1
+        worker.start()
+        self._workers.append(worker)
+
+    def _retire_worker(self):
+        worker = self._workers.pop()
+        worker.stop()
+        self._retired.append(worker)
+
+    def resize(self, threads):
+        """
+        Starts or stops workers until the pool has `threads` workers, clamped to the configured bounds.
+        Stopped workers finish the item they are working on before they exit.
+        :return the new pool size
+        """
+        threads = max(self.min_threads, min(self.max_threads, threads))
+        with self._lock:
+            for worker in [w for w in self._retired if not w.is_alive()]:
+                self._exited_busy_time += worker.busy_time
+                self._exited_processed += worker.processed_count
+                self._exited_batches += worker.batch_count
+                self._exited_batch_wait_time += worker.batch_wait_time
+                self._retired.remove(worker)
+            if threads != len(self._workers):
+                self.log(f"Resizing from {len(self._workers)} to {threads} thread(s)")
+            while len(self._workers) < threads:
+                self._start_worker()
+            while len(self._workers) > threads:
+                self._retire_worker()
+            return len(self._workers)
+
+    def sample(self):
+        """
+        Updates `utilization` (share of time the workers spent handling items), `latency` (average
+        seconds per item), `batch_size` (average items per batch), `batch_latency` (average seconds per
+        batch) and `batch_wait` (average seconds spent filling a batch) over the period since the previous sample.
+        """
+        with self._lock:
+            workers = self._workers + self._retired
+            size = len(self._workers)
+            busy_time = self._exited_busy_time + sum(w.busy_time for w in workers)
+            processed = self._exited_processed + sum(w.processed_count for w in workers)
+            batches = self._exited_batches + sum(w.batch_count for w in workers)
+            batch_wait_time = self._exited_batch_wait_time + sum(w.batch_wait_time for w in workers)
+        now = time.monotonic()
+
+        elapsed = now - self._sample_time
+        busy = max(0.0, busy_time - self._sample_busy_time)
+        count = max(0, processed - self._sample_processed)
+        batch_count = max(0, batches - self._sample_batches)
+        self.utilization = min(1.0, busy / (elapsed * size)) if elapsed > 0 and size else 0.0
+        self.latency = busy / count if count else 0.0
+        self.batch_size = count / batch_count if batch_count else 0.0
+        self.batch_latency = busy / batch_count if batch_count else 0.0
+        self.batch_wait = max(0.0, batch_wait_time - self._sample_batch_wait_time) / batch_count if batch_count else 0.0
+
+        self._sample_time = now
+        self._sample_busy_time = busy_time
+        self._sample_processed = processed
+        self._sample_batches = batches
+        self._sample_batch_wait_time = batch_wait_time
+
+    def stop(self):
+        with self._lock:
+            for worker in self._workers + self._retired:
+                worker.stop()
+
+    def join(self):
+        with self._lock:
+            workers = self._workers + self._retired
+        for worker in workers:
+            if worker.is_alive():
+                worker.join()
+
+    def status(self):
+        return f"{self.size()} thread(s) [{self.min_threads}..{self.max_threads}], backlog {self.backlog()}, utilization {self.utilization:.0%}, latency {self.latency*1000:.1f}ms, batch {self.batch_size:.1f} item(s) in {self.batch_latency*1000:.1f}ms (+{self.batch_wait*1000:.1f}ms wait)"
@@ -3,37 +3,47 @@ from implementation.data_extraction_request import DataExtractionRequest
 from connarchitecture.decorators import overrides
 from implementation.model.concept import Concept
 from implementation.model.ticker import Ticker
+import implementation.payload_cache as payload_cache
 import json
-import jsonpath_rw_ext
 
 
 class FactExtractor(AbstractExtractor):
     @overrides(AbstractExtractor)
     def supports_input(self, request: DataExtractionRequest):
-        return request.file_extension and request.file_extension.upper() == ".JSON"
+        return request.file_extension and request.file_extension.upper() == ".JSON" and 'frame' not in request.data
 
-    def _find_value_for_concept(self, file: str, fy: int, units: str = "USD") -> str:
-        result = None
-        with open(file, 'r') as json_file:
-            json_data = json.load(json_file)
-            jsonpath_expression = jsonpath_rw_ext.parse(f'units.{units}[?(fy=={fy} & form="10-K")]')
-            matches = jsonpath_expression.find(json_data)
-            if matches:
-                result = max(matches, key=lambda m: m.value['end']).value['val']
-        return result
+    def _find_values_for_concept(self, file: str, concept: str, years: tuple[int], units: str = "USD") -> dict[int, str]:
+        """
+        Reads the concept file once and returns the value of the latest 10-K fact of every requested fiscal year.
+        The parsed document is shared with other requests for the same file (see payload_cache).
+        """
+        latest = {}
+        json_data = payload_cache.load(file, json.load)
+        if 'facts' in json_data:
+            # companyfacts document with all concepts of the company
+            json_data = json_data['facts'].get('us-gaap', {}).get(concept, {})
+        for fact in json_data.get('units', {}).get(units, []):
+            fy = fact.get('fy')
+            if fy in years and fact.get('form') == '10-K':
+                if fy not in latest or fact['end'] > latest[fy]['end']:
+                    latest[fy] = fact
+        return {fy: fact['val'] for fy, fact in latest.items()}
 
     @overrides(AbstractExtractor)
     def extract(self, request: DataExtractionRequest):
         result = []
-        value = self._find_value_for_concept(file=request.file, fy=request.data['year'], units=request.units)
-        if value:
-            result.append(
-                Concept(
-                    ticker=Ticker(symbol=request.ticker),
-                    name=request.data['concept'],
-                    year=request.data['year'],
-                    value=float(value)
+        years = request.data['years']
+        values = self._find_values_for_concept(file=request.file, concept=request.data['concept'], years=years, units=request.units)
+        for year in years:
+            value = values.get(year)
+            if value:
+                result.append(
+                    Concept(
+                        ticker=Ticker(symbol=request.ticker),
+                        name=request.data['concept'],
+                        year=year,
+                        value=float(value)
+                    )
                 )
-            )
 
         return result
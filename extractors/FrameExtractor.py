@@ -0,0 +1,33 @@
+from implementation.abstract_extractor import AbstractExtractor
+from implementation.data_extraction_request import DataExtractionRequest
+from connarchitecture.decorators import overrides
+from implementation.model.concept import Concept
+from implementation.model.ticker import Ticker
+import implementation.payload_cache as payload_cache
+import json
+
+
+class FrameExtractor(AbstractExtractor):
+    @overrides(AbstractExtractor)
+    def supports_input(self, request: DataExtractionRequest):
+        return 'frame' in request.data
+
+    @overrides(AbstractExtractor)
+    def extract(self, request: DataExtractionRequest):
+        result = []
+        ciks = request.data['ciks']
+        year = request.data['years'][0]
+        # The poller parsed the frame to pick the companies, the parsed document is shared (see payload_cache)
+        json_data = payload_cache.load(request.file, json.load)
+        for fact in json_data.get('data', []):
+            for ticker in ciks.get(fact['cik'], []):
+                result.append(
+                    Concept(
+                        ticker=Ticker(symbol=ticker),
+                        name=request.data['concept'],
+                        year=year,
+                        value=float(fact['val'])
+                    )
+                )
+
+        return result
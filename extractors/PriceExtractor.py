@@ -5,7 +5,14 @@ from implementation.model.price import Price
 from implementation.model.ticker import Ticker
 import datetime as dt
 from datetime import date
+import implementation.payload_cache as payload_cache
 import csv
+import io
+
+
+def read_rows(document) -> list[dict]:
+    with io.TextIOWrapper(document, encoding='utf-8', newline='') as csvfile:
+        return list(csv.DictReader(csvfile))
 
 
 class PriceExtractor(AbstractExtractor):
@@ -14,18 +21,20 @@ class PriceExtractor(AbstractExtractor):
         return request.file_extension and request.file_extension.upper() == ".CSV"
 
     def _read_rows_from_file(self, file: str) -> list[dict]:
-        result = []
-        with open(file, newline='') as csvfile:
-            csvreader = csv.DictReader(csvfile)
-            for row in csvreader:
-                result.append(row)
-        return result
+        # The rows are shared with other requests for the same file (see payload_cache)
+        return payload_cache.load(file, read_rows)
 
     @ overrides(AbstractExtractor)
     def extract(self, request: DataExtractionRequest):
         result = []
+        # Incremental updates only extract the days after the latest stored price
+        since = request.data.get('since')
+        since = since.isoformat() if since else ''
         rows = self._read_rows_from_file(file=request.file)
         for row in rows:
+            # Dates are ISO formatted, so they compare as strings
+            if row['Date'] <= since:
+                continue
             result.append(
                 Price(
                     ticker=Ticker(symbol=request.ticker),
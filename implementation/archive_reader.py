@@ -0,0 +1,52 @@
+"""
+Reads documents that are either plain files or members of a zip archive, addressed as
+`<archive>.zip/<member>`. Members are streamed out of the archive without extracting them to disk.
+Archives stay open per process, so the central directory of a large archive is read only once.
+"""
+from threading import Lock
+import zipfile
+import os
+
+ARCHIVE_SUFFIX = '.zip'
+
+_archives = {}
+_lock = Lock()
+
+
+def member_path(archive: str, member: str) -> str:
+    return f'{archive}/{member}'
+
+
+def split_path(path: str) -> tuple[str, str]:
+    """
+    :return (archive, member) for a path into an archive, (None, None) for any other path
+    """
+    index = path.find(f'{ARCHIVE_SUFFIX}/')
+    if index < 0:
+        return (None, None)
+    return (path[:index + len(ARCHIVE_SUFFIX)], path[index + len(ARCHIVE_SUFFIX) + 1:])
+
+
+def open_archive(archive: str) -> zipfile.ZipFile:
+    mtime = os.path.getmtime(archive)
+    with _lock:
+        cached = _archives.get(archive)
+        if cached and cached[0] == mtime:
+            return cached[1]
+        if cached:
+            cached[1].close()
+        zip_file = zipfile.ZipFile(archive)
+        _archives[archive] = (mtime, zip_file)
+        return zip_file
+
+
+def open_document(path: str):
+    """
+    Opens a plain file or an archive member for reading in binary mode.
+    """
+    if os.path.isfile(path):
+        return open(path, 'rb')
+    archive, member = split_path(path)
+    if archive is None:
+        raise FileNotFoundError(path)
+    return open_archive(archive).open(member)
@@ -0,0 +1,146 @@
+from connarchitecture.abstract_async_poller import AbstractAsyncPoller
+from connarchitecture.decorators import overrides
+from connarchitecture.poll_reference import PollReference
+from connarchitecture.rate_limiter import RateLimiter
+from connarchitecture import async_http
+from implementation.data_extraction_request import DataExtractionRequest
+from implementation.edgar_api import EdgarApi
+import implementation.cache as cache
+import implementation.deliveries as deliveries
+import asyncio
+import os
+
+
+class AsyncPollerConcept(AbstractAsyncPoller, EdgarApi):
+    """
+    Drop-in replacement for PollerConcept that keeps up to `in_flight` downloads open at the same time
+    on one thread. The per-host minimum interval still applies.
+    """
+
+    def __init__(self, name, **kwargs):
+        AbstractAsyncPoller.__init__(self, name, **kwargs)
+        self._min_interval = kwargs.get('min_interval', 2.5)
+        self._base_url = kwargs.get('base_url', self._base_url)
+        self._endpoint = kwargs.get('endpoint', self._endpoint)
+        self._ttl = kwargs.get('ttl', self._ttl)
+        self._compression = kwargs.get('compression', self._compression)
+        self._negative_ttl = kwargs.get('negative_ttl', self._negative_ttl)
+        self._negative_cache_path = kwargs.get('negative_cache', self._negative_cache_path)
+        self._downloads = {}
+
+    async def _download(self, url: str, file: str, description: str) -> tuple[str, str]:
+        entry = cache.lookup(file)
+        if entry and entry.is_fresh(self._ttl):
+            return (file, cache.CACHED)
+
+        # Polls of concepts of the same company wait for the one download of the companyfacts document
+        download = self._downloads.get(file)
+        if download is None:
+            download = self._downloads[file] = asyncio.ensure_future(self._fetch(url, file, description, entry))
+            download.add_done_callback(lambda _: self._downloads.pop(file, None))
+        return await asyncio.shield(download)
+
+    async def _fetch(self, url: str, file: str, description: str, entry: cache.CacheEntry) -> tuple[str, str]:
+        os.makedirs(os.path.dirname(file), exist_ok=True)
+
+        headers = dict(EdgarApi.HEADERS, **entry.conditional_headers()) if entry else EdgarApi.HEADERS
+        self.log(f'{"Revalidating" if entry else "Downloading"} {description}')
+        for attempt in range(EdgarApi.DOWNLOAD_ATTEMPTS):
+            await asyncio.sleep(RateLimiter.reserve(url))
+            r = await async_http.fetch(url, headers=headers)
+            if not RateLimiter.feedback(url, r.status, r.headers):
+                break
+            self.log_error(f'{RateLimiter.host_of(url)} throttled {description} ({r.status})')
+        if entry and r.status == 304:
+            await asyncio.to_thread(cache.store, file, r.headers, entry)
+            return (file, cache.NOT_MODIFIED)
+        if r.status == 200:
+            await asyncio.to_thread(cache.write, file, [r.body], r.headers, self._compression)
+            return (file, cache.FETCHED)
+        if r.status == 404:
+            return (None, cache.NOT_FOUND)
+        return (None, None)
+
+    @overrides(AbstractAsyncPoller)
+    def static_initialize(self):
+        self.log('static init')
+        self._load_cik_to_ticker_map()
+        self._open_negative_cache()
+
+    @overrides(AbstractAsyncPoller)
+    def initialize(self):
+        self.log("init")
+        os.makedirs(self._facts_cache_dir if self._endpoint == EdgarApi.ENDPOINT_COMPANY_FACTS else self._cache_dir, exist_ok=True)
+        RateLimiter.set_interval(RateLimiter.host_of(self._base_url), self._min_interval)
+
+    @overrides(AbstractAsyncPoller)
+    def get_topic(self):
+        return self._topic
+
+    @classmethod
+    @overrides(AbstractAsyncPoller)
+    def coalesce_key(cls, items):
+        return EdgarApi._concept_key(items)
+
+    @classmethod
+    @overrides(AbstractAsyncPoller)
+    def coalesce(cls, queued, items):
+        return EdgarApi._merge_concept_items(queued, items)
+
+    @overrides(AbstractAsyncPoller)
+    async def poll(self, items):
+        extraction_request = None
+        poll_reference = PollReference()
+        success = False
+        try:
+            ticker, concept, year, units = items
+            years = self._concept_years(year)
+            poll_reference.ticker = ticker
+            poll_reference.year = years[0] if len(years) == 1 else None
+            poll_reference.years = years
+            poll_reference.concept = concept
+            poll_reference.poller = self.get_name()
+
+            url, file = self._concept_source(ticker=ticker, concept=concept)
+            if not url:
+                self.log_warning(message=f"{ticker} is not available: no CIK in the ticker file")
+                poll_reference.unavailable = True
+                success = True
+            elif self._is_known_miss(ticker=ticker, concept=concept):
+                # Neither waits for the rate limiter nor asks the API again
+                poll_reference.url = url
+                poll_reference.unavailable = True
+                success = True
+            else:
+                poll_reference.url = url
+                description = self._concept_source_description(ticker=ticker, concept=concept)
+                file, status = await self._download(url=url, file=file, description=description)
+                if file:
+                    poll_reference.file = file
+                    poll_reference.shared = self._endpoint == EdgarApi.ENDPOINT_COMPANY_FACTS
+                    if status == cache.FETCHED:
+                        self._discard_miss(ticker=ticker, concept=concept)
+                    delivery = self._delivery(file, status, ticker.lower(), concept, units, years)
+                    if not deliveries.is_delivered(delivery):
+                        poll_reference.delivery = delivery
+                        extraction_request = DataExtractionRequest(poll_reference=poll_reference, ticker=ticker, units=units, data={'url': url, 'concept': concept, 'years': years})
+                    success = True
+                elif status == cache.NOT_FOUND:
+                    self.log_warning(message=f"{description} is not available")
+                    self._record_miss(ticker=ticker, concept=concept)
+                    poll_reference.unavailable = True
+                    success = True
+                else:
+                    self.log_error(message=f"Could not download {url}")
+        except Exception as e:
+            self.log_exception(e)
+        finally:
+            return (extraction_request, poll_reference, success)
+
+    @overrides(AbstractAsyncPoller)
+    def cleanup(self):
+        self.log("cleanup")
+
+    @overrides(AbstractAsyncPoller)
+    def static_cleanup(self):
+        self.log("static cleanup")
@@ -0,0 +1,386 @@
+"""
+Cached downloads. Every cached file can have a `<file>.meta` file next to it with the time it was fetched,
+the ETag and Last-Modified headers of the response and, for files written through `write`, the size and
+CRC32 that are checked when the file is read. A file older than the poller's TTL is stale and is
+revalidated with a conditional request. Files without metadata count as fetched at their modification time.
+
+Files are addressed by their plain path, e.g. cache/concepts/AAPL/Assets.json. With compression they are
+stored as `<file>.gz` or `<file>.xz`. `open_document` reads either form.
+
+Files below a packed directory are kept in its pack instead, with their metadata (see cache_pack).
+
+With a manifest (see set_manifest) lookups are answered from memory without touching the file system, and
+every write updates the manifest. A file deleted behind the manifest's back is dropped from it when it is
+read, and files added behind its back are only seen after a rebuild.
+The manifest also records lookups, for its hit rates and to evict files from areas over their budget.
+"""
+from implementation.exceptions import CacheIntegrityException
+import implementation.archive_reader as archive_reader
+import implementation.cache_pack as cache_pack
+from email.utils import formatdate
+import tempfile
+import shutil
+import zlib
+import gzip
+import lzma
+import json
+import time
+import io
+import os
+
+META_SUFFIX = '.meta'
+
+# Outcomes of a download
+FETCHED = 'fetched'
+CACHED = 'cached'
+NOT_MODIFIED = 'not modified'
+NOT_FOUND = 'not found'
+
+COMPRESSION_GZIP = 'gzip'
+COMPRESSION_LZMA = 'lzma'
+SUFFIXES = {COMPRESSION_GZIP: '.gz', COMPRESSION_LZMA: '.xz'}
+_OPENERS = {'.gz': gzip.open, '.xz': lzma.open}
+# Level 6, the zlib default, is within a few percent of level 9 on the cache and writes faster
+_WRITERS = {COMPRESSION_GZIP: lambda raw: gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6),
+            COMPRESSION_LZMA: lambda raw: lzma.LZMAFile(raw, mode='wb')}
+_COMPRESSORS = {COMPRESSION_GZIP: lambda data: gzip.compress(data, compresslevel=6), COMPRESSION_LZMA: lzma.compress}
+_DECOMPRESSORS = {COMPRESSION_GZIP: gzip.decompress, COMPRESSION_LZMA: lzma.decompress}
+
+_manifest = None
+
+
+class CacheEntry:
+    def __init__(self, file: str, fetched: float, etag: str = None, last_modified: str = None, path: str = None):
+        self.file = file
+        self.fetched = fetched
+        self.etag = etag
+        self.last_modified = last_modified
+        # Where the file is stored, e.g. with the suffix of its compression
+        self.path = path or file
+
+    def age(self) -> float:
+        return time.time() - self.fetched
+
+    def is_fresh(self, ttl: float) -> bool:
+        """
+        :return True if the entry is younger than `ttl` seconds. Without a TTL entries never go stale.
+        """
+        return not ttl or self.age() < ttl
+
+    def conditional_headers(self) -> dict[str, str]:
+        """
+        :return the headers that ask the server to answer 304 if the document did not change
+        """
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        headers['If-Modified-Since'] = self.last_modified or formatdate(self.fetched, usegmt=True)
+        return headers
+
+    def __repr__(self):
+        return f'<CacheEntry(file={self.file}, path={self.path}, fetched={self.fetched}, etag={self.etag}, last_modified={self.last_modified})>'
+
+
+def set_manifest(manifest):
+    """
+    Answers lookups from `manifest` instead of the file system, None to probe the file system again.
+    The manifest maps the plain path of every cached file to the metadata a `.meta` file holds plus the
+    path it is stored at (see implementation.cache_manifest).
+    """
+    global _manifest
+    _manifest = manifest
+
+
+def candidate_paths(file: str) -> list[str]:
+    """
+    :return the paths `file` can be stored at, uncompressed first
+    """
+    return [file] + [f'{file}{suffix}' for suffix in SUFFIXES.values()]
+
+
+def plain_path(path: str) -> str:
+    """
+    :return the plain path of the file stored at `path`
+    """
+    root, suffix = os.path.splitext(path)
+    return root if suffix in _OPENERS else path
+
+
+def stored_path(file: str) -> str:
+    """
+    :return the path `file` is stored at, with or without a compression suffix, or None if it is not cached
+    """
+    if _manifest is not None:
+        meta = _manifest.get(file)
+        return meta['path'] if meta else None
+    pack = cache_pack.pack_of(file)
+    if pack is not None:
+        key = pack.key(file)
+        return pack.stored_path(key) if pack.meta(key) else None
+    for path in candidate_paths(file):
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def read_meta(file: str) -> dict:
+    """
+    :return the content of the `.meta` file of `file` or None if it has none
+    """
+    try:
+        with open(f'{file}{META_SUFFIX}') as meta_file:
+            return json.load(meta_file)
+    except (OSError, ValueError):
+        return None
+
+
+def _meta(file: str) -> dict:
+    if _manifest is not None:
+        return _manifest.get(file)
+    pack = cache_pack.pack_of(file)
+    if pack is not None:
+        return pack.meta(pack.key(file))
+    return read_meta(file)
+
+
+def lookup(file: str, count: bool = True) -> CacheEntry:
+    """
+    :param count: False for another lookup of the same request, so the manifest counts every request once
+    :return the entry of the cached `file` or None if it is not cached or its size does not match the
+            size that was written
+    """
+    if _manifest is not None:
+        meta = _manifest.access(file, count)
+        if meta is None:
+            return None
+        return CacheEntry(file=file, fetched=meta['fetched'], etag=meta.get('etag'), last_modified=meta.get('last_modified'), path=meta['path'])
+
+    pack = cache_pack.pack_of(file)
+    if pack is not None:
+        key = pack.key(file)
+        meta = pack.meta(key)
+        if meta is None:
+            return None
+        return CacheEntry(file=file, fetched=meta['fetched'], etag=meta['etag'], last_modified=meta['last_modified'], path=pack.stored_path(key))
+
+    path = stored_path(file)
+    if path is None:
+        return None
+    meta = read_meta(file)
+    if meta is None or 'fetched' not in meta:
+        return CacheEntry(file=file, fetched=os.path.getmtime(path), path=path)
+    if meta.get('size') is not None and (meta.get('path', file) != path or os.path.getsize(path) != meta['size']):
+        return None
+    return CacheEntry(file=file, fetched=meta['fetched'], etag=meta.get('etag'), last_modified=meta.get('last_modified'), path=path)
+
+
+def _new_meta(file: str, headers, entry: CacheEntry, path: str, size: int, crc: int) -> dict:
+    headers = headers or {}
+    previous = _meta(file) or {}
+    return {'fetched': time.time(),
+            'etag': headers.get('etag') or (entry.etag if entry else None),
+            'last_modified': headers.get('last-modified') or (entry.last_modified if entry else None),
+            'path': path or previous.get('path', file),
+            'size': size if size is not None else previous.get('size'),
+            'crc32': crc if crc is not None else previous.get('crc32')}
+
+
+def store(file: str, headers=None, entry: CacheEntry = None, path: str = None, size: int = None, crc: int = None):
+    """
+    Records that `file` was fetched or revalidated just now, with the validators of the response `headers`.
+    Validators the response does not repeat, e.g. in a 304, are kept from the previous `entry`. What `write`
+    recorded about the stored file is kept unless it is given again.
+    """
+    pack = cache_pack.pack_of(file)
+    if pack is not None:
+        key = pack.key(file)
+        meta = _new_meta(file, headers, entry, path or pack.stored_path(key), size, crc)
+        pack.update_meta(key, meta)
+    else:
+        meta = _new_meta(file, headers, entry, path, size, crc)
+        tmp = f'{file}{META_SUFFIX}.part'
+        with open(tmp, 'w') as meta_file:
+            json.dump(meta, meta_file)
+        os.replace(tmp, f'{file}{META_SUFFIX}')
+    if _manifest is not None:
+        _manifest.put(file, meta)
+
+
+def _write_packed(pack: cache_pack.Pack, file: str, chunks, headers, compression: str) -> str:
+    data = b''.join(chunks)
+    stored = _COMPRESSORS[compression](data) if compression else data
+    key = pack.key(file)
+    meta = _new_meta(file, headers, None, pack.stored_path(key), len(stored), zlib.crc32(data))
+    pack.write(key, stored, meta | {'compression': compression})
+    if _manifest is not None:
+        _manifest.put(file, meta)
+    return meta['path']
+
+
+def write(file: str, chunks, headers=None, compression: str = None) -> str:
+    """
+    Writes the byte `chunks` to a temporary file next to `file` and renames it into place, so a cached
+    file is either complete or missing. Copies of `file` with another compression are removed. Files below
+    a packed directory are written to the pack in one transaction.
+    :return the path the file is stored at
+    """
+    pack = cache_pack.pack_of(file)
+    if pack is not None:
+        return _write_packed(pack, file, chunks, headers, compression)
+
+    path = f'{file}{SUFFIXES[compression]}' if compression else file
+    folder = os.path.dirname(file)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=folder or None, prefix=os.path.basename(file), suffix='.part')
+    crc = 0
+    try:
+        with os.fdopen(fd, 'wb') as raw:
+            out = _WRITERS[compression](raw) if compression else raw
+            with out:
+                for chunk in chunks:
+                    crc = zlib.crc32(chunk, crc)
+                    out.write(chunk)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+    for other in candidate_paths(file):
+        if other != path and os.path.exists(other):
+            os.remove(other)
+    store(file, headers, path=path, size=os.path.getsize(path), crc=crc)
+    return path
+
+
+def version(file: str):
+    """
+    :return a value that changes whenever `file` is written again, None if it is not cached. Loose files are
+            identified by their path, modification time and size.
+    """
+    if _manifest is not None:
+        meta = _manifest.get(file)
+        return (meta['path'], meta['fetched'], meta['size']) if meta else None
+    pack = cache_pack.pack_of(file)
+    if pack is not None:
+        key = pack.key(file)
+        meta = pack.meta(key)
+        return (pack.stored_path(key), meta['fetched'], meta['size']) if meta else None
+    path = stored_path(file)
+    if path is None:
+        archive, member = archive_reader.split_path(file)
+        if archive is None or not os.path.isfile(archive):
+            return None
+        path = archive
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def move(file: str, folder: str, keep: bool = False) -> str:
+    """
+    Moves the cached `file` into `folder`, e.g. to inspect a file that could not be processed, and drops it
+    from the cache. With `keep` it is copied and stays cached. A packed file is written to `folder`
+    uncompressed.
+    :return the path it was moved to or None if it is not cached
+    """
+    path = stored_path(file)
+    if path is None:
+        return None
+    os.makedirs(folder, exist_ok=True)
+    pack = cache_pack.pack_of(file)
+    if pack is not None:
+        destination = os.path.join(folder, os.path.basename(file))
+        try:
+            with open_document(file) as document, open(destination, 'wb') as out:
+                out.write(document.read())
+        finally:
+            if not keep:
+                pack.delete(pack.key(file))
+    elif keep:
+        destination = os.path.join(folder, os.path.basename(path))
+        shutil.copyfile(path, destination)
+    else:
+        destination = os.path.join(folder, os.path.basename(path))
+        shutil.move(path, destination)
+        if os.path.exists(f'{file}{META_SUFFIX}'):
+            os.remove(f'{file}{META_SUFFIX}')
+    if _manifest is not None and not keep:
+        _manifest.remove(file)
+    return destination
+
+
+def delete(file: str):
+    """
+    Drops the cached `file` with its metadata, e.g. to keep the cache within its budget.
+    """
+    pack = cache_pack.pack_of(file)
+    if pack is not None:
+        pack.delete(pack.key(file))
+    else:
+        for path in candidate_paths(file) + [f'{file}{META_SUFFIX}']:
+            if os.path.exists(path):
+                os.remove(path)
+    if _manifest is not None:
+        _manifest.remove(file)
+
+
+def _read_packed(pack: cache_pack.Pack, file: str) -> bytes:
+    key = pack.key(file)
+    row = pack.read(key)
+    if row is None:
+        raise FileNotFoundError(f'{file} is not in {pack.path}')
+    stored, meta = row
+    try:
+        data = _DECOMPRESSORS[meta['compression']](stored) if meta['compression'] else stored
+    except (EOFError, OSError, lzma.LZMAError, zlib.error) as e:
+        raise CacheIntegrityException(f'Cannot read {pack.stored_path(key)}: {e}') from e
+    if meta['crc32'] is not None and zlib.crc32(data) != meta['crc32']:
+        raise CacheIntegrityException(f'Checksum mismatch in {pack.stored_path(key)}')
+    return data
+
+
+def open_document(file: str):
+    """
+    Opens a cached file for reading in binary mode, decompressing it if needed, or a member of an archive
+    (see archive_reader). Files written through `write` are checked against the recorded CRC32. A file the
+    manifest holds but that was deleted by hand, e.g. with its year directory to force a refetch, is
+    dropped from the manifest, so the next request for it fetches it again.
+    :raise CacheIntegrityException if the file is damaged
+    """
+    pack = cache_pack.pack_of(file)
+    if pack is not None:
+        return io.BytesIO(_read_packed(pack, file))
+
+    path = stored_path(file)
+    if path is None:
+        return archive_reader.open_document(file)
+
+    meta = _meta(file) or {}
+    suffix = os.path.splitext(path)[1]
+    try:
+        if suffix in _OPENERS:
+            with _OPENERS[suffix](path, 'rb') as compressed:
+                data = compressed.read()
+        else:
+            with open(path, 'rb') as plain:
+                data = plain.read()
+    except FileNotFoundError:
+        if _manifest is not None:
+            _manifest.remove(file)
+        raise
+    except (EOFError, OSError, lzma.LZMAError, zlib.error) as e:
+        raise CacheIntegrityException(f'Cannot read {path}: {e}') from e
+    if meta.get('crc32') is not None and meta.get('path', file) == path and zlib.crc32(data) != meta['crc32']:
+        raise CacheIntegrityException(f'Checksum mismatch in {path}')
+    return io.BytesIO(data)
+
+
+def open_text(file: str, newline: str = None):
+    """
+    Opens a cached file like `open_document`, in text mode.
+    """
+    return io.TextIOWrapper(open_document(file), encoding='utf-8', newline=newline)
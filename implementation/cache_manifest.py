@@ -0,0 +1,357 @@
+from connarchitecture.abstract_cache import AbstractCache
+from connarchitecture.decorators import overrides
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import Counter
+from threading import Lock, Thread, Event
+import implementation.cache as cache
+import implementation.cache_pack as cache_pack
+import sqlite3
+import time
+import os
+
+
+class CacheManifest(AbstractCache):
+    """
+    Keeps the metadata of every cached file in memory, so the pollers learn whether a file is cached, where
+    it is stored and how fresh it is without touching the file system. The manifest is loaded from a SQLite
+    database at startup and every write to the cache updates both. A missing or empty database is built
+    by scanning the cache directory. Entries of files that were deleted by hand are dropped when they are
+    read. `cache rebuild` reconciles the manifest with the files on disk, e.g. after files were
+    copied into the cache by hand.
+
+    Every top-level directory of the cache, e.g. concepts or prices, is an area with its own hit rate and
+    optionally a disk budget in megabytes (`budgets`). An area that grows beyond its budget is shrunk to
+    `low_water` of it by evicting the files that were looked up least recently (`policy` lru) or fetched
+    first (`policy` age). Areas are collected every `gc_interval` seconds in the background and by `cache gc`,
+    never by a write. Files looked up or written in the last `grace` seconds are not evicted, so documents
+    that still wait for their extraction stay cached. Lookup times are kept in memory and written to the
+    database by `cache gc` and on cleanup. `cache stats` reports every area.
+    """
+    CMD_REBUILD = 'rebuild'
+    CMD_GC = 'gc'
+    CMD_STATS = 'stats'
+    POLICY_LRU = 'lru'
+    POLICY_AGE = 'age'
+    COLUMNS = ('path', 'fetched', 'etag', 'last_modified', 'size', 'crc32')
+
+    def __init__(self, **kwargs):
+        AbstractCache.__init__(self)
+        self._path = kwargs.get('path', 'cache/manifest.db')
+        self._root = os.path.normpath(kwargs.get('root', 'cache'))
+        self._scan_threads = kwargs.get('scan_threads', 16)
+        # Area -> megabytes
+        self._budgets = kwargs.get('budgets', {})
+        self._policy = kwargs.get('policy', CacheManifest.POLICY_LRU)
+        self._low_water = kwargs.get('low_water', 0.9)
+        self._gc_interval = kwargs.get('gc_interval', 60)
+        self._grace = kwargs.get('grace', 3600)
+        self._entries = {}
+        # File -> time it was last looked up, only for files looked up since they were first recorded
+        self._accessed = {}
+        self._accessed_changed = set()
+        self._sizes = Counter()
+        self._counts = Counter()
+        self._lookups = Counter()
+        self._hits = Counter()
+        self._evicted = Counter()
+        self._lock = Lock()
+        # One collection at a time per area
+        self._gc_locks = {area: Lock() for area in self._budgets}
+        self._gc_thread = None
+        self._stop_event = Event()
+        self._db = None
+
+    def component_name(self):
+        return "CacheManifest"
+
+    @overrides(AbstractCache)
+    def initialize(self):
+        folder = os.path.dirname(self._path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._db = sqlite3.connect(self._path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS entries (file TEXT PRIMARY KEY, path TEXT, fetched REAL, etag TEXT, last_modified TEXT, size INTEGER, crc32 INTEGER, accessed REAL)')
+            # Manifests written before lookup times were recorded
+            if 'accessed' not in [row[1] for row in self._db.execute('PRAGMA table_info(entries)')]:
+                self._db.execute('ALTER TABLE entries ADD COLUMN accessed REAL')
+        for row in self._db.execute(f"SELECT file, {', '.join(CacheManifest.COLUMNS)}, accessed FROM entries"):
+            self._entries[row[0]] = dict(zip(CacheManifest.COLUMNS, row[1:-1]))
+            if row[-1] is not None:
+                self._accessed[row[0]] = row[-1]
+        self._recount()
+
+        if self._entries:
+            self.log(f"Loaded {len(self._entries)} entries from {self._path}")
+        else:
+            start = time.monotonic()
+            self.rebuild()
+            self.log(f"Built manifest of {self._root} with {len(self._entries)} entries in {time.monotonic() - start:.1f}s")
+        cache.set_manifest(self)
+        if self._budgets and self._gc_interval:
+            self._gc_thread = Thread(target=self._run_gc, daemon=True)
+            self._gc_thread.start()
+
+    @overrides(AbstractCache)
+    def cleanup(self):
+        cache.set_manifest(None)
+        self._stop_event.set()
+        if self._gc_thread:
+            self._gc_thread.join()
+        if self._db:
+            self._write_accessed()
+            with self._lock:
+                self._db.close()
+                self._db = None
+
+    @overrides(AbstractCache)
+    def command(self, args: list[str]) -> str:
+        if args == [CacheManifest.CMD_REBUILD]:
+            start = time.monotonic()
+            added, updated, removed = self.rebuild()
+            return f"Manifest rebuilt in {time.monotonic() - start:.1f}s: {len(self._entries)} entries ({added} added, {updated} updated, {removed} removed)"
+        if args == [CacheManifest.CMD_GC]:
+            start = time.monotonic()
+            evicted = {area: self.collect(area) for area in sorted(self._budgets)}
+            self._write_accessed()
+            freed = ', '.join([f"{area} {count} files ({size / 1024 / 1024:.1f}MB)" for area, (count, size) in evicted.items()])
+            return f"Collected in {time.monotonic() - start:.1f}s: {freed or 'no budgets configured'}"
+        if args == [CacheManifest.CMD_STATS]:
+            return self._area_statistics()
+        return f"Usage: cache {CacheManifest.CMD_REBUILD}|{CacheManifest.CMD_GC}|{CacheManifest.CMD_STATS}"
+
+    @overrides(AbstractCache)
+    def statistics(self) -> str:
+        return f"{'Cache manifest':>15}: {len(self._entries)} entries, {sum(self._sizes.values()) / 1024 / 1024:.1f}MB, {sum(self._evicted.values())} evicted\n"
+
+    def _area_statistics(self) -> str:
+        result = ""
+        with self._lock:
+            for area in sorted(set(self._counts) | set(self._lookups) | set(self._budgets)):
+                lookups = self._lookups[area]
+                hit_rate = self._hits[area] / lookups * 100 if lookups else 0.0
+                budget = f" of {self._budgets[area]}MB" if area in self._budgets else ""
+                result += f"{area or '.':>15}: {self._counts[area]} entries, {self._sizes[area] / 1024 / 1024:.1f}MB{budget}, {lookups} lookups ({hit_rate:.0f}% hit rate), {self._evicted[area]} evicted\n"
+        return result
+
+    def _area(self, file: str) -> str:
+        """
+        :return the top-level directory of the cache that holds `file`, '' for files directly in the cache
+        """
+        relative = file[len(self._root) + 1:] if file.startswith(f'{self._root}/') else os.path.relpath(file, self._root).replace(os.sep, '/')
+        area, _, rest = relative.partition('/')
+        return area if rest else ''
+
+    def _recount(self):
+        self._sizes = Counter()
+        self._counts = Counter()
+        for file, meta in self._entries.items():
+            area = self._area(file)
+            self._sizes[area] += meta['size'] or 0
+            self._counts[area] += 1
+
+    def get(self, file: str) -> dict:
+        """
+        :return the metadata of the cached `file` (see COLUMNS) or None if it is not cached
+        """
+        return self._entries.get(file)
+
+    def access(self, file: str, count: bool = True) -> dict:
+        """
+        Looks `file` up like `get` and records the time for the eviction policy. With `count` the lookup counts
+        towards the hit rate of its area.
+        """
+        meta = self._entries.get(file)
+        with self._lock:
+            if meta is not None:
+                self._accessed[file] = time.time()
+                self._accessed_changed.add(file)
+            if count:
+                area = self._area(file)
+                self._lookups[area] += 1
+                if meta is not None:
+                    self._hits[area] += 1
+        return meta
+
+    def put(self, file: str, meta: dict):
+        meta = {column: meta.get(column) for column in CacheManifest.COLUMNS}
+        area = self._area(file)
+        with self._lock:
+            previous = self._entries.get(file)
+            if previous is not None:
+                self._sizes[area] -= previous['size'] or 0
+                self._counts[area] -= 1
+            self._entries[file] = meta
+            self._sizes[area] += meta['size'] or 0
+            self._counts[area] += 1
+            with self._db:
+                self._db.execute(f"INSERT OR REPLACE INTO entries (file, {', '.join(CacheManifest.COLUMNS)}, accessed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                 (file,) + tuple(meta.values()) + (self._accessed.get(file),))
+
+    def remove(self, file: str):
+        with self._lock:
+            meta = self._entries.pop(file, None)
+            if meta is not None:
+                area = self._area(file)
+                self._sizes[area] -= meta['size'] or 0
+                self._counts[area] -= 1
+            self._accessed.pop(file, None)
+            self._accessed_changed.discard(file)
+            with self._db:
+                self._db.execute('DELETE FROM entries WHERE file=?', (file,))
+
+    def _is_over_budget(self, area: str) -> bool:
+        return area in self._budgets and self._sizes[area] > self._budgets[area] * 1024 * 1024
+
+    def _write_accessed(self):
+        with self._lock:
+            changed = [(self._accessed[file], file) for file in self._accessed_changed if file in self._accessed]
+            self._accessed_changed.clear()
+            with self._db:
+                self._db.executemany('UPDATE entries SET accessed=? WHERE file=?', changed)
+
+    def _eviction_order(self, area: str) -> list[tuple[str, int, float]]:
+        """
+        :return (file, size, time it was last looked up or written) of the files in `area`, the first to evict first
+        """
+        with self._lock:
+            # Files never looked up count as looked up when they were fetched
+            files = [(file, meta['size'] or 0, max(self._accessed.get(file, 0), meta['fetched']), meta['fetched']) for file, meta in self._entries.items() if self._area(file) == area]
+        files.sort(key=lambda item: item[3] if self._policy == CacheManifest.POLICY_AGE else item[2])
+        return [(file, size, used) for file, size, used, fetched in files]
+
+    def collect(self, area: str) -> tuple[int, int]:
+        """
+        Evicts files from `area` until it is within `low_water` of its budget. Files used in the last `grace`
+        seconds are skipped.
+        :return the number of (evicted files, freed bytes)
+        """
+        with self._gc_locks[area]:
+            if not self._is_over_budget(area):
+                return (0, 0)
+            target = self._budgets[area] * 1024 * 1024 * self._low_water
+            excess = self._sizes[area] - target
+            evicted = 0
+            freed = 0
+            recent = time.time() - self._grace
+            for file, size, used in self._eviction_order(area):
+                if freed >= excess:
+                    break
+                if used > recent:
+                    continue
+                cache.delete(file)
+                evicted += 1
+                freed += size
+            with self._lock:
+                self._evicted[area] += evicted
+            if evicted:
+                self.log(f"Evicted {evicted} files ({freed / 1024 / 1024:.1f}MB) from {area}")
+            return (evicted, freed)
+
+    def _run_gc(self):
+        while not self._stop_event.wait(self._gc_interval):
+            try:
+                for area in sorted(self._budgets):
+                    self.collect(area)
+            except Exception as e:
+                self.log_exception(message="Cache collection failed", exception=e)
+
+    def _is_manifest_file(self, path: str) -> bool:
+        # The database and its -wal and -shm files
+        return path.startswith(self._path)
+
+    def _scan_pack(self, path: str) -> list[tuple[str, dict]]:
+        pack = cache_pack.open_pack(path)
+        return [(f'{pack.directory}/{key}', {column: meta.get(column) for column in CacheManifest.COLUMNS} | {'path': pack.stored_path(key)}) for key, meta in pack.entries()]
+
+    def _scan_file(self, entry: os.DirEntry, known: dict) -> tuple[str, dict]:
+        """
+        :return (plain path, metadata) of the cached file `entry`, None if it is no cached file or its size
+                does not match the size that was written
+        """
+        path = entry.path
+        if path.endswith(cache.META_SUFFIX) or path.endswith('.part') or f'{cache_pack.SUFFIX}-' in path or self._is_manifest_file(path):
+            return None
+        file = cache.plain_path(path)
+        size = entry.stat().st_size
+        meta = known.get(file)
+        if meta and meta['path'] == path and meta['size'] == size:
+            return (file, meta)
+
+        meta = cache.read_meta(file)
+        if meta and 'fetched' in meta and meta.get('path', file) == path:
+            if meta.get('size') is not None and meta['size'] != size:
+                return None
+            return (file, {column: meta.get(column) for column in CacheManifest.COLUMNS} | {'path': path, 'size': size})
+        return (file, {'path': path, 'fetched': entry.stat().st_mtime, 'etag': None, 'last_modified': None, 'size': size, 'crc32': None})
+
+    def _scan_directory(self, directory: str, known: dict) -> tuple[list[tuple[str, dict]], list[str]]:
+        """
+        :return (the cached files in `directory`, its subdirectories)
+        """
+        files = []
+        subdirectories = []
+        with os.scandir(directory) as iterator:
+            entries = list(iterator)
+        names = set([entry.name for entry in entries])
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                # The files of a packed directory are read from its pack
+                if f'{entry.name}{cache_pack.SUFFIX}' not in names:
+                    subdirectories.append(entry.path)
+            elif entry.name.endswith(cache_pack.SUFFIX):
+                files += self._scan_pack(entry.path)
+            elif entry.is_file():
+                scanned = self._scan_file(entry, known)
+                if scanned:
+                    files.append(scanned)
+        return (files, subdirectories)
+
+    def _scan(self) -> dict[str, dict]:
+        """
+        Walks the cache directory with one task per directory, so the stat calls of many directories
+        are in flight at the same time.
+        :return the metadata of every cached file on disk by plain path
+        """
+        found = {}
+        if not os.path.isdir(self._root):
+            return found
+        known = dict(self._entries)
+        with ThreadPoolExecutor(max_workers=self._scan_threads) as executor:
+            pending = {executor.submit(self._scan_directory, self._root, known)}
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    files, subdirectories = future.result()
+                    for file, meta in files:
+                        # A file stored twice, e.g. with and without compression, is found at its latest path
+                        if file not in found or meta['fetched'] > found[file]['fetched']:
+                            found[file] = meta
+                    pending |= {executor.submit(self._scan_directory, subdirectory, known) for subdirectory in subdirectories}
+        return found
+
+    def rebuild(self) -> tuple[int, int, int]:
+        """
+        Reconciles the manifest with the files on disk. Entries written while the disk was scanned are kept.
+        :return the number of (added, updated, removed) entries
+        """
+        started = time.time()
+        found = self._scan()
+        with self._lock:
+            changed = {file: meta for file, meta in found.items() if self._entries.get(file) != meta and (file not in self._entries or self._entries[file]['fetched'] < started)}
+            removed = [file for file, meta in self._entries.items() if file not in found and meta['fetched'] < started]
+            added = len([file for file in changed if file not in self._entries])
+
+            with self._db:
+                self._db.executemany(f"INSERT OR REPLACE INTO entries (file, {', '.join(CacheManifest.COLUMNS)}, accessed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                     [(file,) + tuple(meta[column] for column in CacheManifest.COLUMNS) + (self._accessed.get(file),) for file, meta in changed.items()])
+                self._db.executemany('DELETE FROM entries WHERE file=?', [(file,) for file in removed])
+            self._entries.update(changed)
+            for file in removed:
+                del self._entries[file]
+                self._accessed.pop(file, None)
+                self._accessed_changed.discard(file)
+            self._recount()
+        return (added, len(changed) - added, len(removed))
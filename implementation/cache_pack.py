@@ -0,0 +1,148 @@
+"""
+Packed cache directories. A directory of the cache, e.g. cache/concepts, can be packed into one SQLite
+database next to it, cache/concepts.pack, with one row per file holding its content, compressed or not,
+and the metadata a `.meta` file would hold. Copying, backing up or warming the directory then costs one
+file instead of thousands. The files are addressed by their plain path as before and `cache` reads and
+writes them through the pack. Like archive members, their stored path is `<pack>/<key>`, e.g.
+cache/concepts.pack/AAPL/Assets.json.
+
+Packs are found by looking for `<directory>.pack` next to the directories of a file. The result is
+remembered per directory, so a pack created while the connector runs is only used after a restart.
+"""
+from threading import local, Lock
+import sqlite3
+import os
+
+SUFFIX = '.pack'
+COLUMNS = ('fetched', 'etag', 'last_modified', 'size', 'crc32', 'compression')
+
+# Directory -> Pack of the directory or of one of its parents, None if it is not packed
+_packs = {}
+_open_packs = {}
+_lock = Lock()
+
+
+class Pack:
+    def __init__(self, path: str):
+        self.path = path
+        self.directory = path[:-len(SUFFIX)]
+        # sqlite3 connections must not be shared between threads
+        self._local = local()
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, 'db', None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30)
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=NORMAL')
+            with db:
+                db.execute('CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, data BLOB, fetched REAL, etag TEXT, last_modified TEXT, size INTEGER, crc32 INTEGER, compression TEXT)')
+            self._local.db = db
+        return db
+
+    def key(self, file: str) -> str:
+        if file.startswith(f'{self.directory}/'):
+            return file[len(self.directory) + 1:]
+        return os.path.relpath(file, self.directory).replace(os.sep, '/')
+
+    def stored_path(self, key: str) -> str:
+        return f'{self.path}/{key}'
+
+    def meta(self, key: str) -> dict:
+        """
+        :return the metadata of `key` (see COLUMNS) or None if it is not in the pack
+        """
+        row = self._db().execute(f"SELECT {', '.join(COLUMNS)} FROM entries WHERE key=?", (key,)).fetchone()
+        return dict(zip(COLUMNS, row)) if row else None
+
+    def read(self, key: str) -> tuple[bytes, dict]:
+        """
+        :return (stored content, metadata) of `key` or None if it is not in the pack
+        """
+        row = self._db().execute(f"SELECT data, {', '.join(COLUMNS)} FROM entries WHERE key=?", (key,)).fetchone()
+        return (row[0], dict(zip(COLUMNS, row[1:]))) if row else None
+
+    def write(self, key: str, data: bytes, meta: dict):
+        self.write_many([(key, data, meta)])
+
+    def write_many(self, entries: list[tuple[str, bytes, dict]]):
+        """
+        Stores (key, stored content, metadata) `entries` in one transaction.
+        """
+        db = self._db()
+        with db:
+            db.executemany(f"INSERT OR REPLACE INTO entries (key, data, {', '.join(COLUMNS)}) VALUES ({', '.join(['?'] * (len(COLUMNS) + 2))})",
+                           [(key, data) + tuple(meta.get(column) for column in COLUMNS) for key, data, meta in entries])
+
+    def update_meta(self, key: str, meta: dict):
+        """
+        Replaces the metadata of `key`, except for its size and compression, which belong to its content.
+        """
+        columns = [column for column in COLUMNS if column not in ('size', 'compression')]
+        db = self._db()
+        with db:
+            db.execute(f"UPDATE entries SET {', '.join([f'{column}=?' for column in columns])} WHERE key=?", tuple(meta.get(column) for column in columns) + (key,))
+
+    def close(self):
+        """
+        Closes the connection of the calling thread.
+        """
+        db = getattr(self._local, 'db', None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+    def delete(self, key: str):
+        db = self._db()
+        with db:
+            db.execute('DELETE FROM entries WHERE key=?', (key,))
+
+    def entries(self):
+        """
+        :return an iterator over (key, metadata) of all entries
+        """
+        for row in self._db().execute(f"SELECT key, {', '.join(COLUMNS)} FROM entries"):
+            yield (row[0], dict(zip(COLUMNS, row[1:])))
+
+
+def open_pack(path: str) -> Pack:
+    """
+    :return the pack stored at `path`, created if it does not exist. There is one Pack per path and process.
+    """
+    with _lock:
+        if path not in _open_packs:
+            _open_packs[path] = Pack(path)
+            # Directories below it may have been looked up before it existed
+            _packs.clear()
+        return _open_packs[path]
+
+
+def remove_pack(path: str):
+    """
+    Deletes the pack stored at `path`. Its files are not cached anymore unless they were unpacked.
+    """
+    with _lock:
+        pack = _open_packs.pop(path, None)
+        if pack:
+            pack.close()
+        _packs.clear()
+    for suffix in ['', '-wal', '-shm']:
+        if os.path.exists(f'{path}{suffix}'):
+            os.remove(f'{path}{suffix}')
+
+
+def pack_of(file: str) -> Pack:
+    """
+    :return the pack that holds `file` or None if no directory of `file` is packed
+    """
+    directory = os.path.dirname(file)
+    pack = _packs.get(directory, False)
+    if pack is False:
+        if not directory or directory == file:
+            pack = None
+        elif os.path.isfile(f'{directory}{SUFFIX}'):
+            pack = open_pack(f'{directory}{SUFFIX}')
+        else:
+            pack = pack_of(directory)
+        _packs[directory] = pack
+    return pack
@@ -0,0 +1,26 @@
+"""
+Requests whose results the sender stored. A delivery identifies a request, e.g. ticker, concept, units and
+years, and the version of the document it was extracted from. A poller skips a request that was delivered
+from the same version of its document before, instead of parsing and sending the same rows again. A request
+whose extraction or sending failed, or that asks for anything else, e.g. another year, is extracted.
+
+Deliveries are kept in memory, so after a restart every request is extracted once.
+"""
+from threading import Lock
+
+_delivered = set()
+_lock = Lock()
+
+
+def record(delivery: tuple):
+    """
+    Called by the sender once the results of the request were committed.
+    """
+    if delivery is not None:
+        with _lock:
+            _delivered.add(delivery)
+
+
+def is_delivered(delivery: tuple) -> bool:
+    with _lock:
+        return delivery in _delivered
@@ -0,0 +1,205 @@
+from connarchitecture.rate_limiter import RateLimiter
+from threading import Lock
+import os
+import implementation.http_session as http_session
+import implementation.cache as cache
+from implementation.negative_cache import NegativeCache
+import requests
+
+
+class EdgarApi:
+    """
+    Mixin for pollers of the EDGAR API. Provides the CIK <-> ticker mapping, which is loaded once and shared
+    by all pollers, and the API URLs. Set `_base_url` to point a poller at a stand-in server and `_endpoint`
+    to choose between one document per concept (companyconcept) and one per company (companyfacts).
+    """
+    API_HOST = 'data.sec.gov'
+    TICKERS_URL = 'https://www.sec.gov/include/ticker.txt'
+    HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/71.0.3578.98 Safari/537.36'}
+    _shared_cik_to_ticker_map = {}
+    _shared_lock = Lock()
+    ENDPOINT_COMPANY_CONCEPT = 'companyconcept'
+    ENDPOINT_COMPANY_FACTS = 'companyfacts'
+    # A request the host throttled (429/503) is sent again after the rate limiter backed off
+    DOWNLOAD_ATTEMPTS = 3
+    _base_url = f'https://{API_HOST}'
+    _endpoint = ENDPOINT_COMPANY_CONCEPT
+    _cache_dir = 'cache/concepts'
+    _facts_cache_dir = 'cache/companyfacts'
+    _frames_cache_dir = 'cache/frames'
+    _download_locks = {}
+    # Document -> number of times it was downloaded in this process
+    _shared_generations = {}
+    # Seconds after which cached documents are revalidated, None to never revalidate
+    _ttl = None
+    # cache.COMPRESSION_GZIP or cache.COMPRESSION_LZMA to compress cached documents
+    _compression = None
+    # Seconds during which a document the API answered with 404 is not requested again, 0 to always request it
+    _negative_ttl = 86400
+    _negative_cache_path = 'negative.db'
+    _shared_negative_caches = {}
+
+    def _download_tickers(self, file: str) -> str:
+        self.log('Downloading CIK <-> tickers mapping')
+
+        result = False
+        url = EdgarApi.TICKERS_URL
+        RateLimiter.wait(url)
+        with http_session.get(url, stream=True) as r:
+            RateLimiter.feedback(url, r.status_code, r.headers)
+            if r.status_code == requests.codes.ok:
+                with open(file, 'wb') as f:
+                    for data in r.iter_content(chunk_size=1024 * 1024):
+                        f.write(data)
+                    result = True
+        return result
+
+    def _read_tickers_file(self, file: str) -> dict[str, str]:
+        result = {}
+        with open(file) as f:
+            for line in f:
+                (ticker, cik) = line.split()
+                result[ticker.strip().lower()] = '0' * (10 - len(cik.strip())) + cik.strip()
+        return result
+
+    def _fetch_cik_to_ticker_map(self, file: str) -> dict[str, str]:
+        if not os.path.exists(file):
+            if not self._download_tickers(file):
+                raise Exception('Could not download ticker file!')
+        return self._read_tickers_file(file)
+
+    def _load_cik_to_ticker_map(self, file: str = 'cache/ticker.txt'):
+        with EdgarApi._shared_lock:
+            if not EdgarApi._shared_cik_to_ticker_map:
+                EdgarApi._shared_cik_to_ticker_map = self._fetch_cik_to_ticker_map(file=file)
+
+    def _open_negative_cache(self):
+        with EdgarApi._shared_lock:
+            if self._negative_cache_path not in EdgarApi._shared_negative_caches:
+                EdgarApi._shared_negative_caches[self._negative_cache_path] = NegativeCache(self._negative_cache_path)
+
+    def _miss_key(self, ticker: str, concept: str) -> tuple[str, str, str]:
+        # A missing companyfacts document is missing for all concepts of the company
+        return (ticker.lower(), '' if self._endpoint == EdgarApi.ENDPOINT_COMPANY_FACTS else concept, self._endpoint)
+
+    def _is_known_miss(self, ticker: str, concept: str) -> bool:
+        """
+        :return True if the document of `concept` for `ticker` was missing less than `_negative_ttl` seconds ago
+        """
+        return bool(self._negative_ttl) and EdgarApi._shared_negative_caches[self._negative_cache_path].is_missing(*self._miss_key(ticker, concept), self._negative_ttl)
+
+    def _record_miss(self, ticker: str, concept: str):
+        if self._negative_ttl:
+            EdgarApi._shared_negative_caches[self._negative_cache_path].add(*self._miss_key(ticker, concept))
+
+    def _discard_miss(self, ticker: str, concept: str):
+        EdgarApi._shared_negative_caches[self._negative_cache_path].discard(*self._miss_key(ticker, concept))
+
+    def _concept_source(self, ticker: str, concept: str) -> tuple[str, str]:
+        """
+        :return (url, cache file) of the document that holds `concept` for `ticker`: one document per concept
+                or, with the companyfacts endpoint, one document with all concepts of the company.
+                (None, None) if there is no CIK for the ticker.
+        """
+        cik = EdgarApi._shared_cik_to_ticker_map.get(ticker.lower())
+        if not cik:
+            return (None, None)
+        if self._endpoint == EdgarApi.ENDPOINT_COMPANY_FACTS:
+            return (f'{self._base_url}/api/xbrl/companyfacts/CIK{cik}.json', f'{self._facts_cache_dir}/{ticker}.json')
+        return (f'{self._base_url}/api/xbrl/companyconcept/CIK{cik}/us-gaap/{concept}.json', f'{self._cache_dir}/{ticker}/{concept}.json')
+
+    def _delivery(self, file: str, status: str, *request) -> tuple:
+        """
+        Counts the versions of `file` downloaded in this process. A request that was delivered from the
+        current version (see implementation.deliveries) is neither parsed nor sent again, whatever the
+        outcome of the download.
+        :return the delivery of `request`, e.g. ticker, concept, units and years, from the current version of `file`
+        """
+        with EdgarApi._shared_lock:
+            if status == cache.FETCHED:
+                EdgarApi._shared_generations[file] = EdgarApi._shared_generations.get(file, 0) + 1
+            return (file, EdgarApi._shared_generations.get(file, 0)) + request
+
+    def _download(self, url: str, file: str, description: str) -> tuple[str, str]:
+        """
+        Downloads `url` into the cache file `file` unless it is cached already. A cached file older than the
+        poller's TTL is revalidated with a conditional request.
+        :return (file, cache.FETCHED, cache.CACHED or cache.NOT_MODIFIED), file is None if the download failed.
+                (None, cache.NOT_FOUND) if the API does not have the document.
+        """
+        entry = cache.lookup(file)
+        if entry and entry.is_fresh(self._ttl):
+            return (file, cache.CACHED)
+
+        with self._download_lock(file):
+            entry = cache.lookup(file, count=False)
+            if entry and entry.is_fresh(self._ttl):
+                return (file, cache.CACHED)
+            os.makedirs(os.path.dirname(file), exist_ok=True)
+
+            headers = dict(EdgarApi.HEADERS, **entry.conditional_headers()) if entry else EdgarApi.HEADERS
+            self.log(f'{"Revalidating" if entry else "Downloading"} {description}')
+            for attempt in range(EdgarApi.DOWNLOAD_ATTEMPTS):
+                RateLimiter.wait(url)
+                # The response is closed in any case, so its connection goes back to the pool
+                with http_session.get(url, headers=headers, stream=True) as r:
+                    if RateLimiter.feedback(url, r.status_code, r.headers):
+                        self.log_error(f'{RateLimiter.host_of(url)} throttled {description} ({r.status_code})')
+                        continue
+                    if entry and r.status_code == requests.codes.not_modified:
+                        cache.store(file, r.headers, entry)
+                        return (file, cache.NOT_MODIFIED)
+                    if r.status_code == requests.codes.not_found:
+                        return (None, cache.NOT_FOUND)
+                    if r.status_code != requests.codes.ok:
+                        return (None, None)
+                    # Other threads use the file as soon as it exists, so it must appear complete
+                    cache.write(file, r.iter_content(chunk_size=1024 * 1024), r.headers, compression=self._compression)
+                    return (file, cache.FETCHED)
+            return (None, None)
+
+    def _frame_source(self, concept: str, units: str, period: str) -> tuple[str, str]:
+        """
+        :return (url, cache file) of the frame with `concept` of all companies for `period`, e.g. CY2014 or CY2014Q4I
+        """
+        # Units with a denominator are written as e.g. USD-per-shares in frame URLs
+        units = units.replace('/', '-per-')
+        return (f'{self._base_url}/api/xbrl/frames/us-gaap/{concept}/{units}/{period}.json', f'{self._frames_cache_dir}/{concept}/{units}/{period}.json')
+
+    def _ciks_for_tickers(self, tickers) -> dict[int, list[str]]:
+        """
+        Maps the CIKs of `tickers` back to the tickers. Tickers without a CIK are left out.
+        """
+        result = {}
+        for ticker in tickers:
+            cik = EdgarApi._shared_cik_to_ticker_map.get(ticker.lower())
+            if cik:
+                result.setdefault(int(cik), []).append(ticker)
+        return result
+
+    def _concept_source_description(self, ticker: str, concept: str) -> str:
+        if self._endpoint == EdgarApi.ENDPOINT_COMPANY_FACTS:
+            return f'company facts for {ticker}'
+        return f'{concept} for {ticker}'
+
+    def _download_lock(self, file: str) -> Lock:
+        # Several polls may need the same document, e.g. concepts of one company in companyfacts mode.
+        # Only one thread downloads it.
+        with EdgarApi._shared_lock:
+            return EdgarApi._download_locks.setdefault(file, Lock())
+
+    @staticmethod
+    def _concept_years(year) -> tuple[int]:
+        # A concept item asks for one year or, once coalesced, for a tuple of years
+        return tuple(year) if isinstance(year, (tuple, list)) else (year,)
+
+    @staticmethod
+    def _concept_key(items) -> tuple[str, str, str]:
+        ticker, concept, year, units = items
+        return (ticker.lower(), concept, units)
+
+    @staticmethod
+    def _merge_concept_items(queued, items) -> tuple:
+        ticker, concept, year, units = queued
+        years = set(EdgarApi._concept_years(year)) | set(EdgarApi._concept_years(items[2]))
+        return (ticker, concept, tuple(sorted(years)), units)
@@ -4,3 +4,8 @@ from connarchitecture.exceptions import ProcessException
 class ExtractorException(ProcessException):
     def __init__(self, message, poll_reference=None):
         ProcessException.__init__(self, message, poll_reference)
+
+
+class CacheIntegrityException(ProcessException):
+    def __init__(self, message, poll_reference=None):
+        ProcessException.__init__(self, message, poll_reference)
@@ -0,0 +1,72 @@
+"""
+Extraction inside the worker processes of the parser's process pool. Every process loads the
+extractors once (see initialize) and returns the results in a compact picklable form: plain tuples
+instead of model objects, see Data.to_record and Data.from_record.
+"""
+from connarchitecture.logging_component import LoggingComponent
+from implementation.data_extraction_request import DataExtractionRequest
+from implementation.extractor_loader import ExtractorLoader
+from implementation.extractor_result import ExtractorResult
+import implementation.payload_cache as payload_cache
+from importlib import import_module
+import traceback
+import os
+
+_host = None
+
+
+class ExtractionHost(LoggingComponent, ExtractorLoader):
+    def __init__(self):
+        LoggingComponent.__init__(self, f"ExtractionProcess-{os.getpid()}")
+        self._extractors = self._load_extractors()
+
+    def extract(self, request: DataExtractionRequest) -> list[tuple]:
+        """
+        :return one (extractor_name, records, error) tuple per extractor that handled the request.
+                records maps 'module.ClassName' of the model to a list of records.
+        """
+        result = []
+        for extractor in self._extractors:
+            if extractor.does_support_input(request):
+                try:
+                    extractor_result = extractor.do_extract(request)
+                    records = {}
+                    for data in extractor_result.result_list or []:
+                        records.setdefault(f"{type(data).__module__}.{type(data).__name__}", []).append(data.to_record())
+                    result.append((extractor_result.extractor_name, records, None))
+                except Exception:
+                    result.append((extractor.component_name(), None, traceback.format_exc()))
+        return result
+
+
+def initialize(payload_cache_size: int = payload_cache.DEFAULT_MAX_BYTES, payload_counters=None):
+    global _host
+    payload_cache.configure(payload_cache_size, payload_counters)
+    _host = ExtractionHost()
+
+
+def extract(request: DataExtractionRequest) -> list[tuple]:
+    return _host.extract(request)
+
+
+def extract_batch(requests: list[DataExtractionRequest]) -> list[list[tuple]]:
+    return [_host.extract(request) for request in requests]
+
+
+_model_classes = {}
+
+
+def to_extractor_result(extractor_name: str, records: dict[str, list[tuple]]) -> ExtractorResult:
+    """
+    Rebuilds an ExtractorResult with model objects from the records returned by `extract`.
+    """
+    result = ExtractorResult()
+    result.extractor_name = extractor_name
+    result.result_list = []
+    for class_path, class_records in records.items():
+        if class_path not in _model_classes:
+            module, name = class_path.rsplit('.', 1)
+            _model_classes[class_path] = getattr(import_module(module), name)
+        model_class = _model_classes[class_path]
+        result.result_list += [model_class.from_record(record) for record in class_records]
+    return result
@@ -1,8 +1,8 @@
 from connarchitecture.abstract_transaction_handler import AbstractTransactionHandler
 from connarchitecture.decorators import overrides
 from connarchitecture.poll_reference import PollReference
+import implementation.cache as cache
 import os
-import shutil
 
 
 class FileTransactionHandler(AbstractTransactionHandler):
@@ -27,16 +27,17 @@ class FileTransactionHandler(AbstractTransactionHandler):
             os.makedirs(destination_dir)
 
     def _move(self, poll_reference, destination_dir):
-        if poll_reference.file and os.path.exists(str(poll_reference.file)):
+        # Cached files may be stored compressed or in a pack
+        path = cache.stored_path(str(poll_reference.file)) if poll_reference.file else None
+        if path:
             folder = destination_dir
-            if poll_reference.year:
-                folder = f'{folder}/{poll_reference.year}'
+            # A poll of coalesced years has one document for all of them, which is filed under the first year
+            year = poll_reference.year or (min(poll_reference.years) if poll_reference.years else None)
+            if year:
+                folder = f'{folder}/{year}'
             if poll_reference.ticker:
                 folder = f'{folder}/{poll_reference.ticker}'
 
-            self._create_dirs_if_not_exists(folder)
-
-            file_name = os.path.basename(poll_reference.file)
-            destination_path = os.path.join(folder, file_name)
-            self.log(f"Moving {poll_reference.file} into {destination_path}")
-            shutil.move(poll_reference.file, destination_path)
+            # Other requests may still need a shared document, so it stays in the cache
+            self.log(f"{'Copying' if poll_reference.shared else 'Moving'} {path} into {folder}")
+            cache.move(str(poll_reference.file), folder, keep=poll_reference.shared)
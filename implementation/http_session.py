@@ -0,0 +1,30 @@
+"""
+Pooled HTTP sessions for the pollers. Every thread gets its own requests.Session, because sessions are
+not thread-safe. A session keeps its connections alive, so consecutive downloads from the same host
+skip the TCP and TLS handshakes.
+"""
+from threading import local
+from requests.adapters import HTTPAdapter
+import requests
+
+POOL_SIZE = 4
+
+_local = local()
+
+
+def session() -> requests.Session:
+    """
+    :return the session of the calling thread
+    """
+    s = getattr(_local, 'session', None)
+    if s is None:
+        s = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        s.mount('https://', adapter)
+        s.mount('http://', adapter)
+        _local.session = s
+    return s
+
+
+def get(url: str, **kwargs) -> requests.Response:
+    return session().get(url, **kwargs)
@@ -27,5 +27,16 @@ class Concept(Data):
     def get_ticker(self):
         return self.ticker
 
+    @overrides(Data)
+    def to_record(self) -> tuple:
+        return (self.ticker.symbol, self.name, self.year, self.value)
+
+    @classmethod
+    @overrides(Data)
+    def from_record(cls, record: tuple):
+        from implementation.model.ticker import Ticker
+        symbol, name, year, value = record
+        return cls(ticker=Ticker(symbol=symbol), name=name, year=year, value=value)
+
     def __repr__(self):
         return f'<Concept(name={self.name}, year={self.year}, value={self.value})>'
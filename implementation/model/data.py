@@ -12,3 +12,17 @@ class Data(db.Base):
     @abstractmethod
     def get_ticker(self):
         pass
+
+    @abstractmethod
+    def to_record(self) -> tuple:
+        """
+        Compact picklable representation of the object, used to return results from extraction processes.
+        """
+        pass
+
+    @classmethod
+    def from_record(cls, record: tuple):
+        """
+        Creates a new object from a record returned by to_record.
+        """
+        pass
@@ -3,6 +3,7 @@ from implementation.model.data import Data
 from connarchitecture.decorators import overrides
 from sqlalchemy import Column, Date, Integer, Float, UniqueConstraint, ForeignKey
 from sqlalchemy.orm import relationship
+from datetime import date
 
 
 class Price(Data):
@@ -34,5 +35,16 @@ class Price(Data):
     def get_ticker(self):
         return self.ticker
 
+    @overrides(Data)
+    def to_record(self) -> tuple:
+        return (self.ticker.symbol, self.date.toordinal(), self.open, self.high, self.low, self.close, self.adj_close, self.volume)
+
+    @classmethod
+    @overrides(Data)
+    def from_record(cls, record: tuple):
+        from implementation.model.ticker import Ticker
+        symbol, ordinal, open, high, low, close, adj_close, volume = record
+        return cls(ticker=Ticker(symbol=symbol), date=date.fromordinal(ordinal), open=open, high=high, low=low, close=close, adj_close=adj_close, volume=volume)
+
     def __repr__(self):
         return f'<Price(date={self.date}, open={self.open}, high={self.high}, low={self.low}, close={self.close}, adj_close={self.adj_close}, volume={self.volume})>'
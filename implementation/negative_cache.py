@@ -0,0 +1,53 @@
+"""
+Requests that are known to have no document, e.g. concepts EDGAR answered with 404 for a company. Misses
+are recorded per ticker, concept and endpoint in a SQLite database, so they survive restarts, and kept in
+memory. A recorded miss is trusted for the TTL of the poller asking; after that the document is requested
+again.
+"""
+from threading import Lock
+import sqlite3
+import time
+import os
+
+
+class NegativeCache:
+    def __init__(self, path: str):
+        self._path = path
+        self._lock = Lock()
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        with self._db:
+            self._db.execute('CREATE TABLE IF NOT EXISTS misses (ticker TEXT, concept TEXT, endpoint TEXT, recorded REAL, PRIMARY KEY (ticker, concept, endpoint))')
+        self._misses = {(ticker, concept, endpoint): recorded for ticker, concept, endpoint, recorded in self._db.execute('SELECT ticker, concept, endpoint, recorded FROM misses')}
+
+    def __len__(self):
+        return len(self._misses)
+
+    def is_missing(self, ticker: str, concept: str, endpoint: str, ttl: float) -> bool:
+        """
+        :return True if the document was missing less than `ttl` seconds ago
+        """
+        recorded = self._misses.get((ticker, concept, endpoint))
+        return recorded is not None and time.time() - recorded < ttl
+
+    def add(self, ticker: str, concept: str, endpoint: str):
+        recorded = time.time()
+        with self._lock:
+            self._misses[(ticker, concept, endpoint)] = recorded
+            with self._db:
+                self._db.execute('INSERT OR REPLACE INTO misses VALUES (?, ?, ?, ?)', (ticker, concept, endpoint, recorded))
+
+    def discard(self, ticker: str, concept: str, endpoint: str):
+        """
+        Forgets the miss, e.g. because the document exists now.
+        """
+        if (ticker, concept, endpoint) not in self._misses:
+            return
+        with self._lock:
+            self._misses.pop((ticker, concept, endpoint), None)
+            with self._db:
+                self._db.execute('DELETE FROM misses WHERE ticker=? AND concept=? AND endpoint=?', (ticker, concept, endpoint))
@@ -1,83 +1,78 @@
 from connarchitecture.abstract_parser import AbstractParser
 from connarchitecture.decorators import overrides
-from implementation.abstract_extractor import AbstractExtractor
 from implementation.data_extraction_request import DataExtractionRequest
-from implementation.extractor_result import ExtractorResult
-import os
+from implementation.extractor_loader import ExtractorLoader
+from implementation.exceptions import ExtractorException
+import implementation.extraction_process as extraction_process
+import implementation.payload_cache as payload_cache
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 
 
-class Parser(AbstractParser):
+class Parser(AbstractParser, ExtractorLoader):
+    _executor = None
+
     def __init__(self, name, **kwargs):
         AbstractParser.__init__(self, name, **kwargs)
         self._extractors = []
         self._extractors_default = []
-
-    def _load_class(self, cls):
-        parts = cls.split('.')
-        module = ".".join(parts[:-1])
-        m = __import__(module)
-        for comp in parts[1:]:
-            m = getattr(m, comp)
-        return m
-
-    def _load_extractors(self):
-        self.log("Loading extractors")
-        result = []
-        for f in sorted(os.listdir("extractors")):
-            path = os.path.join("extractors", f)
-            if os.path.isfile(path) and path.endswith('.py'):
-                name = os.path.splitext(os.path.basename(f))[0]
-                mod_name = f"extractors.{name}.{name}"
-                extractor_class = self._load_class(mod_name)
-
-                if issubclass(extractor_class, AbstractExtractor):
-                    extractor = extractor_class()
-                    extractor._name_str = name
-                    result.append(extractor)
-                else:
-                    self.log(f"{name} does not appear to be an extractor type. Ignoring")
-
-        return result
+        self._processes = kwargs.get('processes', 0)
+        # Megabytes of documents whose parsed payloads are kept per process, 0 to disable
+        self._payload_cache_size = int(kwargs.get('payload_cache_mb', payload_cache.DEFAULT_MAX_BYTES / 1024 / 1024) * 1024 * 1024)
 
     @overrides(AbstractParser)
     def static_initialize(self):
-        pass
+        if self._processes:
+            self.log(f"Starting {self._processes} extraction process(es)")
+            context = multiprocessing.get_context('spawn')
+            # The extraction processes count into shared memory, so stats can sum their counters
+            counters = context.Array('q', payload_cache.COUNTERS)
+            payload_cache.configure(self._payload_cache_size, counters)
+            Parser._executor = ProcessPoolExecutor(max_workers=self._processes,
+                                                   mp_context=context,
+                                                   initializer=extraction_process.initialize,
+                                                   initargs=(self._payload_cache_size, counters))
+        else:
+            payload_cache.configure(self._payload_cache_size)
 
     @overrides(AbstractParser)
     def initialize(self):
         self.log("init")
-        self._extractors = self._load_extractors()
-        self.log(f"Loaded {len(self._extractors)} extractor(s):\n{self._loaded_extractors_message(self._extractors)}\n")
+        if not Parser._executor:
+            self._extractors = self._load_extractors()
+            self.log(f"Loaded {len(self._extractors)} extractor(s):\n{self._loaded_extractors_message(self._extractors)}\n")
 
-    def _loaded_extractors_message(self, extractors) -> str:
+    def _to_parse_result(self, request: DataExtractionRequest, extracted: list[tuple]):
         result = []
-        PAD = 4
-        COLUMNS = 3
-        extractor_names = sorted([ex.component_name() for ex in extractors])
-        max_name_len = max([len(name) for name in extractor_names])
-        max_number_len = len(str(len(extractors)+1))
-        column_width = max_name_len + max_number_len + PAD
-        no_of_lines = len(extractors)//COLUMNS + 1
-
-        start = 0
-        end = 0
-        line = "{:<{w}}"*COLUMNS + '\n'
-        for l in range(1, no_of_lines):
-            end = start + l*COLUMNS
-            fields = [f"{start+index+1}. {name}" for index, name in enumerate(extractor_names[start:end])]
-            result.append(line.format(*fields, **{'w': column_width}))
-            start = end
-
-        # Append any remaining extractors
-        if end < len(extractors):
-            line = "{:<{w}}"*(len(extractors) - end)
-            fields = [f"{end+index+1}. {name}" for index, name in enumerate(extractor_names[end:])]
-            result.append(line.format(*fields, **{'w': column_width}))
-
-        return '\n'.join(result)
+        for extractor_name, records, error in extracted:
+            if error:
+                try:
+                    raise ExtractorException(message=f"{extractor_name} failed in extraction process:\n{error}", poll_reference=request.poll_reference)
+                except ExtractorException as e:
+                    self.throw(e, poll_reference=request.poll_reference)
+            else:
+                result.append(extraction_process.to_extractor_result(extractor_name, records))
+        return result
+
+    def _parse_in_process(self, request: DataExtractionRequest):
+        return self._to_parse_result(request, Parser._executor.submit(extraction_process.extract, request).result())
+
+    @overrides(AbstractParser)
+    def parse_batch(self, requests: list[DataExtractionRequest], poll_references):
+        if not Parser._executor:
+            return AbstractParser.parse_batch(self, requests, poll_references)
+
+        # One task per process instead of one per request, so the pickling overhead is shared
+        chunk_size = -(-len(requests) // self._processes)
+        futures = [Parser._executor.submit(extraction_process.extract_batch, requests[i:i + chunk_size]) for i in range(0, len(requests), chunk_size)]
+        extracted = [e for future in futures for e in future.result()]
+        return [self._to_parse_result(request, e) for request, e in zip(requests, extracted)]
 
     @overrides(AbstractParser)
     def parse(self, request: DataExtractionRequest, poll_reference=None):
+        if Parser._executor:
+            return self._parse_in_process(request)
+
         result = []
         do_extractors = [extractor for extractor in self._extractors if extractor.supports_input(request)]
         if not do_extractors:
@@ -93,6 +88,11 @@ class Parser(AbstractParser):
 
         return result
 
+    @staticmethod
+    @overrides(AbstractParser)
+    def statistics() -> str:
+        return payload_cache.statistics()
+
     @overrides(AbstractParser)
     def cleanup(self):
         self.log("cleanup")
@@ -100,3 +100,6 @@ class Parser(AbstractParser):
     @overrides(AbstractParser)
     def static_cleanup(self):
         self.log("static cleanup")
+        if Parser._executor:
+            Parser._executor.shutdown()
+            Parser._executor = None
@@ -0,0 +1,125 @@
+"""
+Parsed payloads of cached files, shared by the extractors of a process. Extractors that are asked for the
+same document again, e.g. one companyfacts document for every concept of a company, get the payload
+parsed the first time instead of decoding the file again. Payloads are keyed by file, parse function and
+the version of the file (see cache.version), so a file that was written again is parsed again. The cache
+is bounded by the size of the documents its payloads were parsed from and evicts the least recently used
+payload first. Payloads are shared, so extractors must not modify them.
+
+The counters can live in shared memory (see configure), so `stats` sums them over all extraction
+processes.
+"""
+from collections import OrderedDict
+from threading import Lock
+import io
+import implementation.cache as cache
+
+HITS = 0
+MISSES = 1
+EVICTIONS = 2
+ENTRIES = 3
+BYTES = 4
+COUNTERS = 5
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class _LocalCounters(list):
+    def __init__(self):
+        list.__init__(self, [0] * COUNTERS)
+        self._lock = Lock()
+
+    def get_lock(self):
+        return self._lock
+
+
+class PayloadCache:
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, counters=None):
+        """
+        :param counters a multiprocessing Array of COUNTERS integers to share the counters between processes
+        """
+        self._max_bytes = max_bytes
+        self._counters = counters if counters is not None else _LocalCounters()
+        self._payloads = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+
+    def _count(self, counter: int, delta: int = 1):
+        with self._counters.get_lock():
+            self._counters[counter] += delta
+
+    def _remove(self, key):
+        _, size, _ = self._payloads.pop(key)
+        self._bytes -= size
+        self._count(ENTRIES, -1)
+        self._count(BYTES, -size)
+
+    def load(self, file: str, parse):
+        """
+        :return `parse` applied to the cached `file`, opened in binary mode, from memory if it was parsed
+                before and did not change. `parse` must be a module-level function, so that the extractors
+                of all threads share its payloads.
+        """
+        version = cache.version(file) if self._max_bytes else None
+        if version is None:
+            with cache.open_document(file) as document:
+                return parse(document)
+
+        key = (file, parse)
+        with self._lock:
+            cached = self._payloads.get(key)
+            if cached and cached[0] == version:
+                self._payloads.move_to_end(key)
+                self._count(HITS)
+                return cached[2]
+        self._count(MISSES)
+
+        with cache.open_document(file) as document:
+            if not isinstance(document, io.BytesIO):
+                document = io.BytesIO(document.read())
+            size = document.seek(0, io.SEEK_END)
+            document.seek(0)
+            payload = parse(document)
+        if size > self._max_bytes:
+            return payload
+
+        with self._lock:
+            if key in self._payloads:
+                self._remove(key)
+            self._payloads[key] = (version, size, payload)
+            self._bytes += size
+            self._count(ENTRIES)
+            self._count(BYTES, size)
+            while self._bytes > self._max_bytes:
+                self._remove(next(iter(self._payloads)))
+                self._count(EVICTIONS)
+        return payload
+
+    def statistics(self) -> str:
+        with self._counters.get_lock():
+            hits, misses, evictions, entries, size = self._counters[:]
+        hit_rate = hits / (hits + misses) * 100 if hits + misses else 0.0
+        return f"{'Payloads':>15}: {entries} entries, {size / 1024 / 1024:.1f}MB (max {self._max_bytes / 1024 / 1024:.0f}MB per process), hits {hits}, misses {misses} ({hit_rate:.0f}% hit rate), evictions {evictions}\n"
+
+
+_payloads = PayloadCache()
+
+
+def configure(max_bytes: int, counters=None):
+    """
+    Replaces the payload cache of the process with one of `max_bytes`, 0 to disable it.
+    :param counters see PayloadCache
+    """
+    global _payloads
+    _payloads = PayloadCache(max_bytes, counters)
+
+
+def load(file: str, parse):
+    """
+    :return the payload of `file`, see PayloadCache.load
+    """
+    return _payloads.load(file, parse)
+
+
+def statistics() -> str:
+    return _payloads.statistics()
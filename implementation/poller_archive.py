@@ -0,0 +1,88 @@
+from connarchitecture.abstract_poller import AbstractPoller
+from connarchitecture.decorators import overrides
+from connarchitecture.poll_reference import PollReference
+from connarchitecture.rate_limiter import RateLimiter
+from implementation.data_extraction_request import DataExtractionRequest
+from implementation.edgar_api import EdgarApi
+import implementation.archive_reader as archive_reader
+
+
+class PollerArchive(AbstractPoller, EdgarApi):
+    """
+    Serves concept requests from the SEC bulk archive companyfacts.zip, which holds the companyfacts document
+    of every company. The archive is downloaded once if it does not exist. The extractors read the
+    documents straight out of the archive.
+    """
+    _members = set()
+
+    def __init__(self, name, **kwargs):
+        AbstractPoller.__init__(self, name)
+        self._archive = kwargs.get('archive', 'cache/companyfacts.zip')
+        self._archive_url = kwargs.get('archive_url', 'https://www.sec.gov/Archives/edgar/daily-index/xbrl/companyfacts.zip')
+        self._min_interval = kwargs.get('min_interval', 2.5)
+
+    @overrides(AbstractPoller)
+    def static_initialize(self):
+        self.log('static init')
+        self._load_cik_to_ticker_map()
+        RateLimiter.set_interval(RateLimiter.host_of(self._archive_url), self._min_interval)
+        file, status = self._download(url=self._archive_url, file=self._archive, description=f'{self._archive_url}')
+        if not file:
+            raise Exception(f'Could not download {self._archive_url}')
+        PollerArchive._members = set(archive_reader.open_archive(self._archive).namelist())
+        self.log(f'{len(PollerArchive._members)} companies in {self._archive}')
+
+    @overrides(AbstractPoller)
+    def initialize(self):
+        self.log("init")
+
+    @overrides(AbstractPoller)
+    def get_topic(self):
+        return self._topic
+
+    @classmethod
+    @overrides(AbstractPoller)
+    def coalesce_key(cls, items):
+        return EdgarApi._concept_key(items)
+
+    @classmethod
+    @overrides(AbstractPoller)
+    def coalesce(cls, queued, items):
+        return EdgarApi._merge_concept_items(queued, items)
+
+    @overrides(AbstractPoller)
+    def poll(self, items):
+        extraction_request = None
+        poll_reference = PollReference()
+        success = False
+        try:
+            ticker, concept, year, units = items
+            years = self._concept_years(year)
+            poll_reference.ticker = ticker
+            poll_reference.year = years[0] if len(years) == 1 else None
+            poll_reference.years = years
+            poll_reference.concept = concept
+            poll_reference.poller = self.get_name()
+
+            cik = EdgarApi._shared_cik_to_ticker_map.get(ticker.lower())
+            member = f'CIK{cik}.json'
+            if cik and member in PollerArchive._members:
+                poll_reference.file = archive_reader.member_path(self._archive, member)
+                extraction_request = DataExtractionRequest(poll_reference=poll_reference, ticker=ticker, units=units, data={'concept': concept, 'years': years})
+                success = True
+            else:
+                self.log_warning(message=f"{ticker} is not available: no companyfacts in {self._archive}")
+                poll_reference.unavailable = True
+                success = True
+        except Exception as e:
+            self.log_exception(e)
+        finally:
+            return (extraction_request, poll_reference, success)
+
+    @overrides(AbstractPoller)
+    def cleanup(self):
+        self.log("cleanup")
+
+    @overrides(AbstractPoller)
+    def static_cleanup(self):
+        self.log("static cleanup")
@@ -2,90 +2,51 @@ from connarchitecture.abstract_poller import AbstractPoller
 from connarchitecture.decorators import overrides
 from connarchitecture.exceptions import PollerException
 from connarchitecture.poll_reference import PollReference
+from connarchitecture.rate_limiter import RateLimiter
 from implementation.data_extraction_request import DataExtractionRequest
+from implementation.edgar_api import EdgarApi
+import implementation.cache as cache
+import implementation.deliveries as deliveries
 import os
-import requests
-import time
 
 
-class PollerConcept(AbstractPoller):
-    _shared_cik_to_ticker_map = {}
-
+class PollerConcept(AbstractPoller, EdgarApi):
     def __init__(self, name, **kwargs):
         AbstractPoller.__init__(self, name)
-        self._cache_dir = 'cache/concepts'
-
-    def _download_tickers(self, file: str) -> str:
-        self.log('Downloading CIK <-> tickers mapping')
-
-        result = False
-        r = requests.get('https://www.sec.gov/include/ticker.txt', stream=True)
-        if r.status_code == requests.codes.ok:
-            with open(file, 'wb') as f:
-                for data in r:
-                    f.write(data)
-                result = True
-        return result
-
-    def _read_tickers_file(self, file: str) -> dict[str, str]:
-        result = {}
-        with open(file) as f:
-            for line in f:
-                (ticker, cik) = line.split()
-                result[ticker.strip().lower()] = '0' * (10 - len(cik.strip())) + cik.strip()
-        return result
-
-    def _fetch_cik_to_ticker_map(self, file: str) -> dict[str, str]:
-        if not os.path.exists(file):
-            if not self._download_tickers(file):
-                raise Exception('Could not download ticker file!')
-        return self._read_tickers_file(file)
-
-    def _generate_url_for_ticker(self, ticker: str, ciks_to_tickers: dict[str, str], concept: str) -> tuple[str, str, str]:
-        result = (ticker, concept, None)
-
-        if ticker.lower() in ciks_to_tickers:
-            cik = ciks_to_tickers[ticker.lower()]
-            result = (ticker, concept, f'https://data.sec.gov/api/xbrl/companyconcept/CIK{cik}/us-gaap/{concept}.json')
-
-        return result
-
-    def _download_concept(self, url: str, ticker: str, concept: str, destination_root_dir: str) -> str:
-        folder = f'{destination_root_dir}/{ticker}'
-        file = f'{folder}/{concept}.json'
-
-        if os.path.exists(file):
-            # self.log(f'Using cached {concept} ({file})')
-            return file
-        else:
-            os.makedirs(folder, exist_ok=True)
-
-            time.sleep(2.500)
-
-            self.log(f'Downloading {concept} for {ticker}')
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/71.0.3578.98 Safari/537.36'}
-            r = requests.get(url, headers=headers, stream=True)
-            if r.status_code == requests.codes.ok:
-                with open(file, 'wb') as f:
-                    for data in r:
-                        f.write(data)
-                    return file
-            return None
+        self._min_interval = kwargs.get('min_interval', 2.5)
+        self._base_url = kwargs.get('base_url', self._base_url)
+        self._endpoint = kwargs.get('endpoint', self._endpoint)
+        self._ttl = kwargs.get('ttl', self._ttl)
+        self._compression = kwargs.get('compression', self._compression)
+        self._negative_ttl = kwargs.get('negative_ttl', self._negative_ttl)
+        self._negative_cache_path = kwargs.get('negative_cache', self._negative_cache_path)
 
     @overrides(AbstractPoller)
     def static_initialize(self):
         self.log('static init')
-        PollerConcept._shared_cik_to_ticker_map = self._fetch_cik_to_ticker_map(file='cache/ticker.txt')
+        self._load_cik_to_ticker_map()
+        self._open_negative_cache()
 
     @overrides(AbstractPoller)
     def initialize(self):
         self.log("init")
-        os.makedirs(self._cache_dir, exist_ok=True)
+        os.makedirs(self._facts_cache_dir if self._endpoint == EdgarApi.ENDPOINT_COMPANY_FACTS else self._cache_dir, exist_ok=True)
+        RateLimiter.set_interval(RateLimiter.host_of(self._base_url), self._min_interval)
 
     @overrides(AbstractPoller)
     def get_topic(self):
         return self._topic
 
+    @classmethod
+    @overrides(AbstractPoller)
+    def coalesce_key(cls, items):
+        return EdgarApi._concept_key(items)
+
+    @classmethod
+    @overrides(AbstractPoller)
+    def coalesce(cls, queued, items):
+        return EdgarApi._merge_concept_items(queued, items)
+
     @overrides(AbstractPoller)
     def poll(self, items):
         extraction_request = None
@@ -93,23 +54,44 @@ class PollerConcept(AbstractPoller):
         success = False
         try:
             ticker, concept, year, units = items
+            years = self._concept_years(year)
             poll_reference.ticker = ticker
-            poll_reference.year = year
+            poll_reference.year = years[0] if len(years) == 1 else None
+            poll_reference.years = years
             poll_reference.concept = concept
             poll_reference.poller = self.get_name()
 
-            ticker, concept, url = self._generate_url_for_ticker(ticker=ticker, ciks_to_tickers=PollerConcept._shared_cik_to_ticker_map, concept=concept)
-            if url:
+            url, file = self._concept_source(ticker=ticker, concept=concept)
+            if not url:
+                self.log_warning(message=f"{ticker} is not available: no CIK in the ticker file")
+                poll_reference.unavailable = True
+                success = True
+            elif self._is_known_miss(ticker=ticker, concept=concept):
+                # Neither waits for the rate limiter nor asks the API again
+                poll_reference.url = url
+                poll_reference.unavailable = True
+                success = True
+            else:
                 poll_reference.url = url
-                file = self._download_concept(url=url, ticker=ticker, concept=concept, destination_root_dir=self._cache_dir)
+                description = self._concept_source_description(ticker=ticker, concept=concept)
+                file, status = self._download(url=url, file=file, description=description)
                 if file:
                     poll_reference.file = file
-                    extraction_request = DataExtractionRequest(poll_reference=poll_reference, ticker=ticker, units=units, data={'url': url, 'concept': concept, 'year': year})
+                    poll_reference.shared = self._endpoint == EdgarApi.ENDPOINT_COMPANY_FACTS
+                    if status == cache.FETCHED:
+                        self._discard_miss(ticker=ticker, concept=concept)
+                    delivery = self._delivery(file, status, ticker.lower(), concept, units, years)
+                    if not deliveries.is_delivered(delivery):
+                        poll_reference.delivery = delivery
+                        extraction_request = DataExtractionRequest(poll_reference=poll_reference, ticker=ticker, units=units, data={'url': url, 'concept': concept, 'years': years})
+                    success = True
+                elif status == cache.NOT_FOUND:
+                    self.log_warning(message=f"{description} is not available")
+                    self._record_miss(ticker=ticker, concept=concept)
+                    poll_reference.unavailable = True
                     success = True
                 else:
                     self.log_error(message=f"Could not download {url}")
-            else:
-                self.log_error(message=f"No EDGAR API URL for {items}")
         except Exception as e:
             self.log_exception(e)
         finally:
@@ -0,0 +1,132 @@
+from connarchitecture.abstract_poller import AbstractPoller
+from connarchitecture.constants import Constants
+from connarchitecture.decorators import overrides
+from connarchitecture.poll_reference import PollReference
+from connarchitecture.rate_limiter import RateLimiter
+from implementation.data_extraction_request import DataExtractionRequest
+from implementation.edgar_api import EdgarApi
+import implementation.cache as cache
+import implementation.deliveries as deliveries
+import implementation.payload_cache as payload_cache
+import json
+import os
+
+
+class PollerFrame(AbstractPoller, EdgarApi):
+    """
+    Polls the EDGAR frames API, which returns one concept of one period for all companies. Items are
+    (concept, year, units, tickers, priority, source) tuples planned by the directory watcher for requests
+    with many tickers.
+
+    Frames are aligned to calendar years, while FactExtractor stores the values of fiscal years. Only the
+    companies whose fiscal year ends with the calendar year are extracted from the frame. The other tickers,
+    and tickers the frame has no value for, are queued as concept requests with the priority and source of
+    the frame request. The directory watcher only plans frames if concept requests are polled as well.
+    """
+
+    def __init__(self, name, **kwargs):
+        AbstractPoller.__init__(self, name)
+        self._min_interval = kwargs.get('min_interval', 2.5)
+        self._base_url = kwargs.get('base_url', self._base_url)
+        self._ttl = kwargs.get('ttl', self._ttl)
+        self._compression = kwargs.get('compression', self._compression)
+
+    def _periods(self, year: int) -> list[str]:
+        # Flow concepts (e.g. NetIncomeLoss) have annual frames, point in time concepts (e.g. Liabilities)
+        # have instantaneous frames at the end of the year
+        return [f'CY{year}', f'CY{year}Q4I']
+
+    @staticmethod
+    def _fiscal_year_ciks(file: str, year: int) -> set[int]:
+        """
+        :return the CIKs of the companies whose value in the frame `file` is the value of fiscal `year`, i.e.
+                whose period ends between late December of `year` and early January, for 52/53 week years
+        """
+        first, last = f'{year}-12-24', f'{year + 1}-01-07'
+        return set([fact['cik'] for fact in payload_cache.load(file, json.load).get('data', []) if first <= fact.get('end', '') <= last])
+
+    @overrides(AbstractPoller)
+    def static_initialize(self):
+        self.log('static init')
+        self._load_cik_to_ticker_map()
+
+    @overrides(AbstractPoller)
+    def initialize(self):
+        self.log("init")
+        os.makedirs(self._frames_cache_dir, exist_ok=True)
+        RateLimiter.set_interval(RateLimiter.host_of(self._base_url), self._min_interval)
+
+    @overrides(AbstractPoller)
+    def get_topic(self):
+        return self._topic
+
+    @classmethod
+    @overrides(AbstractPoller)
+    def coalesce_key(cls, items):
+        concept, year, units, tickers, priority, source = items
+        return (concept, year, units)
+
+    @classmethod
+    @overrides(AbstractPoller)
+    def coalesce(cls, queued, items):
+        concept, year, units, tickers, priority, source = queued
+        return (concept, year, units, tuple(sorted(set(tickers) | set(items[3]))), priority, source)
+
+    @overrides(AbstractPoller)
+    def poll(self, items):
+        extraction_request = None
+        poll_reference = PollReference()
+        success = False
+        try:
+            concept, year, units, tickers, priority, source = items
+            poll_reference.year = year
+            poll_reference.concept = concept
+            poll_reference.poller = self.get_name()
+
+            statuses = []
+            for period in self._periods(year):
+                url, file = self._frame_source(concept=concept, units=units, period=period)
+                poll_reference.url = url
+                file, status = self._download(url=url, file=file, description=f'{concept} frame {period} for {len(tickers)} tickers')
+                statuses.append(status)
+                if file:
+                    poll_reference.file = file
+                    fiscal_year_ciks = self._fiscal_year_ciks(file, year)
+                    ciks = {cik: ciks_tickers for cik, ciks_tickers in self._ciks_for_tickers(tickers).items() if cik in fiscal_year_ciks}
+                    covered = set([ticker for ciks_tickers in ciks.values() for ticker in ciks_tickers])
+                    # A frame request that was delivered from this version of the frame is neither extracted nor
+                    # planned again. Its concept requests were queued the first time.
+                    delivery = self._delivery(file, status, concept, units, year, tuple(sorted(tickers)))
+                    if not deliveries.is_delivered(delivery):
+                        self._request_concepts([ticker for ticker in tickers if ticker not in covered], concept, year, units, priority, source)
+                        if ciks:
+                            poll_reference.delivery = delivery
+                            extraction_request = DataExtractionRequest(poll_reference=poll_reference, ticker=None, units=units,
+                                                                       data={'url': url, 'concept': concept, 'years': (year,), 'frame': period, 'ciks': ciks})
+                    success = True
+                    break
+            else:
+                if all([status == cache.NOT_FOUND for status in statuses]):
+                    self.log_warning(message=f"No frame for {concept} {year} ({units})")
+                    self._request_concepts(list(tickers), concept, year, units, priority, source)
+                    success = True
+                else:
+                    self.log_error(message=f"No frame for {concept} {year} ({units})")
+        except Exception as e:
+            self.log_exception(e)
+        finally:
+            return (extraction_request, poll_reference, success)
+
+    def _request_concepts(self, tickers: list[str], concept: str, year: int, units: str, priority: int, source: str):
+        if tickers:
+            self.log(f"{len(tickers)} tickers have no fiscal year {year} value in the {concept} frame, requesting them per ticker")
+        for ticker in tickers:
+            self._in_queue.put_topic(Constants.TOPIC_CONCEPT, (ticker, concept, year, units), priority=priority, source=source)
+
+    @overrides(AbstractPoller)
+    def cleanup(self):
+        self.log("cleanup")
+
+    @overrides(AbstractPoller)
+    def static_cleanup(self):
+        self.log("static cleanup")
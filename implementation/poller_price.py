@@ -1,91 +1,304 @@
 from connarchitecture.abstract_poller import AbstractPoller
 from connarchitecture.decorators import overrides
 from connarchitecture.poll_reference import PollReference
+from connarchitecture.rate_limiter import RateLimiter
 from implementation.data_extraction_request import DataExtractionRequest
+from implementation.model.price import Price
+from implementation.model.ticker import Ticker
+import implementation.http_session as http_session
+import implementation.cache as cache
+from implementation.exceptions import CacheIntegrityException
+import implementation.database as db
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from threading import Lock
 import os
-from datetime import datetime
+from datetime import datetime, date, timedelta
 import requests
+import time
 import re
 
 
 class PollerPrice(AbstractPoller):
+    """
+    Polls daily prices from Yahoo Finance. Queued years of the same ticker are merged into one item and
+    downloaded as one date range, which is split into one cache file per year (see `layout`).
+    In incremental mode only the days after the latest price stored in `db` are downloaded and appended
+    to the cache files.
+    """
+    LAYOUT_YEAR = 'year'
+    LAYOUT_TICKER = 'ticker'
     _shared_cik_to_ticker_map = {}
+    _download_host = 'query1.finance.yahoo.com'
+    _headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/71.0.3578.98 Safari/537.36'}
+    # The crumb and the cookies it belongs to are shared by all threads until they expire or are rejected
+    _crumb = None
+    _crumb_cookies = None
+    _crumb_expires = 0.0
+    _crumb_lock = Lock()
+    _Session = None
 
     def __init__(self, name, **kwargs):
         AbstractPoller.__init__(self, name)
         self._cache_dir = 'cache/prices'
+        self._min_interval = kwargs.get('min_interval', 0)
+        self._crumb_ttl = kwargs.get('crumb_ttl', 3600)
+        self._layout = kwargs.get('layout', PollerPrice.LAYOUT_YEAR)
+        self._incremental = kwargs.get('incremental', False)
+        self._db_name = kwargs.get('db', 'database.db')
+        self._ttl = kwargs.get('ttl', None)
+        self._compression = kwargs.get('compression', None)
 
     @overrides(AbstractPoller)
     def static_initialize(self):
         self.log('static init')
+        if self._incremental:
+            engine = create_engine(f'sqlite:///{self._db_name}')
+            PollerPrice._Session = sessionmaker(bind=engine)
+            db.Base.metadata.create_all(engine)
 
     @overrides(AbstractPoller)
     def initialize(self):
         self.log("init")
         os.makedirs(self._cache_dir, exist_ok=True)
+        RateLimiter.set_interval(PollerPrice._download_host, self._min_interval)
 
     @overrides(AbstractPoller)
     def get_topic(self):
         return self._topic
 
-    def _epoch(self, year: int, month: int, day: int) -> int:
-        return int((datetime(year, month, day, 0, 0) - datetime(1970, 1, 1)).total_seconds())
+    @staticmethod
+    def _years(year) -> tuple[int]:
+        return year if isinstance(year, tuple) else (year,)
+
+    @classmethod
+    @overrides(AbstractPoller)
+    def coalesce_key(cls, items):
+        return items[0]
 
-    def _download_historical_data(self, ticker: str, fy: int, destination_root_dir: str) -> str:
-        folder = f'{destination_root_dir}/{fy}'
-        file = f'{folder}/{ticker}.csv'
+    @classmethod
+    @overrides(AbstractPoller)
+    def coalesce(cls, queued, items):
+        ticker, year = queued
+        return (ticker, tuple(sorted(set(cls._years(year)) | set(cls._years(items[1])))))
 
-        start = int(self._epoch(year=fy, month=1, day=1))
-        end = int(self._epoch(year=fy, month=12, day=31))
+    def _cache_file(self, ticker: str, year: int) -> str:
+        if self._layout == PollerPrice.LAYOUT_TICKER:
+            return f'{self._cache_dir}/{ticker}/{year}.csv'
+        return f'{self._cache_dir}/{year}/{ticker}.csv'
 
-        if os.path.exists(file):
-            # self.log(f'Using cached historical data (file={file}) for {ticker}')
-            return file
-        else:
-            os.makedirs(folder, exist_ok=True)
+    def _epoch(self, year: int, month: int, day: int) -> int:
+        return int((datetime(year, month, day, 0, 0) - datetime(1970, 1, 1)).total_seconds())
 
-            self.log(f'Downloading historical data for {ticker}')
+    def _get_crumb(self, ticker: str, rejected: str = None) -> tuple[str, dict]:
+        """
+        :return the cached (crumb, cookies) or fresh ones if they expired or the crumb `rejected` was refused
+        """
+        with PollerPrice._crumb_lock:
+            crumb = PollerPrice._crumb
+            # A crumb other than the rejected one was just refreshed by another thread
+            if crumb and crumb != rejected and (rejected or time.monotonic() < PollerPrice._crumb_expires):
+                return (crumb, PollerPrice._crumb_cookies)
 
+            self.log('Fetching crumb')
             crumble_link = f'https://finance.yahoo.com/quote/{ticker}/history?p={ticker}'
             crumble_regex = r'CrumbStore":{"crumb":"(.*?)"}'
-            cookie_regex = r'set-cookie: (.*?);'
-            headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/71.0.3578.98 Safari/537.36'}
-
-            session = requests.Session()
-            response = session.get(crumble_link, headers=headers)
+            session = http_session.session()
+            response = session.get(crumble_link, headers=PollerPrice._headers)
 
             # get crumbs
             text = str(response.content)
             match = re.search(crumble_regex, text)
-            crumbs = match.group(1)
-            url = f'https://query1.finance.yahoo.com/v7/finance/download/{ticker}?period1={start}&period2={end}&interval=1d&events=history&crumb={crumbs}'
-
+            PollerPrice._crumb = match.group(1)
             # get cookie
-            cookie = session.cookies.get_dict()
-            r = requests.get(url, cookies=cookie, timeout=5, stream=True, headers=headers)
-            data = r.text
-            with open(file, 'w') as f:
-                f.write(data)
-                return file
+            PollerPrice._crumb_cookies = session.cookies.get_dict()
+            PollerPrice._crumb_expires = time.monotonic() + self._crumb_ttl
+            return (PollerPrice._crumb, PollerPrice._crumb_cookies)
+
+    def _download(self, ticker: str, start: int, end: int) -> str:
+        """
+        :return the CSV with the daily prices of `ticker` between the epochs `start` and `end` or None
+        """
+        crumb, cookies = self._get_crumb(ticker)
+        for attempt in range(2):
+            url = f'https://{PollerPrice._download_host}/v7/finance/download/{ticker}?period1={start}&period2={end}&interval=1d&events=history&crumb={crumb}'
+            RateLimiter.wait(url)
+            with http_session.get(url, cookies=cookies, timeout=5, headers=PollerPrice._headers) as r:
+                RateLimiter.feedback(url, r.status_code, r.headers)
+                if r.status_code == requests.codes.unauthorized and attempt == 0:
+                    # The crumb expired early, fetch a new one and try again
+                    crumb, cookies = self._get_crumb(ticker, rejected=crumb)
+                    continue
+                if r.status_code != requests.codes.ok:
+                    self.log_error(f'Could not download historical data for {ticker} ({r.status_code})')
+                    return None
+                return r.text
+
+    def _split_by_year(self, data: str, years: tuple[int]) -> dict[int, str]:
+        """
+        Splits a CSV with daily prices into one CSV per year of `years`. Every part has the header row.
+        """
+        lines = data.splitlines()
+        parts = {year: [lines[0]] if lines else [] for year in years}
+        for line in lines[1:]:
+            # Rows start with the date, e.g. 2014-01-02
+            year = int(line[:4]) if line[:4].isdigit() else None
+            if year in parts:
+                parts[year].append(line)
+        return {year: '\n'.join(part) + '\n' for year, part in parts.items()}
+
+    def _is_fresh(self, entry: cache.CacheEntry, year: int) -> bool:
+        """
+        A year that was fetched a week after it ended does not change anymore. Other years go stale after the TTL.
+        """
+        return entry.fetched >= self._epoch(year=year + 1, month=1, day=8) or entry.is_fresh(self._ttl)
+
+    def _download_historical_data(self, ticker: str, years: tuple[int]) -> dict[int, tuple[str, str]]:
+        """
+        Downloads the years of `ticker` that are not cached or stale in one request, from the first of them to
+        the last, and writes one cache file per year. A year without prices, e.g. before the IPO, is not written.
+        :return (cache file, cache.FETCHED, cache.CACHED or cache.NOT_MODIFIED) of every year, (None, cache.NOT_FOUND)
+                for years without prices and (None, None) for years that could not be downloaded
+        """
+        result = {}
+        missing = []
+        for year in years:
+            file = self._cache_file(ticker=ticker, year=year)
+            entry = cache.lookup(file)
+            if entry and self._is_fresh(entry, year):
+                result[year] = (file, cache.CACHED)
+            else:
+                result[year] = (None, None)
+                missing.append(year)
+
+        if missing:
+            self.log(f'Downloading historical data for {ticker} {min(missing)}-{max(missing)}')
+            start = int(self._epoch(year=min(missing), month=1, day=1))
+            end = int(self._epoch(year=max(missing), month=12, day=31))
+            data = self._download(ticker=ticker, start=start, end=end)
+            if data is not None:
+                for year, part in self._split_by_year(data, missing).items():
+                    # Only the header row
+                    if len(part.splitlines()) <= 1:
+                        result[year] = (None, cache.NOT_FOUND)
+                        continue
+                    file = self._cache_file(ticker=ticker, year=year)
+                    # Yahoo Finance does not answer conditional requests, so a stale year is compared instead
+                    if self._read(file) == part:
+                        cache.store(file)
+                        result[year] = (file, cache.NOT_MODIFIED)
+                        continue
+                    cache.write(file, [part.encode()], compression=self._compression)
+                    result[year] = (file, cache.FETCHED)
+        return result
+
+    def _latest_date(self, ticker: str) -> date:
+        """
+        :return the date of the latest stored price of `ticker` or None
+        """
+        session = PollerPrice._Session()
+        try:
+            return session.query(func.max(Price.date)).join(Price.ticker).filter(Ticker.symbol == ticker).scalar()
+        finally:
+            session.close()
+
+    def _read(self, file: str) -> str:
+        """
+        :return the content of the cache file `file` or None if it is not cached or damaged
+        """
+        if not cache.lookup(file, count=False):
+            return None
+        try:
+            with cache.open_text(file) as f:
+                return f.read()
+        except CacheIntegrityException:
+            return None
+
+    def _append(self, file: str, part: str, complete: bool) -> bool:
+        """
+        Appends the rows of `part` that are newer than the last row of the cache file `file`. The file is
+        replaced as a whole, so it is never left half written. A missing or damaged file is only replaced by
+        `part` if it is `complete`, i.e. holds the whole year.
+        :return False if the file was left alone because `part` is not complete
+        """
+        cached = self._read(file)
+        if cached is None:
+            if not complete:
+                return False
+            cache.write(file, [part.encode()], compression=self._compression)
+            return True
+
+        cached_lines = cached.splitlines()
+        last = cached_lines[-1][:10] if len(cached_lines) > 1 else ''
+        # Dates are ISO formatted, so they compare as strings
+        new_lines = [line for line in part.splitlines()[1:] if line[:10] > last]
+        if new_lines:
+            cache.write(file, [(cached + '\n'.join(new_lines) + '\n').encode()], compression=self._compression)
+        return True
+
+    def _update_historical_data(self, ticker: str, years: tuple[int], since: date) -> dict[int, tuple[str, str]]:
+        """
+        Downloads the days of `years` after `since` in one request and appends them to the cache files.
+        :return (cache file, cache.FETCHED) of every year with new days, (None, None) if the download failed
+        """
+        years = [year for year in years if year >= since.year]
+        first = since + timedelta(days=1)
+        start = int(self._epoch(year=first.year, month=first.month, day=first.day))
+        end = min(int(self._epoch(year=max(years), month=12, day=31)), int(time.time())) if years else start
+        if start >= end:
+            return {}
+
+        self.log(f'Downloading historical data for {ticker} since {since}')
+        data = self._download(ticker=ticker, start=start, end=end)
+        if data is None:
+            return {year: (None, None) for year in years}
+        result = {}
+        incomplete = []
+        for year, part in self._split_by_year(data, years).items():
+            # Days that were cached but not stored yet are extracted again, the cache file keeps them once
+            if len(part.splitlines()) > 1:
+                file = self._cache_file(ticker=ticker, year=year)
+                # Only the years after the year of `since` are downloaded from their first day
+                if self._append(file, part, complete=year > since.year):
+                    result[year] = (file, cache.FETCHED)
+                else:
+                    incomplete.append(year)
+        if incomplete:
+            # Writing only the new days would drop the earlier days of the year, so the whole year is downloaded
+            self.log_warning(message=f"Cache files of {ticker} {', '.join(map(str, incomplete))} are missing or damaged, downloading the whole year")
+            for year in incomplete:
+                cache.delete(self._cache_file(ticker=ticker, year=year))
+            result.update(self._download_historical_data(ticker=ticker, years=tuple(incomplete)))
+        return result
 
     @ overrides(AbstractPoller)
     def poll(self, items):
-        extraction_request = None
-        poll_reference = PollReference()
-        success = False
-
+        """
+        :return one result per year
+        """
         ticker, year = items
-        poll_reference.ticker = ticker
-        poll_reference.year = year
-        poll_reference.poller = self.get_name()
-
-        file = self._download_historical_data(ticker=ticker, fy=year, destination_root_dir=self._cache_dir)
-        if file:
+        years = self._years(year)
+        results = []
+        since = self._latest_date(ticker) if self._incremental else None
+        if since:
+            files = self._update_historical_data(ticker=ticker, years=years, since=since)
+        else:
+            files = self._download_historical_data(ticker=ticker, years=years)
+        for year in years:
+            extraction_request = None
+            poll_reference = PollReference()
+            poll_reference.ticker = ticker
+            poll_reference.year = year
+            poll_reference.poller = self.get_name()
+            # Years without new days are done without parsing
+            file, status = files.get(year, (None, cache.NOT_MODIFIED))
             poll_reference.file = file
-            extraction_request = DataExtractionRequest(poll_reference=poll_reference, ticker=ticker, data={'year': year})
-            success = True
+            poll_reference.unavailable = status == cache.NOT_FOUND
+            if file and status != cache.NOT_MODIFIED:
+                extraction_request = DataExtractionRequest(poll_reference=poll_reference, ticker=ticker, data={'year': year, 'since': since})
+            results.append((extraction_request, poll_reference, status is not None))
 
-        return (extraction_request, poll_reference, success)
+        return results
 
     @ overrides(AbstractPoller)
     def cleanup(self):
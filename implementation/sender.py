@@ -5,6 +5,7 @@ from implementation.model.ticker import Ticker
 from connarchitecture.abstract_sender import AbstractSender
 from connarchitecture.decorators import overrides
 import implementation.database as db
+import implementation.deliveries as deliveries
 from implementation.extractor_result import ExtractorResult
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
@@ -16,6 +17,7 @@ class Sender(AbstractSender):
     _shared_db_conn = None
     _db_lock = Lock()
     _Session = None
+    PRICE_VALUES = ('open', 'high', 'low', 'close', 'adj_close', 'volume')
 
     def __init__(self, name, **kwargs):
         AbstractSender.__init__(self, name, **kwargs)
@@ -35,13 +37,23 @@ class Sender(AbstractSender):
     def initialize(self):
         self.log("init")
 
-    def _persist(self, data: List[Data]):
-        session = Sender._Session()
+    def _persist(self, session, data: List[Data], merged_prices: dict):
+        """
+        :param merged_prices: (symbol, date) -> the Price merged into `session` for that day, shared by all lists
+                              of a batch, so a day that comes twice, e.g. from overlapping ranges, is one row
+        """
+        ticker_ids = {}
+        # Stored prices are looked up once per ticker for all dates of the list, not once per row
+        first_date = min([d.date for d in data if isinstance(d, Price)], default=None)
+        price_ids = {}
         for d in data:
             ticker = d.get_ticker()
-            db_ticker = session.query(Ticker.id).filter_by(symbol=ticker.symbol).first()
-            if db_ticker:
-                ticker.id = db_ticker.id
+            if ticker.symbol not in ticker_ids:
+                db_ticker = session.query(Ticker.id).filter_by(symbol=ticker.symbol).first()
+                if db_ticker:
+                    ticker_ids[ticker.symbol] = db_ticker.id
+            if ticker.symbol in ticker_ids:
+                ticker.id = ticker_ids[ticker.symbol]
 
             if isinstance(d, Concept):
                 db_data = session.query(Concept.id).filter_by(ticker_id=ticker.id, name=d.name, year=d.year).first()
@@ -49,21 +61,50 @@ class Sender(AbstractSender):
                     d.id = db_data.id
 
             elif isinstance(d, Price):
-                db_data = session.query(Price.id).filter_by(ticker_id=ticker.id, date=d.date).first()
-                if db_data:
-                    d.id = db_data.id
+                merged = merged_prices.get((ticker.symbol, d.date))
+                if merged is not None:
+                    # The later row wins, like it would when merged into a stored row
+                    for column in Sender.PRICE_VALUES:
+                        setattr(merged, column, getattr(d, column))
+                    continue
+                # Keyed by symbol, because the id of a new ticker is only known once it was flushed
+                if ticker.symbol not in price_ids:
+                    price_ids[ticker.symbol] = dict(session.query(Price.date, Price.id).filter(Price.ticker_id == ticker.id, Price.date >= first_date).all()) if ticker.id else {}
+                if d.date in price_ids[ticker.symbol]:
+                    d.id = price_ids[ticker.symbol][d.date]
+                merged_prices[(ticker.symbol, d.date)] = session.merge(d)
+                continue
 
             session.merge(d)
-            session.commit()
-        session.close()
 
-    @overrides(AbstractSender)
-    def process(self, result: List[ExtractorResult], poll_reference=None):
+    def _persist_results(self, session, result: List[ExtractorResult], poll_reference, merged_prices: dict):
         for extractor_result in result:
             if extractor_result.result_list:
                 c_width = 15 if poll_reference.concept else 0
-                self.log(f"""Ticker: {poll_reference.ticker:<5} | Results: {len(extractor_result.result_list):<3} {('| Concept: {}'.format(poll_reference.concept) if poll_reference.concept else ''):<{c_width}} | Year: {poll_reference.year:<4}""")
-                self._persist(extractor_result.result_list)
+                years = ", ".join([str(year) for year in poll_reference.years or [poll_reference.year]])
+                self.log(f"""Ticker: {poll_reference.ticker or '-':<5} | Results: {len(extractor_result.result_list):<3} {('| Concept: {}'.format(poll_reference.concept) if poll_reference.concept else ''):<{c_width}} | Year: {years:<4}""")
+                self._persist(session, extractor_result.result_list, merged_prices)
+
+    @overrides(AbstractSender)
+    def process(self, result: List[ExtractorResult], poll_reference=None):
+        self.process_batch([result], [poll_reference])
+
+    @overrides(AbstractSender)
+    def process_batch(self, results: List[List[ExtractorResult]], poll_references):
+        # One session and one commit for the whole batch
+        session = Sender._Session()
+        merged_prices = {}
+        try:
+            for result, poll_reference in zip(results, poll_references):
+                self._persist_results(session, result, poll_reference, merged_prices)
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            session.close()
+        for poll_reference in poll_references:
+            deliveries.record(poll_reference.delivery if poll_reference else None)
 
     @overrides(AbstractSender)
     def cleanup(self):
@@ -0,0 +1,81 @@
+from implementation.exceptions import CacheIntegrityException
+import implementation.cache as cache
+import json
+import os
+import pytest
+
+DOCUMENT = b'{"facts": {"us-gaap": {}}}' * 100
+
+
+@pytest.fixture
+def file(tmp_path):
+    return str(tmp_path / 'concepts' / 'AAPL' / 'Assets.json')
+
+
+def read(file):
+    with cache.open_document(file) as document:
+        return document.read()
+
+
+@pytest.mark.parametrize('compression, suffix', [(None, ''), (cache.COMPRESSION_GZIP, '.gz'), (cache.COMPRESSION_LZMA, '.xz')])
+def test_written_files_read_back_unchanged(file, compression, suffix):
+    path = cache.write(file, [DOCUMENT[:1000], DOCUMENT[1000:]], headers={'etag': '"1"'}, compression=compression)
+    assert path == file + suffix
+    assert cache.stored_path(file) == path
+    assert read(file) == DOCUMENT
+    entry = cache.lookup(file)
+    assert entry.path == path
+    assert entry.etag == '"1"'
+    assert entry.is_fresh(60)
+
+
+def test_writing_with_another_compression_replaces_the_old_copy(file):
+    cache.write(file, [DOCUMENT], compression=cache.COMPRESSION_GZIP)
+    path = cache.write(file, [DOCUMENT], compression=cache.COMPRESSION_LZMA)
+    assert [p for p in cache.candidate_paths(file) if os.path.exists(p)] == [path]
+
+
+def test_checksum_mismatch_is_reported(file):
+    path = cache.write(file, [DOCUMENT])
+    with open(path, 'r+b') as stored:
+        stored.write(b'[')
+    with pytest.raises(CacheIntegrityException):
+        read(file)
+
+
+def test_truncated_compressed_file_is_reported(file):
+    path = cache.write(file, [DOCUMENT], compression=cache.COMPRESSION_GZIP)
+    with open(path, 'r+b') as stored:
+        stored.truncate(os.path.getsize(path) // 2)
+    with open(file + cache.META_SUFFIX) as meta_file:
+        meta = json.load(meta_file)
+    # Keep the recorded size, so only reading the file can tell it is damaged
+    meta['size'] = os.path.getsize(path)
+    with open(file + cache.META_SUFFIX, 'w') as meta_file:
+        json.dump(meta, meta_file)
+    with pytest.raises(CacheIntegrityException):
+        read(file)
+
+
+def test_lookup_ignores_a_file_of_the_wrong_size(file):
+    path = cache.write(file, [DOCUMENT])
+    with open(path, 'ab') as stored:
+        stored.write(b'\n')
+    assert cache.lookup(file) is None
+
+
+def test_files_without_metadata_count_as_fetched_at_their_modification_time(file):
+    cache.write(file, [DOCUMENT])
+    os.remove(file + cache.META_SUFFIX)
+    entry = cache.lookup(file)
+    assert entry.fetched == os.path.getmtime(file)
+    assert entry.etag is None
+    assert read(file) == DOCUMENT
+
+
+def test_delete_removes_the_file_and_its_metadata(file):
+    cache.write(file, [DOCUMENT], compression=cache.COMPRESSION_GZIP)
+    cache.delete(file)
+    assert cache.stored_path(file) is None
+    assert cache.read_meta(file) is None
+    assert cache.lookup(file) is None
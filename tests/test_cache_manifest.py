@@ -0,0 +1,168 @@
+from implementation.cache_manifest import CacheManifest
+import implementation.cache as cache
+import time
+import os
+import pytest
+
+DOCUMENT = b'x' * 1000
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / 'cache')
+
+
+@pytest.fixture
+def manifest(root):
+    manifests = []
+
+    def create(**kwargs):
+        m = CacheManifest(path=f'{root}/manifest.db', root=root, **{'gc_interval': 0} | kwargs)
+        m.initialize()
+        manifests.append(m)
+        return m
+    yield create
+    for m in manifests:
+        m.cleanup()
+
+
+def test_manifest_is_built_from_the_files_on_disk(root, manifest):
+    cache.write(f'{root}/concepts/AAPL/Assets.json', [DOCUMENT], headers={'etag': '"1"'})
+    cache.write(f'{root}/prices/AAPL/2020.csv', [DOCUMENT], compression=cache.COMPRESSION_GZIP)
+    m = manifest()
+    assert m.get(f'{root}/concepts/AAPL/Assets.json')['etag'] == '"1"'
+    assert m.get(f'{root}/prices/AAPL/2020.csv')['path'] == f'{root}/prices/AAPL/2020.csv.gz'
+
+
+def test_lookups_are_answered_from_memory(root, manifest):
+    m = manifest()
+    file = f'{root}/concepts/AAPL/Assets.json'
+    # Recorded, but never written to disk: a lookup that probed the file system would not find it
+    m.put(file, {'path': file, 'fetched': 1.0, 'etag': '"1"', 'size': 10})
+    entry = cache.lookup(file)
+    assert entry.path == file
+    assert entry.etag == '"1"'
+    assert cache.lookup(f'{root}/concepts/AAPL/Liabilities.json') is None
+    assert 'concepts: 1 entries' in m.command(['stats'])
+    assert '2 lookups (50% hit rate)' in m.command(['stats'])
+
+
+def test_writes_update_the_manifest(root, manifest):
+    m = manifest()
+    file = f'{root}/concepts/AAPL/Assets.json'
+    path = cache.write(file, [DOCUMENT], compression=cache.COMPRESSION_LZMA)
+    assert m.get(file)['path'] == path
+    assert m.get(file)['size'] == os.path.getsize(path)
+    cache.delete(file)
+    assert m.get(file) is None
+
+
+def test_file_deleted_by_hand_is_dropped_when_it_is_read(root, manifest):
+    m = manifest()
+    file = f'{root}/concepts/AAPL/Assets.json'
+    cache.write(file, [DOCUMENT])
+    os.remove(file)
+    assert cache.lookup(file) is not None
+    with pytest.raises(FileNotFoundError):
+        cache.open_document(file)
+    assert m.get(file) is None
+    assert cache.lookup(file) is None
+
+
+def test_manifest_is_loaded_from_its_database(root, manifest):
+    m = manifest()
+    file = f'{root}/concepts/AAPL/Assets.json'
+    m.put(file, {'path': file, 'fetched': 1.0, 'size': 10})
+    m.cleanup()
+    assert manifest().get(file)['fetched'] == 1.0
+
+
+def test_rebuild_reconciles_the_manifest_with_the_disk(root, manifest):
+    m = manifest()
+    cache.write(f'{root}/concepts/AAPL/Assets.json', [DOCUMENT])
+    cache.set_manifest(None)
+    cache.write(f'{root}/concepts/MSFT/Assets.json', [DOCUMENT])
+    os.remove(f'{root}/concepts/AAPL/Assets.json')
+    cache.set_manifest(m)
+    assert m.command(['rebuild']).endswith('(1 added, 0 updated, 1 removed)')
+    assert m.get(f'{root}/concepts/AAPL/Assets.json') is None
+    assert m.get(f'{root}/concepts/MSFT/Assets.json') is not None
+
+
+def fill(root, m, count=5):
+    """
+    Writes `count` files of 1000 bytes to the area x, fetched in their order long ago.
+    :return their plain paths
+    """
+    files = [f'{root}/x/{i}.json' for i in range(count)]
+    for i, file in enumerate(files):
+        cache.write(file, [DOCUMENT])
+        m.put(file, dict(m.get(file), fetched=1000.0 + i))
+    return files
+
+
+def remaining(files):
+    return [i for i, file in enumerate(files) if cache.stored_path(file)]
+
+
+def test_sizes_follow_writes_and_removals(root, manifest):
+    m = manifest(budgets={'x': 1})
+    files = fill(root, m, count=3)
+    assert m._sizes['x'] == 3000
+    cache.write(files[0], [DOCUMENT * 2])
+    assert m._sizes['x'] == 4000
+    cache.delete(files[1])
+    assert m._sizes['x'] == 3000
+    assert m._counts['x'] == 2
+
+
+def test_collect_shrinks_an_area_to_its_low_water_mark(root, manifest):
+    # 4096 bytes, shrunk to 2048
+    m = manifest(budgets={'x': 4 / 1024}, low_water=0.5, grace=0)
+    files = fill(root, m)
+    assert m.collect('x') == (3, 3000)
+    assert remaining(files) == [3, 4]
+    assert m.collect('x') == (0, 0)
+    assert 'x: 2 entries, 0.0MB of 0.00390625MB' in m.command(['stats'])
+    assert '3 evicted' in m.command(['stats'])
+
+
+def test_lru_policy_keeps_files_looked_up_recently(root, manifest):
+    m = manifest(budgets={'x': 4 / 1024}, low_water=0.5, grace=0)
+    files = fill(root, m)
+    cache.lookup(files[0])
+    m.collect('x')
+    assert remaining(files) == [0, 4]
+
+
+def test_age_policy_evicts_the_files_fetched_first(root, manifest):
+    m = manifest(budgets={'x': 4 / 1024}, low_water=0.5, grace=0, policy=CacheManifest.POLICY_AGE)
+    files = fill(root, m)
+    cache.lookup(files[0])
+    m.collect('x')
+    assert remaining(files) == [3, 4]
+
+
+def test_files_used_within_the_grace_period_are_not_evicted(root, manifest):
+    m = manifest(budgets={'x': 4 / 1024}, low_water=0.5, grace=3600)
+    files = fill(root, m)
+    cache.lookup(files[1])
+    cache.lookup(files[2])
+    assert m.collect('x') == (3, 3000)
+    assert remaining(files) == [1, 2]
+
+
+def test_writes_do_not_evict(root, manifest):
+    m = manifest(budgets={'x': 4 / 1024}, low_water=0.5, grace=0)
+    files = fill(root, m)
+    assert remaining(files) == [0, 1, 2, 3, 4]
+    assert 'x 3 files' in m.command(['gc'])
+
+
+def test_areas_are_collected_in_the_background(root, manifest):
+    m = manifest(budgets={'x': 4 / 1024}, low_water=0.5, grace=0, gc_interval=0.05)
+    files = fill(root, m)
+    deadline = time.monotonic() + 5
+    while len(remaining(files)) > 2 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert remaining(files) == [3, 4]
@@ -0,0 +1,125 @@
+from connarchitecture.durable_queue import DurableConnectorQueue, STATE_PENDING, STATE_INFLIGHT, STATE_DONE, STATE_FAILED
+import os
+from queue import Empty
+import pytest
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / 'queue.db')
+
+
+def rows(q):
+    return q._db.execute('SELECT COUNT(*) FROM items').fetchone()[0]
+
+
+def counts(q, topic='t'):
+    return q._topic_counts().get(topic, {})
+
+
+def test_items_in_flight_are_served_again_after_a_restart(path):
+    q = DurableConnectorQueue(path)
+    q.put_source('a.json', 1.0, [('t', (1,)), ('t', (2,))])
+    first = q.get_topic('t', block=False)
+    q.close()
+
+    q = DurableConnectorQueue(path)
+    assert q.resumed() == 1
+    assert sorted([tuple(q.get_topic('t', block=False)), tuple(q.get_topic('t', block=False))]) == [(1,), (2,)]
+    with pytest.raises(Empty):
+        q.get_topic('t', block=False)
+    assert first == (1,)
+    q.close()
+
+
+def test_unchanged_sources_are_not_expanded_again(path):
+    q = DurableConnectorQueue(path)
+    q.put_source('a.json', 1.0, [('t', (1,))])
+    q.close()
+
+    q = DurableConnectorQueue(path)
+    assert q.is_enumerated('a.json', 1.0)
+    assert not q.is_enumerated('a.json', 2.0)
+    q.close()
+
+
+def test_a_changed_source_replaces_its_pending_items(path):
+    q = DurableConnectorQueue(path)
+    q.put_source('a.json', 1.0, [('t', (1,)), ('t', (2,))])
+    served = q.get_topic('t', block=False)
+    q.put_source('a.json', 2.0, [('t', (3,))])
+    assert q.topic_qsize('t') == 1
+    assert q.get_topic('t', block=False) == (3,)
+    assert served == (1,)
+    q.close()
+
+
+def test_ack_marks_items_done_or_failed(path):
+    q = DurableConnectorQueue(path)
+    q.put_source('a.json', 1.0, [('t', (1,)), ('t', (2,)), ('t', (3,))])
+    done = q.get_topic('t', block=False)
+    failed = q.get_topic('t', block=False)
+    q.ack(done.work_id, success=True)
+    q.ack(failed.work_id, success=False)
+    # A late success does not override a failure
+    q.ack(failed.work_id, success=True)
+    assert counts(q) == {STATE_DONE: 1, STATE_FAILED: 1, STATE_PENDING: 1}
+    q.close()
+
+
+def test_an_item_with_several_results_is_done_after_the_last_ack(path):
+    q = DurableConnectorQueue(path)
+    q.put_source('a.json', 1.0, [('t', (1,)), ('t', (2,))])
+    item = q.get_topic('t', block=False)
+    q.expect_acks(item.work_id, 3)
+    q.ack(item.work_id, success=True)
+    q.ack(item.work_id, success=True)
+    assert counts(q).get(STATE_INFLIGHT) == 1
+    q.ack(item.work_id, success=True)
+    assert counts(q).get(STATE_INFLIGHT) is None
+    assert counts(q).get(STATE_DONE) == 1
+    q.close()
+
+
+def test_done_items_of_a_finished_source_are_deleted(path):
+    q = DurableConnectorQueue(path)
+    q.put_source('a.json', 1.0, [('t', (1,)), ('t', (2,))])
+    first = q.get_topic('t', block=False)
+    q.ack(first.work_id, success=True)
+    assert rows(q) == 2
+    second = q.get_topic('t', block=False)
+    q.ack(second.work_id, success=True)
+    assert rows(q) == 0
+    # Deleted items are still counted as done
+    assert counts(q) == {STATE_DONE: 2}
+    q.close()
+
+
+def test_sources_take_turns_within_a_priority(path):
+    q = DurableConnectorQueue(path)
+    q.put_source('a.json', 1.0, [('t', ('a', i)) for i in range(3)])
+    q.put_source('b.json', 1.0, [('t', ('b', 0))])
+    q.put_source('c.json', 1.0, [('t', ('c', 0))], priority=1)
+    served = [tuple(q.get_topic('t', block=False)) for _ in range(5)]
+    assert served[0] == ('c', 0)
+    assert served[1:3] in ([('a', 0), ('b', 0)], [('b', 0), ('a', 0)])
+    assert served[3:] == [('a', 1), ('a', 2)]
+    q.close()
+
+
+def test_coalescing_stays_within_a_source(path):
+    q = DurableConnectorQueue(path)
+    q.set_coalescer('t', key=lambda item: item[0], merge=lambda queued, item: (queued[0], queued[1] + item[1]))
+    q.put_source('a.json', 1.0, [('t', ('AAPL', (2020,))), ('t', ('AAPL', (2021,)))])
+    q.put_source('b.json', 1.0, [('t', ('AAPL', (2022,)))])
+    assert q.topic_qsize('t') == 2
+    served = sorted([tuple(q.get_topic('t', block=False)) for _ in range(2)])
+    assert served == [('AAPL', (2020, 2021)), ('AAPL', (2022,))]
+    q.close()
+
+
+def test_close_checkpoints_the_write_ahead_log(path):
+    q = DurableConnectorQueue(path)
+    q.put_source('a.json', 1.0, [('t', (i,)) for i in range(100)])
+    q.close()
+    assert not os.path.exists(path + '-wal') or os.path.getsize(path + '-wal') == 0
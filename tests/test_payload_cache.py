@@ -0,0 +1,76 @@
+from implementation.payload_cache import PayloadCache, HITS, MISSES, EVICTIONS, ENTRIES, BYTES
+import implementation.cache as cache
+import json
+import os
+import pytest
+
+parsed = []
+
+
+def parse(document):
+    payload = json.load(document)
+    parsed.append(payload)
+    return payload
+
+
+@pytest.fixture
+def files(tmp_path):
+    parsed.clear()
+    paths = [str(tmp_path / f'{name}.json') for name in ('a', 'b', 'c')]
+    for path in paths:
+        cache.write(path, [json.dumps({'file': path, 'padding': 'x' * 100}).encode()])
+    return paths
+
+
+def test_second_load_is_served_from_memory(files):
+    payloads = PayloadCache()
+    first = payloads.load(files[0], parse)
+    assert payloads.load(files[0], parse) is first
+    assert len(parsed) == 1
+    assert payloads._counters[HITS] == 1
+    assert payloads._counters[MISSES] == 1
+    assert payloads._counters[ENTRIES] == 1
+    assert 'hits 1, misses 1 (50% hit rate)' in payloads.statistics()
+
+
+def test_least_recently_used_payload_is_evicted_first(files):
+    size = os.path.getsize(files[0])
+    payloads = PayloadCache(max_bytes=2 * size)
+    payloads.load(files[0], parse)
+    payloads.load(files[1], parse)
+    payloads.load(files[0], parse)
+    payloads.load(files[2], parse)
+    assert payloads._counters[EVICTIONS] == 1
+    assert payloads._counters[ENTRIES] == 2
+    assert payloads._counters[BYTES] == 2 * size
+    parsed.clear()
+    payloads.load(files[0], parse)
+    payloads.load(files[2], parse)
+    assert parsed == []
+    payloads.load(files[1], parse)
+    assert len(parsed) == 1
+
+
+def test_file_written_again_is_parsed_again(files):
+    payloads = PayloadCache()
+    assert payloads.load(files[0], parse)['padding'] == 'x' * 100
+    cache.write(files[0], [json.dumps({'padding': 'y'}).encode()])
+    assert payloads.load(files[0], parse)['padding'] == 'y'
+    assert len(parsed) == 2
+    assert payloads._counters[ENTRIES] == 1
+
+
+def test_documents_larger_than_the_cache_are_not_kept(files):
+    payloads = PayloadCache(max_bytes=10)
+    payloads.load(files[0], parse)
+    payloads.load(files[0], parse)
+    assert len(parsed) == 2
+    assert payloads._counters[ENTRIES] == 0
+
+
+def test_disabled_cache_parses_every_time(files):
+    payloads = PayloadCache(max_bytes=0)
+    payloads.load(files[0], parse)
+    payloads.load(files[0], parse)
+    assert len(parsed) == 2
+    assert payloads._counters[MISSES] == 0
@@ -0,0 +1,110 @@
+from connarchitecture.queue import MonitoredQueue, FairQueue, ConnectorQueue, OVERFLOW_SPILL
+from queue import Full
+import threading
+import pytest
+
+
+def drain(q):
+    return [q.get(block=False) for _ in range(q.depth())]
+
+
+def test_spilled_items_keep_fifo_order():
+    q = MonitoredQueue(maxsize=2, overflow=OVERFLOW_SPILL)
+    for i in range(5):
+        q.put(i, block=False)
+    assert q.spilled == 3
+    assert q.depth() == 5
+    assert q.high_water_mark == 5
+    assert drain(q) == [0, 1, 2, 3, 4]
+    assert q.spilled == 0
+
+
+def test_spilling_continues_until_the_spill_file_is_read_back():
+    q = MonitoredQueue(maxsize=2, overflow=OVERFLOW_SPILL)
+    for i in range(3):
+        q.put(i)
+    assert q.get() == 0
+    # There is room in memory again, but 2 is still spilled, so 3 must not overtake it
+    q.put(3)
+    assert drain(q) == [1, 2, 3]
+
+
+def test_full_blocking_queue_times_out_and_records_the_wait():
+    q = MonitoredQueue(maxsize=1)
+    q.put(0)
+    with pytest.raises(Full):
+        q.put(1, timeout=0.05)
+    assert q.blocked_time >= 0.05
+    assert q.depth() == 1
+
+
+def test_blocked_producer_resumes_when_a_consumer_makes_room():
+    q = MonitoredQueue(maxsize=1)
+    q.put(0)
+    producer = threading.Thread(target=q.put, args=(1,))
+    producer.start()
+    assert q.get(timeout=1) == 0
+    producer.join(timeout=1)
+    assert not producer.is_alive()
+    assert q.get(timeout=1) == 1
+
+
+def test_unknown_overflow_is_rejected():
+    with pytest.raises(ValueError):
+        ConnectorQueue(overflow='drop')
+
+
+def test_statistics_report_every_topic_lane():
+    q = ConnectorQueue(maxsize=10)
+    q.put_topic('concept', ('AAPL', 'Assets', 2020, 'USD'))
+    q.put_topic('price', ('AAPL', 2020))
+    statistics = q.statistics(name='Poller in')
+    assert 'Poller in/concept: depth 1/10' in statistics
+    assert 'Poller in/price: depth 1/10' in statistics
+    assert q.topic_qsize('concept') == 1
+
+
+def test_fair_queue_serves_the_highest_priority_first():
+    q = FairQueue()
+    q.put('backfill', priority=0, source='a')
+    q.put('urgent', priority=5, source='b')
+    q.put('normal', priority=1, source='c')
+    assert drain(q) == ['urgent', 'normal', 'backfill']
+
+
+def test_fair_queue_serves_sources_of_a_priority_round_robin():
+    q = FairQueue()
+    for i in range(3):
+        q.put(f'a{i}', source='a')
+    q.put('b0', source='b')
+    q.put('c0', source='c')
+    assert drain(q) == ['a0', 'b0', 'c0', 'a1', 'a2']
+
+
+def test_fair_queue_peek_shows_the_serving_order():
+    q = FairQueue()
+    for item, source in [('a0', 'a'), ('a1', 'a'), ('b0', 'b')]:
+        q.put(item, source=source)
+    q.put('urgent', priority=1, source='c')
+    assert q.peek(3) == ['urgent', 'a0', 'b0']
+
+
+def test_fair_queue_coalesces_items_of_the_same_priority():
+    q = FairQueue()
+    q.set_coalescer(key=lambda item: item[0], merge=lambda queued, item: (queued[0], queued[1] + item[1]))
+    q.put(('AAPL', (2020,)), source='a')
+    q.put(('AAPL', (2021,)), source='b')
+    q.put(('AAPL', (2022,)), priority=1, source='c')
+    assert q.coalesced == 1
+    assert drain(q) == [('AAPL', (2022,)), ('AAPL', (2020, 2021))]
+
+
+def test_fair_queue_reads_spilled_items_back_by_priority_and_source():
+    q = FairQueue(maxsize=1, overflow=OVERFLOW_SPILL)
+    q.put('a0', source='a')
+    q.put('a1', source='a')
+    q.put('a2', source='a')
+    q.put('b0', source='b')
+    q.put('urgent', priority=1, source='c')
+    assert q.spilled == 4
+    assert drain(q) == ['urgent', 'a0', 'a1', 'b0', 'a2']
@@ -0,0 +1,98 @@
+from connarchitecture.rate_limiter import TokenBucket, RateLimiter
+from email.utils import formatdate
+import time
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def limiter(monkeypatch):
+    monkeypatch.setattr(RateLimiter, '_buckets', {})
+    monkeypatch.setattr(RateLimiter, '_configured', set())
+    monkeypatch.setattr(RateLimiter, '_paused', {})
+
+
+def test_bucket_allows_a_burst_and_then_spaces_requests():
+    bucket = TokenBucket(rate=10, burst=3)
+    delays = [bucket.reserve() for _ in range(5)]
+    assert delays[:3] == [0, 0, 0]
+    assert delays[3] == pytest.approx(0.1, abs=0.01)
+    assert delays[4] == pytest.approx(0.2, abs=0.01)
+
+
+def test_adaptive_bucket_backs_off_once_per_second_and_recovers():
+    bucket = TokenBucket(rate=10, adaptive=True)
+    bucket.feedback(429)
+    assert bucket.current_rate == 5
+    # Responses to requests sent before the backoff do not shrink the rate again
+    bucket.feedback(503)
+    assert bucket.current_rate == 5
+    assert bucket.throttled == 2
+    assert bucket.backoffs == 1
+    for _ in range(100):
+        bucket.feedback(200)
+    assert bucket.current_rate == 10
+
+
+def test_adaptive_bucket_does_not_back_off_below_its_minimum_rate():
+    bucket = TokenBucket(rate=10, adaptive=True, min_rate=4)
+    for _ in range(3):
+        bucket.last_backoff = 0.0
+        bucket.feedback(429)
+    assert bucket.current_rate == 4
+
+
+def test_fixed_bucket_keeps_its_rate_when_throttled():
+    bucket = TokenBucket(rate=10)
+    bucket.feedback(429)
+    assert bucket.current_rate == 10
+    assert bucket.throttled == 1
+
+
+def test_pause_delays_the_next_request():
+    bucket = TokenBucket(rate=10, burst=5)
+    bucket.pause(2)
+    assert bucket.reserve() == pytest.approx(2, abs=0.01)
+    assert bucket.reserve() == pytest.approx(2.1, abs=0.01)
+
+
+@pytest.mark.parametrize('headers, seconds', [
+    (None, 0),
+    ({}, 0),
+    ({'retry-after': '7'}, 7),
+    ({'retry-after': '-3'}, 0),
+    ({'retry-after': 'soon'}, 0),
+    ({'retry-after': formatdate(time.time() + 60, usegmt=True)}, 60),
+])
+def test_retry_after_accepts_seconds_and_http_dates(headers, seconds):
+    assert RateLimiter.retry_after(headers) == pytest.approx(seconds, abs=2)
+
+
+def test_throttled_response_pauses_its_host():
+    RateLimiter.configure('example.com', rate=10, burst=5)
+    assert RateLimiter.feedback('https://example.com/a', 429, {'retry-after': '3'})
+    assert RateLimiter.reserve('https://example.com/b') == pytest.approx(3, abs=0.01)
+    assert not RateLimiter.feedback('https://example.com/a', 200)
+
+
+def test_throttled_response_pauses_a_host_without_bucket():
+    RateLimiter.feedback('https://example.com/a', 503, {'retry-after': '3'})
+    assert RateLimiter.reserve('https://example.com/b') == pytest.approx(3, abs=0.01)
+    assert RateLimiter.reserve('https://example.org/') == 0
+
+
+def test_hosts_configured_together_share_one_bucket():
+    RateLimiter.configure('data.sec.gov, www.sec.gov', rate=10)
+    assert RateLimiter.reserve('https://data.sec.gov/a') == 0
+    assert RateLimiter.reserve('https://www.sec.gov/b') == pytest.approx(0.1, abs=0.01)
+    assert RateLimiter.statistics().count('Rate limit') == 1
+    assert 'data.sec.gov, www.sec.gov' in RateLimiter.statistics()
+
+
+def test_set_interval_does_not_override_a_configured_host():
+    RateLimiter.configure('example.com', rate=10)
+    RateLimiter.set_interval('example.com', 1)
+    assert RateLimiter._buckets['example.com'].rate == 10
+    RateLimiter.set_interval('example.org', 0.5)
+    assert RateLimiter._buckets['example.org'].rate == 2
+    RateLimiter.set_interval('example.org', 0)
+    assert 'example.org' not in RateLimiter._buckets
@@ -0,0 +1,178 @@
+'''
+Compares download throughput of thread-based pollers with the async poller against a local stand-in
+HTTP server that serves the cached concept files with an artificial per-request latency.
+Run from the project root:
+
+$ python -m utilities.benchmark_async_poller -n 200 -t 1 4 -k 10 50 --latency 0.05
+'''
+
+from connarchitecture.abstract_poller import AbstractPoller
+from connarchitecture.abstract_async_poller import AbstractAsyncPoller
+from connarchitecture.decorators import overrides
+from connarchitecture.poll_reference import PollReference
+from connarchitecture.queue import ConnectorQueue
+from connarchitecture import async_http
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from functools import partial
+from threading import Thread, Lock
+import urllib.request
+import argparse
+import glob
+import time
+import os
+
+TOPIC = 'benchmark'
+CACHE_DIR = 'cache'
+
+
+class SlowHandler(SimpleHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(SlowHandler.latency)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Counter:
+    def __init__(self):
+        self._lock = Lock()
+        self.count = 0
+        self.bytes = 0
+
+    def add(self, size):
+        with self._lock:
+            self.count += 1
+            self.bytes += size
+
+
+class BenchmarkPoller(AbstractPoller):
+    def __init__(self, name, counter, base_url, **kwargs):
+        AbstractPoller.__init__(self, name)
+        self._counter = counter
+        self._base_url = base_url
+
+    @overrides(AbstractPoller)
+    def static_initialize(self):
+        pass
+
+    @overrides(AbstractPoller)
+    def initialize(self):
+        pass
+
+    @overrides(AbstractPoller)
+    def get_topic(self):
+        return self._topic
+
+    @overrides(AbstractPoller)
+    def poll(self, items):
+        with urllib.request.urlopen(f'{self._base_url}/{items[0]}') as r:
+            self._counter.add(len(r.read()))
+        return (items, PollReference(), True)
+
+    @overrides(AbstractPoller)
+    def cleanup(self):
+        pass
+
+    @overrides(AbstractPoller)
+    def static_cleanup(self):
+        pass
+
+
+class BenchmarkAsyncPoller(AbstractAsyncPoller):
+    def __init__(self, name, counter, base_url, **kwargs):
+        AbstractAsyncPoller.__init__(self, name, **kwargs)
+        self._counter = counter
+        self._base_url = base_url
+
+    @overrides(AbstractAsyncPoller)
+    def static_initialize(self):
+        pass
+
+    @overrides(AbstractAsyncPoller)
+    def initialize(self):
+        pass
+
+    @overrides(AbstractAsyncPoller)
+    def get_topic(self):
+        return self._topic
+
+    @overrides(AbstractAsyncPoller)
+    async def poll(self, items):
+        r = await async_http.fetch(f'{self._base_url}/{items[0]}')
+        self._counter.add(len(r.body))
+        return (items, PollReference(), True)
+
+    @overrides(AbstractAsyncPoller)
+    def cleanup(self):
+        pass
+
+    @overrides(AbstractAsyncPoller)
+    def static_cleanup(self):
+        pass
+
+
+def run(pollers, paths: list[str]) -> tuple[float, float]:
+    in_queue = ConnectorQueue()
+    out_queue = ConnectorQueue()
+    event_queue = ConnectorQueue()
+    for path in paths:
+        in_queue.put_topic(TOPIC, (path,))
+
+    counter = pollers[0]._counter
+    start = time.perf_counter()
+    for p in pollers:
+        p.set_in_queue(in_queue)
+        p.set_out_queue(out_queue)
+        p.set_event_queue(event_queue)
+        p.set_topic(TOPIC)
+        p.start()
+
+    while counter.count < len(paths):
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start
+
+    for p in pollers:
+        p.stop()
+    for p in pollers:
+        p.join()
+    return (counter.count / elapsed, counter.bytes / elapsed / 1024 / 1024)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('-n', type=int, default=200, help='number of files to download')
+    arg_parser.add_argument('-t', type=int, nargs='+', default=[1, 4], help='thread counts for the thread-based poller')
+    arg_parser.add_argument('-k', type=int, nargs='+', default=[10, 50], help='in_flight values for the async poller (1 thread)')
+    arg_parser.add_argument('--latency', type=float, default=0.05, help='artificial server latency per request in seconds')
+    args = arg_parser.parse_args()
+
+    paths = [os.path.relpath(f, CACHE_DIR) for f in sorted(glob.glob(f'{CACHE_DIR}/concepts/*/*.json'))][:args.n]
+    if not paths:
+        print(f"No concept files found in {CACHE_DIR}/concepts")
+        return
+
+    SlowHandler.latency = args.latency
+    server = ThreadingHTTPServer(('127.0.0.1', 0), partial(SlowHandler, directory=CACHE_DIR))
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    print(f"\n{len(paths)} files, {args.latency * 1000:.0f} ms server latency")
+    print(f"{'Poller':>24} {'files/s':>10} {'MB/s':>8}")
+    for t in args.t:
+        counter = Counter()
+        rate, mb = run([BenchmarkPoller(f"BenchmarkPoller-{i+1}", counter, base_url) for i in range(t)], paths)
+        print(f"{f'threads={t}':>24} {rate:>10.1f} {mb:>8.2f}")
+    for k in args.k:
+        counter = Counter()
+        rate, mb = run([BenchmarkAsyncPoller("BenchmarkAsyncPoller-1", counter, base_url, in_flight=k)], paths)
+        print(f"{f'async in_flight={k}':>24} {rate:>10.1f} {mb:>8.2f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
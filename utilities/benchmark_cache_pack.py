@@ -0,0 +1,101 @@
+'''
+Compares reading the cached concept files from the directory tree with reading them from a pack (see
+implementation.cache_pack). Copies the files into a temporary directory twice, packs one of the copies
+and reads every file through cache.open_document, first cold, after evicting the files from the page
+cache, and then warm. Also reports the time to copy each form, as a backup would.
+Run from the project root:
+
+$ python -m utilities.benchmark_cache_pack -n 2000
+'''
+
+from utilities.pack_cache import pack
+import implementation.cache as cache
+import tempfile
+import argparse
+import shutil
+import glob
+import time
+import os
+
+CACHE_DIR = 'cache'
+
+
+def evict(root: str):
+    """
+    Drops the files below `root` from the page cache, so the next read comes from the disk. Where the OS
+    has no posix_fadvise, e.g. on macOS and Windows, the files stay cached and cold reads are warm.
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    for folder, _, names in os.walk(root):
+        for name in names:
+            fd = os.open(os.path.join(folder, name), os.O_RDONLY)
+            try:
+                os.fsync(fd)
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+
+
+def read_all(files: list[str]) -> tuple[float, int]:
+    """
+    :return (seconds, bytes) to read all `files` through the cache
+    """
+    size = 0
+    start = time.monotonic()
+    for file in files:
+        with cache.open_document(file) as f:
+            size += len(f.read())
+    return (time.monotonic() - start, size)
+
+
+def copy_time(source: str, target: str) -> float:
+    start = time.monotonic()
+    if os.path.isdir(source):
+        shutil.copytree(source, target)
+    else:
+        shutil.copyfile(source, target)
+    return time.monotonic() - start
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('-n', type=int, default=0, help='number of concept files, 0 for all')
+    args = arg_parser.parse_args()
+
+    sources = sorted(glob.glob(f'{CACHE_DIR}/concepts/*/*.json'))
+    if args.n:
+        sources = sources[:args.n]
+
+    root = tempfile.mkdtemp()
+    try:
+        stores = {}
+        for name in ['files', 'pack']:
+            directory = os.path.join(root, name, 'concepts')
+            for source in sources:
+                target = os.path.join(directory, os.path.relpath(source, f'{CACHE_DIR}/concepts'))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                shutil.copyfile(source, target)
+            stores[name] = directory
+        pack(stores['pack'])
+        files = [os.path.relpath(source, f'{CACHE_DIR}/concepts') for source in sources]
+
+        print(f"{len(files)} concept files")
+        if not hasattr(os, 'posix_fadvise'):
+            print("posix_fadvise is not available, the cold reads are served from the page cache")
+        print(f"{'Store':>8} {'cold files/s':>13} {'cold MB/s':>10} {'warm files/s':>13} {'warm MB/s':>10} {'copy s':>7}")
+        for name, directory in stores.items():
+            paths = [os.path.join(directory, file) for file in files]
+            evict(os.path.join(root, name))
+            cold, size = read_all(paths)
+            warm, _ = read_all(paths)
+            stored = directory if name == 'files' else f'{directory}.pack'
+            copied = copy_time(stored, f'{stored}.copy')
+            mb = size / 1024 / 1024
+            print(f"{name:>8} {len(paths) / cold:>13.0f} {mb / cold:>10.1f} {len(paths) / warm:>13.0f} {mb / warm:>10.1f} {copied:>7.2f}")
+    finally:
+        shutil.rmtree(root)
+
+
+if __name__ == "__main__":
+    main()
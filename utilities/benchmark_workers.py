@@ -0,0 +1,184 @@
+'''
+Measures items/s per pipeline stage (poller -> parser -> sender) for the worker dispatch modes.
+
+The workers are no-op implementations so the numbers reflect the framework overhead only.
+Run from the project root:
+
+$ python -m utilities.benchmark_workers -n 200 -t 1 -b 50
+'''
+
+from connarchitecture.abstract_poller import AbstractPoller
+from connarchitecture.abstract_parser import AbstractParser
+from connarchitecture.abstract_sender import AbstractSender
+from connarchitecture.constants import Constants
+from connarchitecture.decorators import overrides
+from connarchitecture.poll_reference import PollReference
+from connarchitecture.queue import ConnectorQueue
+from threading import Lock
+import argparse
+import time
+
+TOPIC = 'benchmark'
+
+
+class StageClock:
+    def __init__(self):
+        self._lock = Lock()
+        self.count = 0
+        self.last = None
+
+    def tick(self):
+        with self._lock:
+            self.count += 1
+            self.last = time.perf_counter()
+
+
+class BenchmarkPoller(AbstractPoller):
+    def __init__(self, name, clock, **kwargs):
+        AbstractPoller.__init__(self, name)
+        self._clock = clock
+
+    @overrides(AbstractPoller)
+    def static_initialize(self):
+        pass
+
+    @overrides(AbstractPoller)
+    def initialize(self):
+        pass
+
+    @overrides(AbstractPoller)
+    def get_topic(self):
+        return self._topic
+
+    @overrides(AbstractPoller)
+    def poll(self, items):
+        poll_reference = PollReference()
+        poll_reference.ticker = items[0]
+        self._clock.tick()
+        return (items, poll_reference, True)
+
+    @overrides(AbstractPoller)
+    def cleanup(self):
+        pass
+
+    @overrides(AbstractPoller)
+    def static_cleanup(self):
+        pass
+
+
+class BenchmarkParser(AbstractParser):
+    def __init__(self, name, clock, **kwargs):
+        AbstractParser.__init__(self, name)
+        self._clock = clock
+
+    @overrides(AbstractParser)
+    def static_initialize(self):
+        pass
+
+    @overrides(AbstractParser)
+    def initialize(self):
+        pass
+
+    @overrides(AbstractParser)
+    def parse(self, input, poll_reference=None):
+        self._clock.tick()
+        return input
+
+    @overrides(AbstractParser)
+    def cleanup(self):
+        pass
+
+    @overrides(AbstractParser)
+    def static_cleanup(self):
+        pass
+
+
+class BenchmarkSender(AbstractSender):
+    def __init__(self, name, clock, **kwargs):
+        AbstractSender.__init__(self, name)
+        self._clock = clock
+
+    @overrides(AbstractSender)
+    def static_initialize(self):
+        pass
+
+    @overrides(AbstractSender)
+    def initialize(self):
+        pass
+
+    @overrides(AbstractSender)
+    def process(self, input, poll_reference=None):
+        self._clock.tick()
+
+    @overrides(AbstractSender)
+    def cleanup(self):
+        pass
+
+    @overrides(AbstractSender)
+    def static_cleanup(self):
+        pass
+
+
+def run(mode: str, items: int, threads: int, timeout: float, batch_size: int = 1) -> dict[str, float]:
+    poller_in_queue = ConnectorQueue()
+    poller_out_queue = ConnectorQueue()
+    parser_out_queue = ConnectorQueue()
+    event_queue = ConnectorQueue()
+    clocks = {'poller': StageClock(), 'parser': StageClock(), 'sender': StageClock()}
+
+    workers = []
+    for i in range(threads):
+        poller = BenchmarkPoller(f"BenchmarkPoller-{i+1}", clocks['poller'])
+        poller.set_in_queue(poller_in_queue)
+        poller.set_out_queue(poller_out_queue)
+        poller.set_topic(TOPIC)
+        parser = BenchmarkParser(f"BenchmarkParser-{i+1}", clocks['parser'])
+        parser.set_in_queue(poller_out_queue)
+        parser.set_out_queue(parser_out_queue)
+        sender = BenchmarkSender(f"BenchmarkSender-{i+1}", clocks['sender'])
+        sender.set_in_queue(parser_out_queue)
+        workers += [poller, parser, sender]
+
+    for w in workers:
+        w.set_event_queue(event_queue)
+        w.set_dispatch_mode(mode, timeout)
+        w.set_batching(batch_size)
+
+    for i in range(items):
+        poller_in_queue.put_topic(TOPIC, (f"T{i}",))
+
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+
+    while clocks['sender'].count < items:
+        time.sleep(0.01)
+
+    for w in workers:
+        w.stop()
+    for w in workers:
+        w.join()
+
+    return {stage: clock.count / (clock.last - start) for stage, clock in clocks.items()}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('-n', type=int, default=200, help='number of items to push through the pipeline')
+    arg_parser.add_argument('-t', type=int, default=1, help='threads per stage')
+    arg_parser.add_argument('-b', type=int, default=1, help='parser and sender batch size')
+    arg_parser.add_argument('--timeout', type=float, default=Constants.DEFAULT_DISPATCH_TIMEOUT, help='blocking get timeout in seconds')
+    args = arg_parser.parse_args()
+
+    results = {}
+    for mode in [Constants.DISPATCH_MODE_POLLING, Constants.DISPATCH_MODE_BLOCKING]:
+        results[mode] = run(mode=mode, items=args.n, threads=args.t, timeout=args.timeout, batch_size=args.b)
+
+    print(f"\n{args.n} items, {args.t} thread(s) per stage, batch size {args.b}")
+    print(f"{'Stage':>10} {'polling':>14} {'blocking':>14}")
+    for stage in ['poller', 'parser', 'sender']:
+        print(f"{stage:>10} {results[Constants.DISPATCH_MODE_POLLING][stage]:>10.1f} i/s {results[Constants.DISPATCH_MODE_BLOCKING][stage]:>10.1f} i/s")
+
+
+if __name__ == "__main__":
+    main()
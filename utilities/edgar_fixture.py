@@ -0,0 +1,115 @@
+'''
+Builds a local stand-in for the EDGAR API from the cached concept files and optionally serves it, so
+that the concept pollers can be run without hitting data.sec.gov. For every company the fixture has the
+companyconcept documents as cached and one companyfacts document that combines them.
+Run from the project root:
+
+$ python -m utilities.edgar_fixture --out fixtures/edgar --serve 8000
+
+and point a concept poller at it, e.g. Args={"base_url": "http://127.0.0.1:8000", "endpoint": "companyfacts", "min_interval": 0}
+
+--zip additionally packs the companyfacts documents into an archive like the SEC bulk companyfacts.zip:
+
+$ python -m utilities.edgar_fixture --out fixtures/edgar --limit 20 --zip fixtures/companyfacts.zip
+'''
+
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from functools import partial
+import implementation.cache as cache
+import argparse
+import zipfile
+import json
+import time
+import os
+
+
+class SlowHandler(SimpleHTTPRequestHandler):
+    latency = 0.0
+
+    def do_GET(self):
+        time.sleep(SlowHandler.latency)
+        super().do_GET()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def build(cache_dir: str, out: str, limit: int = 0) -> int:
+    companies = 0
+    for ticker in sorted(os.listdir(cache_dir)):
+        folder = os.path.join(cache_dir, ticker)
+        if not os.path.isdir(folder):
+            continue
+
+        company_facts = None
+        # Cached files may be stored compressed, e.g. Assets.json.gz
+        names = sorted(set([cache.plain_path(f) for f in os.listdir(folder)]))
+        for f in names:
+            if not f.endswith('.json'):
+                continue
+            with cache.open_document(os.path.join(folder, f)) as json_file:
+                concept = json.load(json_file)
+            cik = f"{concept['cik']:010d}"
+            if not company_facts:
+                company_facts = {'cik': concept['cik'], 'entityName': concept.get('entityName'), 'facts': {}}
+
+            concept_dir = os.path.join(out, 'api/xbrl/companyconcept', f'CIK{cik}', concept['taxonomy'])
+            os.makedirs(concept_dir, exist_ok=True)
+            with open(os.path.join(concept_dir, f"{concept['tag']}.json"), 'w') as json_file:
+                json.dump(concept, json_file)
+
+            taxonomy = company_facts['facts'].setdefault(concept['taxonomy'], {})
+            taxonomy[concept['tag']] = {'label': concept.get('label'), 'description': concept.get('description'), 'units': concept['units']}
+
+        if company_facts:
+            facts_dir = os.path.join(out, 'api/xbrl/companyfacts')
+            os.makedirs(facts_dir, exist_ok=True)
+            with open(os.path.join(facts_dir, f"CIK{company_facts['cik']:010d}.json"), 'w') as json_file:
+                json.dump(company_facts, json_file)
+            companies += 1
+            if limit and companies >= limit:
+                break
+    return companies
+
+
+def pack(out: str, archive: str) -> int:
+    facts_dir = os.path.join(out, 'api/xbrl/companyfacts')
+    members = sorted(os.listdir(facts_dir))
+    with zipfile.ZipFile(archive, 'w', compression=zipfile.ZIP_DEFLATED) as zip_file:
+        for member in members:
+            zip_file.write(os.path.join(facts_dir, member), arcname=member)
+    return len(members)
+
+
+def serve(out: str, port: int, latency: float):
+    SlowHandler.latency = latency
+    server = ThreadingHTTPServer(('127.0.0.1', port), partial(SlowHandler, directory=out))
+    print(f"Serving {out} on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('--cache', default='cache/concepts', help='directory with the cached companyconcept documents')
+    arg_parser.add_argument('--out', default='fixtures/edgar', help='directory to write the fixture to')
+    arg_parser.add_argument('--limit', type=int, default=0, help='number of companies, 0 for all')
+    arg_parser.add_argument('--zip', metavar='ARCHIVE', help='also write the companyfacts documents to ARCHIVE')
+    arg_parser.add_argument('--serve', type=int, metavar='PORT', help='serve the fixture on PORT')
+    arg_parser.add_argument('--latency', type=float, default=0.0, help='artificial server latency per request in seconds')
+    args = arg_parser.parse_args()
+
+    companies = build(cache_dir=args.cache, out=args.out, limit=args.limit)
+    print(f"Wrote {companies} companies to {args.out}")
+
+    if args.zip:
+        print(f"Packed {pack(out=args.out, archive=args.zip)} companies into {args.zip}")
+
+    if args.serve is not None:
+        serve(out=args.out, port=args.serve, latency=args.latency)
+
+
+if __name__ == "__main__":
+    main()
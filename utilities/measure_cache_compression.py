@@ -0,0 +1,87 @@
+'''
+Measures what compressing the cache saves. Copies the cached concept and price files into a temporary
+directory once per compression through cache.write and reports the size on disk, the time to write
+them and the time to read and parse all of them again through cache.open_document.
+Run from the project root:
+
+$ python -m utilities.measure_cache_compression -n 2000
+'''
+
+import implementation.cache as cache
+import tempfile
+import argparse
+import shutil
+import glob
+import json
+import time
+import csv
+import os
+
+CACHE_DIR = 'cache'
+
+
+def parse(file: str):
+    if file.endswith('.json'):
+        with cache.open_document(file) as f:
+            try:
+                json.load(f)
+            except ValueError:
+                # The cache has a few error pages that were stored as concept files
+                pass
+    else:
+        with cache.open_text(file, newline='') as f:
+            for row in csv.DictReader(f):
+                pass
+
+
+def measure(files: list[str], compression: str) -> tuple[int, float, float]:
+    """
+    :return (bytes on disk, seconds to write, seconds to read and parse)
+    """
+    root = tempfile.mkdtemp()
+    try:
+        copies = []
+        start = time.monotonic()
+        for file in files:
+            with open(file, 'rb') as f:
+                data = f.read()
+            copy = os.path.join(root, os.path.relpath(file, CACHE_DIR))
+            cache.write(copy, [data], compression=compression)
+            copies.append(copy)
+        write_time = time.monotonic() - start
+
+        size = sum([os.path.getsize(cache.stored_path(copy)) for copy in copies])
+
+        start = time.monotonic()
+        for copy in copies:
+            parse(copy)
+        read_time = time.monotonic() - start
+        return (size, write_time, read_time)
+    finally:
+        shutil.rmtree(root)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('-n', type=int, default=0, help='number of files per area, 0 for all')
+    arg_parser.add_argument('-c', nargs='+', default=['none', cache.COMPRESSION_GZIP, cache.COMPRESSION_LZMA], help='compressions to compare')
+    args = arg_parser.parse_args()
+
+    for area, pattern in [('concepts', f'{CACHE_DIR}/concepts/*/*.json'), ('prices', f'{CACHE_DIR}/prices/*/*.csv')]:
+        files = sorted(glob.glob(pattern))
+        if args.n:
+            files = files[:args.n]
+        if not files:
+            continue
+
+        print(f"\n{area}: {len(files)} files")
+        print(f"{'Compression':>12} {'MB':>8} {'ratio':>6} {'write s':>8} {'read+parse s':>13}")
+        baseline = None
+        for compression in args.c:
+            size, write_time, read_time = measure(files, None if compression == 'none' else compression)
+            baseline = baseline or size
+            print(f"{compression:>12} {size / 1024 / 1024:>8.1f} {baseline / size:>6.1f} {write_time:>8.2f} {read_time:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+'''
+Packs a cache directory into a single file (see implementation.cache_pack) or unpacks it again. Files keep
+their compression and metadata. Stop the connector first and run `cache rebuild` after restarting it if
+a cache manifest is configured. Run from the project root:
+
+$ python -m utilities.pack_cache cache/concepts
+$ python -m utilities.pack_cache cache/concepts --unpack
+'''
+
+import implementation.cache as cache
+import implementation.cache_pack as cache_pack
+import argparse
+import gzip
+import lzma
+import json
+import zlib
+import os
+
+BATCH_SIZE = 500
+
+_COMPRESSION_OF_SUFFIX = {suffix: compression for compression, suffix in cache.SUFFIXES.items()}
+_DECOMPRESSORS = {cache.COMPRESSION_GZIP: gzip.decompress, cache.COMPRESSION_LZMA: lzma.decompress}
+
+
+def _packed_entry(directory: str, path: str) -> tuple[str, bytes, dict]:
+    """
+    :return (key, stored content, metadata) of the cached file stored at `path` or None if it is damaged
+    """
+    file = cache.plain_path(path)
+    compression = _COMPRESSION_OF_SUFFIX.get(os.path.splitext(path)[1])
+    with open(path, 'rb') as f:
+        stored = f.read()
+    try:
+        crc = zlib.crc32(_DECOMPRESSORS[compression](stored) if compression else stored)
+    except (EOFError, OSError, lzma.LZMAError, zlib.error):
+        return None
+    meta = cache.read_meta(file) or {}
+    if meta.get('path', file) != path or 'fetched' not in meta:
+        meta = {'fetched': os.path.getmtime(path)}
+    elif meta.get('crc32') is not None and meta['crc32'] != crc:
+        return None
+    meta = meta | {'size': len(stored), 'crc32': crc, 'compression': compression}
+    return (os.path.relpath(file, directory).replace(os.sep, '/'), stored, meta)
+
+
+def pack(directory: str, keep: bool = False) -> tuple[int, int]:
+    """
+    Moves the cached files below `directory` into `<directory>.pack`. Damaged files are left in `directory`
+    for inspection, together with anything else that was not packed.
+    :return the number of (packed, damaged) files
+    """
+    directory = os.path.normpath(directory)
+    files = []
+    for folder, _, names in os.walk(directory):
+        files += [os.path.join(folder, name) for name in names if not name.endswith(cache.META_SUFFIX) and not name.endswith('.part')]
+
+    target = cache_pack.open_pack(f'{directory}{cache_pack.SUFFIX}')
+    packed = []
+    damaged = 0
+    for start in range(0, len(files), BATCH_SIZE):
+        paths = files[start:start + BATCH_SIZE]
+        entries = [_packed_entry(directory, path) for path in paths]
+        damaged += len([entry for entry in entries if entry is None])
+        target.write_many([entry for entry in entries if entry])
+        packed += [path for path, entry in zip(paths, entries) if entry]
+    target.close()
+
+    if not keep:
+        for path in packed:
+            os.remove(path)
+            meta = f'{cache.plain_path(path)}{cache.META_SUFFIX}'
+            if os.path.exists(meta):
+                os.remove(meta)
+        for folder, _, _ in os.walk(directory, topdown=False):
+            if not os.listdir(folder):
+                os.rmdir(folder)
+    return (len(packed), damaged)
+
+
+def unpack(directory: str) -> int:
+    """
+    Writes the files of `<directory>.pack` back into `directory` and removes the pack.
+    :return the number of unpacked files
+    """
+    directory = os.path.normpath(directory)
+    source = cache_pack.open_pack(f'{directory}{cache_pack.SUFFIX}')
+    count = 0
+    for key in [key for key, _ in source.entries()]:
+        stored, meta = source.read(key)
+        file = os.path.join(directory, *key.split('/'))
+        path = f"{file}{cache.SUFFIXES[meta['compression']]}" if meta['compression'] else file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(stored)
+        with open(f'{file}{cache.META_SUFFIX}', 'w') as meta_file:
+            json.dump({column: meta[column] for column in ('fetched', 'etag', 'last_modified', 'size', 'crc32')} | {'path': path}, meta_file)
+        count += 1
+    cache_pack.remove_pack(source.path)
+    return count
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument('directory', help='cache directory, e.g. cache/concepts')
+    arg_parser.add_argument('--unpack', action='store_true', help='write the files of the pack back into the directory')
+    arg_parser.add_argument('--keep', action='store_true', help='keep the files in the directory after packing them')
+    args = arg_parser.parse_args()
+
+    if args.unpack:
+        print(f"Unpacked {unpack(args.directory)} files into {args.directory}")
+    else:
+        packed, damaged = pack(args.directory, keep=args.keep)
+        print(f"Packed {packed} files into {args.directory}{cache_pack.SUFFIX}, skipped {damaged} damaged files")
+
+
+if __name__ == "__main__":
+    main()